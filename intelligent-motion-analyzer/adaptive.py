@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Adaptive pose inference: frame skipping and ROI-cropped detection
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from motion_analyzer import LandmarkSet, PoseBackend, PoseEstimator
+
+logger = logging.getLogger(__name__)
+
+class AdaptivePoseEstimator(PoseBackend):
+    """
+    Pose backend wrapper that runs the detector only every k frames
+    
+    Between detections, landmarks are extrapolated with a constant-velocity
+    model from the last two detections and tagged ``interpolated=True``.
+    The interval k doubles (up to ``max_interval``) while the subject moves
+    less than ``motion_threshold`` per frame, and drops back to
+    ``min_interval`` as soon as motion picks up. That keeps the angle error
+    from extrapolation bounded.
+    
+    When ``use_roi`` is set, detection runs on a crop around the last pose
+    bounding box, scaled into a fixed ``roi_max_side`` square canvas. Crops
+    go to a separate static-mode estimator: feeding them to the tracking
+    estimator would mix crop and full-frame coordinates in its tracker and
+    reallocate its buffers for every crop shape. If the crop yields no
+    pose, the full frame is tried before giving up.
+    """
+    
+    def __init__(self, estimator: Optional[PoseBackend] = None,
+                 min_interval: int = 1, max_interval: int = 4,
+                 motion_threshold: float = 0.004,
+                 use_roi: bool = True, roi_padding: float = 0.25,
+                 roi_max_side: int = 256, roi_visibility: float = 0.5,
+                 roi_estimator: Optional[PoseBackend] = None):
+        """
+        Args:
+            estimator: Underlying pose estimator (built with defaults if None)
+            min_interval: Detection interval in frames while the subject moves
+            max_interval: Largest detection interval when motion is low
+            motion_threshold: Mean per-frame landmark displacement (normalized
+                image units) below which the interval grows
+            use_roi: Crop to the last pose bounding box before inference
+            roi_padding: Padding around the bounding box, as a fraction of its size
+            roi_max_side: Side of the square canvas crops are scaled into
+            roi_visibility: Minimum visibility for landmarks used for the box
+            roi_estimator: Static-mode estimator for crops. Built from a
+                MediaPipe ``estimator`` when None; other backends need one
+                passed in, otherwise ROI cropping is disabled.
+        """
+        self.estimator = estimator or PoseEstimator()
+        super().__init__(self.estimator.joint_angle_table)
+        self.joint_connections = self.estimator.joint_connections
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.motion_threshold = motion_threshold
+        self.use_roi = use_roi
+        self.roi_padding = roi_padding
+        self.roi_max_side = roi_max_side
+        self.roi_visibility = roi_visibility
+        if roi_estimator is None and use_roi and isinstance(self.estimator, PoseEstimator):
+            roi_estimator = PoseEstimator(**{**self.estimator._pose_options, "static_image_mode": True},
+                                          joint_angle_table=self.estimator.joint_angle_table)
+        elif roi_estimator is None and use_roi:
+            logger.info(f"No static-mode estimator for ROI crops of {type(self.estimator).__name__}; "
+                        "detecting on full frames")
+        self.roi_estimator = roi_estimator if use_roi else None
+        self._canvas = np.zeros((roi_max_side, roi_max_side, 3), dtype=np.uint8)
+        
+        self.interval = self.min_interval
+        self._last: Optional[np.ndarray] = None
+        self._velocity: Optional[np.ndarray] = None
+        self._frames_since_detection = 0
+        self.frames_seen = 0
+        self.detector_calls = 0
+        self.frames_interpolated = 0
+    
+    def reset(self):
+        """Forget tracking state, e.g. after a scene cut"""
+        self.interval = self.min_interval
+        self._last = None
+        self._velocity = None
+        self._frames_since_detection = 0
+    
+    def detect_pose(self, frame: np.ndarray) -> Optional[LandmarkSet]:
+        """
+        Detect or extrapolate the pose for the given frame
+        
+        Args:
+            frame: Input image frame (BGR format)
+        
+        Returns:
+            LandmarkSet (``interpolated`` set when not detected) or None
+        """
+        self.frames_seen += 1
+        self._frames_since_detection += 1
+        
+        if self._last is not None and self._frames_since_detection < self.interval:
+            self.frames_interpolated += 1
+            return self._extrapolate()
+        
+        landmarks = self._detect(frame)
+        if landmarks is None:
+            self.reset()
+            return None
+        
+        current = landmarks.array
+        if self._last is not None:
+            velocity = (current - self._last) / self._frames_since_detection
+            velocity[:, 3] = 0.0  # Never extrapolate visibility
+            self._velocity = velocity
+            self._update_interval(velocity)
+        self._last = current
+        self._frames_since_detection = 0
+        return landmarks
+    
+    def detect_poses(self, frames: Sequence[np.ndarray]) -> List[Optional[LandmarkSet]]:
+        """Frame by frame, since each detection decides whether the next frame is skipped"""
+        return [self.detect_pose(frame) for frame in frames]
+    
+    def _update_interval(self, velocity: np.ndarray):
+        visible = self._last[:, 3] >= self.roi_visibility
+        speeds = np.abs(velocity[visible, :2]) if visible.any() else np.abs(velocity[:, :2])
+        if float(speeds.mean()) < self.motion_threshold:
+            self.interval = min(self.interval * 2, self.max_interval)
+        else:
+            self.interval = self.min_interval
+    
+    def _extrapolate(self) -> LandmarkSet:
+        if self._velocity is None:
+            return LandmarkSet(self._last.copy(), interpolated=True)
+        predicted = self._last + self._velocity * self._frames_since_detection
+        return LandmarkSet(predicted, interpolated=True)
+    
+    def _detect(self, frame: np.ndarray) -> Optional[LandmarkSet]:
+        self.detector_calls += 1
+        if self.roi_estimator is not None and self._last is not None:
+            roi = self._roi(frame.shape[1], frame.shape[0])
+            if roi is not None:
+                landmarks = self._detect_in_roi(frame, roi)
+                if landmarks is not None:
+                    return landmarks
+                self.detector_calls += 1
+        return self.estimator.detect_pose(frame)
+    
+    def _roi(self, width: int, height: int) -> Optional[Tuple[int, int, int, int]]:
+        """Padded pixel bounding box (x0, y0, x1, y1) around the last visible landmarks"""
+        visible = self._last[self._last[:, 3] >= self.roi_visibility, :2]
+        if visible.shape[0] < 4:
+            return None
+        low = visible.min(axis=0)
+        high = visible.max(axis=0)
+        pad = (high - low) * self.roi_padding
+        x0, y0 = np.clip(low - pad, 0.0, 1.0) * (width, height)
+        x1, y1 = np.clip(high + pad, 0.0, 1.0) * (width, height)
+        x0, y0, x1, y1 = int(x0), int(y0), int(np.ceil(x1)), int(np.ceil(y1))
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        return x0, y0, x1, y1
+    
+    def _fill_canvas(self, crop: np.ndarray) -> float:
+        """
+        Scale a crop into the top-left of the fixed-size canvas, zeroing the rest
+        
+        Returns:
+            Canvas pixels per crop pixel
+        """
+        height, width = crop.shape[:2]
+        scale = self.roi_max_side / max(height, width)
+        size = (min(self.roi_max_side, max(1, round(width * scale))),
+                min(self.roi_max_side, max(1, round(height * scale))))
+        interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+        self._canvas[:size[1], :size[0]] = cv2.resize(crop, size, interpolation=interpolation)
+        self._canvas[size[1]:] = 0
+        self._canvas[:size[1], size[0]:] = 0
+        return scale
+    
+    def _detect_in_roi(self, frame: np.ndarray, roi: Tuple[int, int, int, int]) -> Optional[LandmarkSet]:
+        x0, y0, x1, y1 = roi
+        scale = self._fill_canvas(frame[y0:y1, x0:x1])
+        landmarks = self.roi_estimator.detect_pose(self._canvas)
+        if landmarks is None:
+            return None
+        
+        # Map canvas-normalized coordinates back to full-frame normalized ones
+        height, width = frame.shape[:2]
+        canvas_to_frame = self.roi_max_side / scale
+        array = landmarks.array.copy()
+        array[:, 0] = (array[:, 0] * canvas_to_frame + x0) / width
+        array[:, 1] = (array[:, 1] * canvas_to_frame + y0) / height
+        array[:, 2] = array[:, 2] * canvas_to_frame / width  # z shares the x scale
+        return LandmarkSet(array)
+    
+    def close(self):
+        self.estimator.close()
+        if self.roi_estimator is not None:
+            self.roi_estimator.close()
+    
+    def get_stats(self) -> Dict:
+        """Fraction of frames that needed the detector"""
+        return {
+            "frames_seen": self.frames_seen,
+            "detector_calls": self.detector_calls,
+            "frames_interpolated": self.frames_interpolated,
+            "current_interval": self.interval,
+            "detector_call_ratio": self.detector_calls / self.frames_seen if self.frames_seen else 0.0
+        }
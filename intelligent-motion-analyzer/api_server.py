@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Async WebSocket/HTTP streaming API for live analysis results
+
+A single analysis task reads frames and runs ``MotionAnalyzer.analyze_frame``
+on a dedicated worker thread, so the event loop only moves bytes. Each
+frame's joint angles and gait metrics are fanned out to every WebSocket
+subscriber through a per-client bounded buffer that drops the oldest
+messages when a client falls behind; a lagging dashboard loses frames
+instead of stalling inference or other clients.
+    
+    python api_server.py --input 0 --port 8000
+    ws://localhost:8000/stream?encoding=binary   # or delta, json
+    GET /api/analysis                              # comprehensive analysis snapshot
+    GET /api/stats                                 # frame, client and drop counters
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import asyncio
+import json
+import math
+import os
+import struct
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Deque, Dict, List, Optional, Tuple, Union
+import logging
+
+import cv2
+import numpy as np
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+
+from instrumentation import metrics
+from motion_analyzer import GAIT_FIELDS, GAIT_PHASES, AnalysisType, MotionAnalyzer, MotionMetrics
+
+logger = logging.getLogger(__name__)
+
+ENCODINGS = ("binary", "delta", "json")
+
+# Binary frame: header, then n_angles float32, then len(GAIT_FIELDS) float32 (in GAIT_FIELDS
+# order) and a phase byte (index into GAIT_PHASES).
+# Missing values are NaN. Flags: bit 0 pose detected, bit 1 pose interpolated.
+BINARY_HEADER = struct.Struct("<qdHB")
+
+def _number(value) -> float:
+    return float(value) if isinstance(value, (int, float)) else math.nan
+
+class FrameRecord:
+    """One analyzed frame, flattened once and encoded lazily per format"""
+    
+    __slots__ = ("frame_id", "timestamp", "flags", "angles", "gait", "phase", "_encoded")
+    
+    def __init__(self, motion_metrics: MotionMetrics, joint_names: List[str]):
+        self.frame_id = motion_metrics.frame_id
+        self.timestamp = motion_metrics.timestamp
+        self.flags = 0
+        if motion_metrics.poses:
+            self.flags |= 1
+            if motion_metrics.poses[0].get("interpolated"):
+                self.flags |= 2
+        by_name = {angle.joint_name: angle.angle_degrees for angle in motion_metrics.joint_angles}
+        self.angles = np.array([by_name.get(name, math.nan) for name in joint_names], dtype=np.float32)
+        gait = motion_metrics.gait_metrics or {}
+        self.gait = np.array([_number(gait.get(field)) for field in GAIT_FIELDS], dtype=np.float32)
+        phase = gait.get("gait_phase", "unknown")
+        self.phase = GAIT_PHASES.index(phase) if phase in GAIT_PHASES else 0
+        self._encoded: Dict[str, Union[bytes, str]] = {}
+    
+    def binary(self) -> bytes:
+        encoded = self._encoded.get("binary")
+        if encoded is None:
+            encoded = (BINARY_HEADER.pack(self.frame_id, self.timestamp, len(self.angles), self.flags)
+                       + self.angles.tobytes() + self.gait.tobytes() + bytes((self.phase,)))
+            self._encoded["binary"] = encoded
+        return encoded
+    
+    def json(self) -> str:
+        encoded = self._encoded.get("json")
+        if encoded is None:
+            encoded = json.dumps({
+                "f": self.frame_id,
+                "t": self.timestamp,
+                "flags": self.flags,
+                "a": [None if v != v else round(float(v), 2) for v in self.angles],
+                "g": [None if v != v else round(float(v), 4) for v in self.gait],
+                "p": self.phase
+            }, separators=(",", ":"))
+            self._encoded["json"] = encoded
+        return encoded
+
+class DeltaEncoder:
+    """
+    Per-client delta encoding against the values that client last received
+    
+    Only angles that moved more than ``angle_epsilon`` degrees and changed
+    gait values are sent. A full keyframe goes out every ``keyframe_interval``
+    messages and after the client's buffer dropped frames.
+    """
+    
+    def __init__(self, angle_epsilon: float = 0.5, keyframe_interval: int = 30):
+        self.angle_epsilon = angle_epsilon
+        self.keyframe_interval = keyframe_interval
+        self._angles: Optional[np.ndarray] = None
+        self._gait: Optional[np.ndarray] = None
+        self._phase = -1
+        self._since_keyframe = 0
+    
+    def request_keyframe(self):
+        self._angles = None
+    
+    def encode(self, record: FrameRecord) -> str:
+        keyframe = self._angles is None or self._since_keyframe >= self.keyframe_interval
+        message = {"f": record.frame_id, "t": record.timestamp, "flags": record.flags}
+        if keyframe:
+            message["k"] = 1
+            changed_angles = np.arange(len(record.angles))
+            changed_gait = np.arange(len(record.gait))
+            self._angles = record.angles.copy()
+            self._gait = record.gait.copy()
+            self._since_keyframe = 0
+        else:
+            # NaN != NaN, so treat "both missing" as unchanged explicitly
+            angle_delta = np.abs(record.angles - self._angles)
+            both_nan = np.isnan(record.angles) & np.isnan(self._angles)
+            changed_angles = np.flatnonzero(~both_nan & ~(angle_delta <= self.angle_epsilon))
+            self._angles[changed_angles] = record.angles[changed_angles]
+            gait_same = (record.gait == self._gait) | (np.isnan(record.gait) & np.isnan(self._gait))
+            changed_gait = np.flatnonzero(~gait_same)
+            self._gait[changed_gait] = record.gait[changed_gait]
+            self._since_keyframe += 1
+        if len(changed_angles):
+            message["a"] = {int(i): None if record.angles[i] != record.angles[i] else round(float(record.angles[i]), 2)
+                            for i in changed_angles}
+        if len(changed_gait):
+            message["g"] = {int(i): None if record.gait[i] != record.gait[i] else round(float(record.gait[i]), 4)
+                            for i in changed_gait}
+        if keyframe or record.phase != self._phase:
+            message["p"] = record.phase
+            self._phase = record.phase
+        return json.dumps(message, separators=(",", ":"))
+
+class ClientBuffer:
+    """Bounded per-client message buffer that drops the oldest entry when full"""
+    
+    def __init__(self, maxsize: int = 64):
+        self._items: Deque[FrameRecord] = deque(maxlen=max(1, maxsize))
+        self._ready = asyncio.Event()
+        self.dropped = 0
+        self.dropped_since_get = False
+        self.closed = False
+    
+    def put(self, record: FrameRecord):
+        if len(self._items) == self._items.maxlen:
+            self.dropped += 1
+            self.dropped_since_get = True
+        self._items.append(record)
+        self._ready.set()
+    
+    async def get(self) -> Optional[FrameRecord]:
+        """Next record, or None once the buffer is closed"""
+        while not self._items:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()
+    
+    def close(self):
+        self.closed = True
+        self._ready.set()
+    
+    def __len__(self) -> int:
+        return len(self._items)
+
+class AnalysisService:
+    """
+    Runs analysis on a video source and fans results out to subscribers
+    
+    All analyzer access (analyze_frame and snapshots) goes through one
+    worker thread, so MotionAnalyzer never sees concurrent calls.
+    """
+    
+    def __init__(self, source: Union[int, str], analyzer: Optional[MotionAnalyzer] = None,
+                 analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                 realtime: bool = True, max_frames: Optional[int] = None):
+        """
+        Args:
+            source: Camera index, video file or stream URL
+            analyzer: Analyzer to drive (built with defaults if None)
+            analysis_type: Type of analysis when building the analyzer
+            realtime: Pace file sources at their native frame rate
+            max_frames: Stop after this many frames (None runs until the source ends)
+        """
+        self.source = source
+        self.analyzer = analyzer or MotionAnalyzer(analysis_type)
+        self.realtime = realtime
+        self.max_frames = max_frames
+        self.joint_names = list(self.analyzer.joint_angle_table.names)
+        self.clients: Dict[int, ClientBuffer] = {}
+        self.frames_published = 0
+        self.finished = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis")
+        self._task: Optional[asyncio.Task] = None
+        self._next_client = 0
+    
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+    
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for buffer in self.clients.values():
+            buffer.close()
+        self._executor.shutdown(wait=True)
+    
+    def subscribe(self, buffer_size: int = 64) -> Tuple[int, ClientBuffer]:
+        """Register a client; once the source has finished its buffer starts out closed"""
+        client_id = self._next_client
+        self._next_client += 1
+        buffer = ClientBuffer(buffer_size)
+        if self.finished:
+            buffer.close()
+        self.clients[client_id] = buffer
+        metrics.set_gauge("api_clients", len(self.clients))
+        return client_id, buffer
+    
+    def unsubscribe(self, client_id: int):
+        buffer = self.clients.pop(client_id, None)
+        if buffer is not None:
+            buffer.close()
+        metrics.set_gauge("api_clients", len(self.clients))
+    
+    def _publish(self, record: FrameRecord):
+        self.frames_published += 1
+        for buffer in self.clients.values():
+            buffer.put(record)
+    
+    def _finish(self):
+        """Mark the source finished and close every buffer so streams end"""
+        self.finished = True
+        for buffer in self.clients.values():
+            buffer.close()
+    
+    def _open(self):
+        source = self.source
+        return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        cap = await loop.run_in_executor(self._executor, self._open)
+        if not cap.isOpened():
+            logger.error(f"Error opening video source {self.source}")
+            self._finish()
+            return
+        is_file = os.path.isfile(str(self.source))
+        frame_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file and self.realtime else 0.0
+        next_frame_at = time.perf_counter()
+        frame_id = 0
+        try:
+            while self.max_frames is None or frame_id < self.max_frames:
+                ret, frame = await loop.run_in_executor(self._executor, cap.read)
+                if not ret:
+                    break
+                motion_metrics = await loop.run_in_executor(
+                    self._executor, self.analyzer.analyze_frame, frame, frame_id)
+                self._publish(FrameRecord(motion_metrics, self.joint_names))
+                frame_id += 1
+                if frame_interval:
+                    next_frame_at += frame_interval
+                    delay = next_frame_at - time.perf_counter()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+        except Exception as e:
+            logger.error(f"Error in analysis loop: {e}")
+        finally:
+            self._finish()
+            await loop.run_in_executor(self._executor, cap.release)
+            logger.info(f"Analysis finished after {frame_id} frames")
+    
+    async def comprehensive_analysis(self) -> Dict:
+        """Snapshot taken on the analysis thread, between frames"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self.analyzer.get_comprehensive_analysis)
+    
+    def stats(self) -> Dict:
+        return {
+            "source": str(self.source),
+            "frames_published": self.frames_published,
+            "finished": self.finished,
+            "clients": {str(client_id): {"buffered": len(buffer), "dropped": buffer.dropped}
+                        for client_id, buffer in self.clients.items()},
+            "instrumentation": metrics.snapshot() if metrics.enabled else None
+        }
+
+def create_app(service: AnalysisService) -> FastAPI:
+    """FastAPI application exposing ``service``"""
+    
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        service.start()
+        yield
+        await service.stop()
+    
+    app = FastAPI(title="Intelligent Motion Analyzer", lifespan=lifespan)
+    
+    @app.get("/api/analysis")
+    async def get_analysis():
+        return await service.comprehensive_analysis()
+    
+    @app.get("/api/stats")
+    async def get_stats():
+        return service.stats()
+    
+    @app.websocket("/stream")
+    async def stream(websocket: WebSocket, encoding: str = "binary", buffer: int = 64):
+        if encoding not in ENCODINGS:
+            await websocket.close(code=1003)
+            return
+        await websocket.accept()
+        client_id, client_buffer = service.subscribe(buffer)
+        delta = DeltaEncoder() if encoding == "delta" else None
+        try:
+            await websocket.send_text(json.dumps({
+                "type": "hello",
+                "encoding": encoding,
+                "joint_names": service.joint_names,
+                "gait_fields": list(GAIT_FIELDS),
+                "gait_phases": list(GAIT_PHASES)
+            }))
+            while True:
+                record = await client_buffer.get()
+                if record is None:
+                    break
+                if encoding == "binary":
+                    await websocket.send_bytes(record.binary())
+                elif encoding == "json":
+                    await websocket.send_text(record.json())
+                else:
+                    if client_buffer.dropped_since_get:
+                        delta.request_keyframe()
+                    await websocket.send_text(delta.encode(record))
+                client_buffer.dropped_since_get = False
+            await websocket.close()  # Source finished
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.error(f"Error streaming to client {client_id}: {e}")
+        finally:
+            service.unsubscribe(client_id)
+    
+    return app
+
+def main():
+    """Serve live analysis results over WebSocket and HTTP"""
+    import argparse
+    import uvicorn
+    
+    parser = argparse.ArgumentParser(description="Intelligent Motion Analyzer - streaming API")
+    parser.add_argument("--input", "-i", default="0", help="Camera index, video file or stream URL")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to bind")
+    parser.add_argument("--port", "-p", type=int, default=8000, help="Port to listen on")
+    parser.add_argument("--analysis-type", "-t", choices=[e.value for e in AnalysisType],
+                        default=AnalysisType.GAIT_ANALYSIS.value, help="Type of analysis to perform")
+    parser.add_argument("--max-history-seconds", type=float, default=300.0,
+                        help="History window kept by the analyzer")
+    parser.add_argument("--no-realtime", action="store_true",
+                        help="Process file sources as fast as possible instead of at their frame rate")
+    args = parser.parse_args()
+    
+    analyzer = MotionAnalyzer(AnalysisType(args.analysis_type), max_history_seconds=args.max_history_seconds)
+    service = AnalysisService(args.input, analyzer, realtime=not args.no_realtime)
+    uvicorn.run(create_app(service), host=args.host, port=args.port)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Headless versus default throughput on a real video
+
+Runs the same video through MotionAnalyzer once with the legacy interactive
+settings (segmentation mask, pose overlay drawn on every frame) and once with
+the headless profile (no segmentation, no overlay, chosen tracking
+confidence), then reports end-to-end fps. Both profiles use the same model
+complexity, so the speedup is what headless mode itself saves; pass
+--legacy-model-complexity to also time the interactive profile with another
+model (main() used to default to 2) and report that change separately:
+    
+    python benchmarks/headless_fps.py --input walk.mp4 --frames 600
+    python benchmarks/headless_fps.py --input walk.mp4 --legacy-model-complexity 2 -o headless.json
+
+Needs MediaPipe with the ``solutions`` pose API and a video file.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import argparse
+import json
+import platform
+import time
+from typing import Dict, Optional
+
+import cv2
+
+import synthetic  # noqa: F401  (puts the package on sys.path)
+
+from motion_analyzer import AnalysisType, MotionAnalyzer, PoseEstimator  # noqa: E402
+from overlay import OverlayRenderer  # noqa: E402
+
+def run_profile(video_path: str, estimator: PoseEstimator, frames: Optional[int],
+                overlay: bool, display: bool) -> Dict:
+    """Decode, analyze and (optionally) draw every frame; returns throughput"""
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Cannot open {video_path}")
+    analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, max_history_frames=1,
+                              pose_estimator=estimator)
+    renderer = OverlayRenderer()  # The pose overlay main() draws before showing a frame
+    frame_id = 0
+    detected = 0
+    start = time.perf_counter()
+    try:
+        while frames is None or frame_id < frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            motion_metrics = analyzer.analyze_frame(frame, frame_id)
+            detected += bool(motion_metrics.poses)
+            if overlay:
+                renderer.draw(frame, [motion_metrics])
+            if display:
+                cv2.imshow("Motion Analysis", frame)
+                cv2.waitKey(1)
+            frame_id += 1
+    finally:
+        cap.release()
+        if display:
+            cv2.destroyAllWindows()
+    seconds = time.perf_counter() - start
+    return {
+        "frames": frame_id,
+        "seconds": seconds,
+        "fps": frame_id / seconds if seconds > 0 else 0.0,
+        "detection_rate": detected / frame_id if frame_id else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless vs default pose pipeline throughput")
+    parser.add_argument("--input", "-i", required=True, help="Video file to analyze")
+    parser.add_argument("--frames", "-n", type=int, default=None,
+                        help="Frames per profile (default: the whole video)")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1,
+                        help="Model used by both profiles")
+    parser.add_argument("--legacy-model-complexity", type=int, choices=[0, 1, 2], default=None,
+                        help="Also time the default profile with this model, reported separately")
+    parser.add_argument("--min-tracking-confidence", type=float, default=0.5,
+                        help="Tracking threshold used by the headless profile")
+    parser.add_argument("--display", action="store_true",
+                        help="Also show frames in the default profile, as main() does")
+    parser.add_argument("--output", "-o", default="headless_fps.json", help="Where to write results")
+    args = parser.parse_args()
+    
+    profiles = {
+        "default": (lambda: PoseEstimator(model_complexity=args.model_complexity), True, args.display),
+        "headless": (lambda: PoseEstimator(model_complexity=args.model_complexity,
+                                           min_tracking_confidence=args.min_tracking_confidence,
+                                           enable_segmentation=False), False, False)
+    }
+    if args.legacy_model_complexity is not None:
+        profiles["default_legacy_model"] = (
+            lambda: PoseEstimator(model_complexity=args.legacy_model_complexity), True, args.display)
+    results = {}
+    for name, (make_estimator, overlay, display) in profiles.items():
+        results[name] = run_profile(args.input, make_estimator(), args.frames, overlay, display)
+        print(f"{name:10s} {results[name]['fps']:8.1f} fps   "
+              f"{results[name]['frames']} frames   detection rate {results[name]['detection_rate']:.2f}")
+    
+    speedup = results["headless"]["fps"] / results["default"]["fps"] if results["default"]["fps"] else 0.0
+    print(f"\nHeadless speedup (model complexity {args.model_complexity} in both): {speedup:.2f}x")
+    model_speedup = None
+    if "default_legacy_model" in results and results["default_legacy_model"]["fps"]:
+        model_speedup = results["default"]["fps"] / results["default_legacy_model"]["fps"]
+        print(f"Model complexity {args.legacy_model_complexity} -> {args.model_complexity} "
+              f"speedup: {model_speedup:.2f}x")
+    
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "input": args.input,
+                "model_complexity": args.model_complexity,
+                "legacy_model_complexity": args.legacy_model_complexity,
+                "min_tracking_confidence": args.min_tracking_confidence,
+                "opencv": cv2.__version__,
+                "platform": platform.platform(),
+                "timestamp": time.time()
+            },
+            "profiles": results,
+            "speedup": speedup,
+            "model_speedup": model_speedup
+        }, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for the Intelligent Motion Analyzer
+
+Runs every analysis stage on synthetic landmark sequences (no camera or
+model weights needed) and reports throughput and per-frame latency
+percentiles per stage. Each stage also reports its peak resident memory and
+how far that peak rose above the RSS at the stage start, sampled on a
+background thread; --trace-memory adds peak Python allocations (tracemalloc,
+slower). Results are written as JSON and can be compared against a previous
+run to catch regressions:
+    
+    python benchmarks/performance_test.py --frames 100000 --output bench.json
+    python benchmarks/performance_test.py --frames 100000 --compare bench.json
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from synthetic import SyntheticPoseEstimator, iter_walking_chunks
+
+from motion_analyzer import (  # noqa: E402  (path set up by synthetic)
+    AnalysisType, BiomechanicalAnalyzer, GaitAnalyzer, LandmarkSet, MotionAnalyzer
+)
+from result_writer import BinaryResultSink, NdjsonResultSink  # noqa: E402
+
+class StageResult:
+    """Timing samples and totals for one benchmark stage"""
+    
+    def __init__(self, name: str, n_frames: int, max_samples: int):
+        self.name = name
+        self.n_frames = n_frames
+        self.sample_every = max(1, math.ceil(n_frames / max_samples))
+        self.samples = np.empty(min(n_frames, max_samples) + 1, dtype=np.float64)
+        self.sample_count = 0
+        self.frames = 0
+        self.seconds = 0.0
+        self.peak_memory_bytes: Optional[int] = None
+        self.peak_rss_mb: Optional[float] = None
+        self.rss_growth_mb: Optional[float] = None
+    
+    def add_sample(self, seconds: float):
+        if self.sample_count < self.samples.shape[0]:
+            self.samples[self.sample_count] = seconds
+            self.sample_count += 1
+    
+    def to_dict(self) -> Dict:
+        samples = self.samples[:self.sample_count] * 1e6
+        result = {
+            "frames": self.frames,
+            "seconds": self.seconds,
+            "fps": self.frames / self.seconds if self.seconds > 0 else 0.0
+        }
+        if samples.size:
+            p50, p90, p99 = np.percentile(samples, [50, 90, 99])
+            result.update({"p50_us": p50, "p90_us": p90, "p99_us": p99, "max_us": float(samples.max())})
+        if self.peak_rss_mb is not None:
+            result["peak_rss_mb"] = self.peak_rss_mb
+            result["rss_growth_mb"] = self.rss_growth_mb
+        if self.peak_memory_bytes is not None:
+            result["peak_traced_mb"] = self.peak_memory_bytes / 2**20
+        return result
+
+def _peak_rss_mb() -> float:
+    """Peak resident set size of the whole process so far (not of one stage)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes elsewhere
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def _current_rss_mb() -> Optional[float]:
+    """Current resident set size, or None where /proc is unavailable"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except (OSError, ValueError, IndexError):
+        return None
+
+class RssSampler:
+    """
+    Peak process RSS while a stage runs
+    
+    Polls /proc/self/statm on a background thread every ``interval``
+    seconds. Without /proc the peak falls back to ru_maxrss, which only
+    shows growth when the stage raises the process-wide peak.
+    """
+    
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.start_mb = 0.0
+        self.peak_mb = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def __enter__(self):
+        current = _current_rss_mb()
+        if current is None:
+            self.start_mb = self.peak_mb = _peak_rss_mb()
+        else:
+            self.start_mb = self.peak_mb = current
+            self._thread = threading.Thread(target=self._poll, name="rss-sampler", daemon=True)
+            self._thread.start()
+        return self
+    
+    def _poll(self):
+        while not self._stop.wait(self.interval):
+            self.peak_mb = max(self.peak_mb, _current_rss_mb() or 0.0)
+    
+    def __exit__(self, exc_type, exc, tb):
+        if self._thread is None:
+            self.peak_mb = _peak_rss_mb()
+        else:
+            self._stop.set()
+            self._thread.join()
+            self.peak_mb = max(self.peak_mb, _current_rss_mb() or 0.0)
+    
+    @property
+    def growth_mb(self) -> float:
+        return max(0.0, self.peak_mb - self.start_mb)
+
+def run_per_frame(stage: StageResult, chunks: Iterator[np.ndarray],
+                  process: Callable[[LandmarkSet, int], object]):
+    """Time ``process`` on every frame, sampling individual latencies"""
+    perf_counter = time.perf_counter
+    frame_id = 0
+    every = stage.sample_every
+    for chunk in chunks:
+        start = perf_counter()
+        for row in chunk:
+            if frame_id % every == 0:
+                t0 = perf_counter()
+                process(LandmarkSet(row), frame_id)
+                stage.add_sample(perf_counter() - t0)
+            else:
+                process(LandmarkSet(row), frame_id)
+            frame_id += 1
+        stage.seconds += perf_counter() - start
+    stage.frames = frame_id
+
+def bench_joint_angles(stage: StageResult, args):
+    estimator = SyntheticPoseEstimator()
+    run_per_frame(stage, iter_walking_chunks(args.frames, args.chunk_size),
+                  lambda landmarks, frame_id: estimator.calculate_joint_angles(landmarks))
+
+def bench_joint_angles_batch(stage: StageResult, args):
+    estimator = SyntheticPoseEstimator()
+    for chunk in iter_walking_chunks(args.frames, args.chunk_size):
+        start = time.perf_counter()
+        estimator.calculate_joint_angles_batch(chunk)
+        elapsed = time.perf_counter() - start
+        stage.seconds += elapsed
+        stage.frames += chunk.shape[0]
+        stage.add_sample(elapsed / chunk.shape[0])  # Amortized per-frame latency
+
+def bench_gait(stage: StageResult, args):
+    analyzer = GaitAnalyzer()
+    run_per_frame(stage, iter_walking_chunks(args.frames, args.chunk_size), analyzer.analyze_gait)
+
+def bench_analyze_frame(stage: StageResult, args):
+    """End to end through MotionAnalyzer.analyze_frame with the synthetic estimator"""
+    analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, max_history_frames=args.history,
+                              pose_estimator=SyntheticPoseEstimator())
+    every = stage.sample_every
+    start = time.perf_counter()
+    for frame_id in range(args.frames):
+        if frame_id % every == 0:
+            t0 = time.perf_counter()
+            analyzer.analyze_frame(None, frame_id)
+            stage.add_sample(time.perf_counter() - t0)
+        else:
+            analyzer.analyze_frame(None, frame_id)
+    stage.seconds = time.perf_counter() - start
+    stage.frames = args.frames
+
+def _metrics_chunks(args) -> Iterator[List]:
+    """Per-chunk MotionMetrics lists, produced outside the timed region"""
+    analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, max_history_frames=1,
+                              pose_estimator=SyntheticPoseEstimator())
+    frame_id = 0
+    for chunk in iter_walking_chunks(args.frames, min(args.chunk_size, 10_000)):
+        metrics = []
+        for row in chunk:
+            metrics.append(analyzer.analyze_landmarks(LandmarkSet(row), frame_id, frame_id / 30.0))
+            frame_id += 1
+        yield metrics
+
+def bench_injury_risk(stage: StageResult, args):
+    """Full-history assess_injury_risk over a window of ``--history`` frames"""
+    history = []
+    for metrics in _metrics_chunks(args):
+        history.extend(metrics)
+        if len(history) >= args.history:
+            break
+    history = history[:args.history]
+    analyzer = BiomechanicalAnalyzer()
+    repeats = max(1, min(20, args.frames // max(1, len(history))))
+    for _ in range(repeats):
+        start = time.perf_counter()
+        analyzer.assess_injury_risk(history)
+        elapsed = time.perf_counter() - start
+        stage.seconds += elapsed
+        stage.frames += len(history)
+        stage.add_sample(elapsed / len(history))
+
+def _bench_sink(stage: StageResult, args, make_sink):
+    sink = make_sink()
+    every = stage.sample_every
+    for metrics in _metrics_chunks(args):
+        start = time.perf_counter()
+        for m in metrics:
+            if stage.frames % every == 0:
+                t0 = time.perf_counter()
+                sink.write(m)
+                stage.add_sample(time.perf_counter() - t0)
+            else:
+                sink.write(m)
+            stage.frames += 1
+        stage.seconds += time.perf_counter() - start
+    start = time.perf_counter()
+    sink.close({})
+    stage.seconds += time.perf_counter() - start
+
+def bench_export_ndjson(stage: StageResult, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        _bench_sink(stage, args, lambda: NdjsonResultSink(os.path.join(tmp, "results.ndjson")))
+
+def bench_export_binary(stage: StageResult, args):
+    with tempfile.TemporaryDirectory() as tmp:
+        _bench_sink(stage, args, lambda: BinaryResultSink(os.path.join(tmp, "session")))
+
+STAGES = {
+    "joint_angles": bench_joint_angles,
+    "joint_angles_batch": bench_joint_angles_batch,
+    "gait": bench_gait,
+    "analyze_frame": bench_analyze_frame,
+    "injury_risk": bench_injury_risk,
+    "export_ndjson": bench_export_ndjson,
+    "export_binary": bench_export_binary
+}
+
+def run_benchmarks(args) -> Dict:
+    results = {}
+    for name in args.stages:
+        stage = StageResult(name, args.frames, args.max_samples)
+        if args.trace_memory:
+            tracemalloc.start()
+        try:
+            with RssSampler() as rss:
+                STAGES[name](stage, args)
+        finally:
+            if args.trace_memory:
+                stage.peak_memory_bytes = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+        stage.peak_rss_mb = rss.peak_mb
+        stage.rss_growth_mb = rss.growth_mb
+        results[name] = stage.to_dict()
+        traced = (f"   peak traced {results[name]['peak_traced_mb']:8.1f} MB"
+                  if "peak_traced_mb" in results[name] else "")
+        print(f"{name:20s} {results[name]['fps']:>14,.0f} fps   "
+              f"p50 {results[name].get('p50_us', 0):8.1f} us   p99 {results[name].get('p99_us', 0):8.1f} us   "
+              f"peak RSS {stage.peak_rss_mb:8.1f} MB (+{stage.rss_growth_mb:.1f}){traced}")
+    print(f"process peak RSS {_peak_rss_mb():.1f} MB (all stages)")
+    return {
+        "meta": {
+            "frames": args.frames,
+            "chunk_size": args.chunk_size,
+            "history": args.history,
+            "trace_memory": args.trace_memory,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "timestamp": time.time(),
+            "process_peak_rss_mb": _peak_rss_mb()
+        },
+        "stages": results
+    }
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Return stages whose throughput dropped by more than ``tolerance``"""
+    regressions = []
+    if current["meta"].get("trace_memory") != baseline.get("meta", {}).get("trace_memory"):
+        print("warning: --trace-memory differs between runs; throughput is not comparable")
+    print(f"\n{'stage':20s} {'baseline fps':>14s} {'current fps':>14s} {'change':>8s}")
+    for name, result in current["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base or not base.get("fps"):
+            continue
+        change = (result["fps"] - base["fps"]) / base["fps"]
+        flag = "  REGRESSION" if change < -tolerance else ""
+        print(f"{name:20s} {base['fps']:>14,.0f} {result['fps']:>14,.0f} {change:>+8.1%}{flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Motion analyzer performance benchmarks")
+    parser.add_argument("--frames", "-n", type=int, default=10_000,
+                        help="Synthetic frames per stage (1k to 10M)")
+    parser.add_argument("--chunk-size", type=int, default=100_000,
+                        help="Frames generated per chunk (bounds memory)")
+    parser.add_argument("--history", type=int, default=10_000,
+                        help="History window for analyze_frame and injury_risk stages")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES),
+                        help="Stages to run")
+    parser.add_argument("--max-samples", type=int, default=100_000,
+                        help="Maximum latency samples kept per stage")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="Track peak Python allocations per stage (slows the run)")
+    parser.add_argument("--output", "-o", default="bench_results.json", help="Where to write results")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Allowed fractional throughput drop before flagging a regression")
+    args = parser.parse_args()
+    
+    results = run_benchmarks(args)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+    
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Pose backend comparison: throughput and latency per batch size and thread count
+
+Decodes frames once (so decoding is not timed), then runs every backend
+over the same frames for each batch size / thread count combination:
+    
+    python benchmarks/pose_backends.py --input walk.mp4 --frames 300 \\
+        --backends mediapipe tflite:pose_landmark_full.tflite onnx:pose_landmark_full.onnx \\
+        replay:walk_session --batch-sizes 1 4 16 --threads 1 4
+
+Backends are given as ``name`` or ``name:path`` (model file for tflite/onnx,
+saved landmarks for replay). Without ``--input`` random frames are used,
+which is enough for timing but not for detection rate.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import argparse
+import json
+import platform
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+import synthetic  # noqa: F401  (puts the package on sys.path)
+
+from pose_backends import make_pose_backend  # noqa: E402
+from video_source import VideoSource  # noqa: E402
+
+def load_frames(input_path: Optional[str], count: int, size: str, max_side: Optional[int]) -> List[np.ndarray]:
+    if input_path is None:
+        width, height = (int(part) for part in size.split("x"))
+        rng = np.random.default_rng(0)
+        return [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(count)]
+    with VideoSource(input_path, stop=count, max_side=max_side, reuse_buffers=False) as source:
+        return [frame.image for frame in source]
+
+def run_backend(spec: str, frames: List[np.ndarray], batch_size: int, threads: Optional[int]) -> Dict:
+    """Time one backend configuration over all frames"""
+    name, _, path = spec.partition(":")
+    backend = make_pose_backend(name, path or None, batch_size=batch_size, num_threads=threads)
+    try:
+        backend.detect_poses(frames[:batch_size])  # Model load and warm-up
+        if hasattr(backend, "reset"):
+            backend.reset()
+        if hasattr(backend, "seek"):
+            backend.seek(0)
+        
+        latencies = []
+        detected = 0
+        start = time.perf_counter()
+        for offset in range(0, len(frames), batch_size):
+            batch_start = time.perf_counter()
+            results = backend.detect_poses(frames[offset:offset + batch_size])
+            latencies.append(time.perf_counter() - batch_start)
+            detected += sum(result is not None for result in results)
+        seconds = time.perf_counter() - start
+    finally:
+        backend.close()
+    
+    latencies_ms = np.array(latencies) * 1000.0
+    return {
+        "backend": spec,
+        "batch_size": batch_size,
+        "threads": threads,
+        "frames": len(frames),
+        "fps": len(frames) / seconds if seconds > 0 else 0.0,
+        "batch_p50_ms": float(np.percentile(latencies_ms, 50)),
+        "batch_p99_ms": float(np.percentile(latencies_ms, 99)),
+        "detection_rate": detected / len(frames) if frames else 0.0
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pose backends on the same frames")
+    parser.add_argument("--input", "-i", default=None, help="Video file (default: random frames)")
+    parser.add_argument("--frames", "-n", type=int, default=300, help="Frames per configuration")
+    parser.add_argument("--size", default="1280x720", help="Random frame size when no --input is given")
+    parser.add_argument("--max-side", type=int, default=None, help="Downscale decoded frames to this longest side")
+    parser.add_argument("--backends", nargs="+", default=["mediapipe"],
+                        help="Backends as name or name:path (tflite/onnx model, replay landmarks)")
+    parser.add_argument("--batch-sizes", nargs="+", type=int, default=[1, 8])
+    parser.add_argument("--threads", nargs="+", type=int, default=[1],
+                        help="Thread counts for the tflite/onnx backends")
+    parser.add_argument("--output", "-o", default="pose_backends.json", help="Where to write results")
+    args = parser.parse_args()
+    
+    frames = load_frames(args.input, args.frames, args.size, args.max_side)
+    results = []
+    for spec in args.backends:
+        threaded = spec.split(":", 1)[0] in ("tflite", "onnx")
+        for batch_size in args.batch_sizes:
+            for threads in (args.threads if threaded else [None]):
+                result = run_backend(spec, frames, batch_size, threads)
+                results.append(result)
+                print(f"{spec:40.40s} batch {batch_size:3d}  threads {threads or '-':>3}  "
+                      f"{result['fps']:9.1f} fps  batch p50 {result['batch_p50_ms']:8.2f} ms  "
+                      f"p99 {result['batch_p99_ms']:8.2f} ms  detected {result['detection_rate']:.2f}")
+    
+    with open(args.output, "w") as f:
+        json.dump({
+            "meta": {
+                "input": args.input,
+                "frames": len(frames),
+                "frame_shape": list(frames[0].shape) if frames else None,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "timestamp": time.time()
+            },
+            "results": results
+        }, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
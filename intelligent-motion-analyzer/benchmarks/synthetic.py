@@ -0,0 +1,124 @@
+"""
+Synthetic landmark workloads for benchmarks
+
+Generates side-view walking sequences in MediaPipe's 33-landmark layout with
+simple forward kinematics, so the analysis stages can be exercised without a
+camera, a video file or model weights.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import os
+import sys
+from typing import Iterator, Optional
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from motion_analyzer import (  # noqa: E402
+    JointAngleTable, LANDMARK_FIELDS, LandmarkSet, NUM_LANDMARKS, PoseBackend
+)
+
+THIGH = 0.17
+SHANK = 0.16
+
+def walking_sequence(n_frames: int, fps: float = 30.0, cadence: float = 110.0,
+                     start_frame: int = 0, noise: float = 0.002,
+                     seed: Optional[int] = 0) -> np.ndarray:
+    """
+    Build an (n_frames, 33, 4) float32 walking sequence
+    
+    Args:
+        n_frames: Number of frames to generate
+        fps: Frame rate used to convert frame index to time
+        cadence: Steps per minute (two steps per gait cycle)
+        start_frame: Index of the first frame, so chunks line up seamlessly
+        noise: Standard deviation of Gaussian jitter on x/y/z
+        seed: Random seed for jitter and visibility
+    """
+    rng = np.random.default_rng(None if seed is None else seed + start_frame)
+    t = (start_frame + np.arange(n_frames)) / fps
+    phase = 2.0 * np.pi * (cadence / 120.0) * t
+    
+    out = np.zeros((n_frames, NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+    x = out[:, :, 0]
+    y = out[:, :, 1]
+    
+    # Head (facing +x) and torso
+    bob = 0.005 * np.cos(2.0 * phase)
+    x[:, 0], y[:, 0] = 0.52, 0.15 + bob
+    for index in range(1, 11):
+        x[:, index] = 0.50 + 0.004 * (index % 3)
+        y[:, index] = 0.14 + 0.01 * (index >= 9) + bob
+    x[:, 7], x[:, 8] = 0.49, 0.49  # Ears behind the nose
+    x[:, 11], y[:, 11] = 0.49, 0.30 + bob
+    x[:, 12], y[:, 12] = 0.51, 0.30 + bob
+    x[:, 23], y[:, 23] = 0.49, 0.55 + bob
+    x[:, 24], y[:, 24] = 0.51, 0.55 + bob
+    
+    for side, offset in ((0, 0.0), (1, np.pi)):
+        leg_phase = phase + offset
+        hip_angle = np.radians(22.0) * np.sin(leg_phase)
+        knee_flexion = np.radians(5.0 + 55.0 * np.clip(np.sin(leg_phase + 1.2), 0.0, None) ** 2)
+        hip, knee, ankle, heel, toe = (23 + side, 25 + side, 27 + side, 29 + side, 31 + side)
+        x[:, knee] = x[:, hip] + THIGH * np.sin(hip_angle)
+        y[:, knee] = y[:, hip] + THIGH * np.cos(hip_angle)
+        shank_angle = hip_angle - knee_flexion
+        x[:, ankle] = x[:, knee] + SHANK * np.sin(shank_angle)
+        y[:, ankle] = y[:, knee] + SHANK * np.cos(shank_angle)
+        x[:, heel] = x[:, ankle] - 0.02
+        y[:, heel] = y[:, ankle] + 0.015
+        x[:, toe] = x[:, ankle] + 0.045 * np.cos(shank_angle)
+        y[:, toe] = y[:, ankle] + 0.02
+        
+        # Arms swing opposite to the legs
+        shoulder, elbow, wrist = 11 + side, 13 + side, 15 + side
+        arm_angle = -np.radians(18.0) * np.sin(leg_phase)
+        x[:, elbow] = x[:, shoulder] + 0.13 * np.sin(arm_angle)
+        y[:, elbow] = y[:, shoulder] + 0.13 * np.cos(arm_angle)
+        x[:, wrist] = x[:, elbow] + 0.12 * np.sin(arm_angle - 0.3)
+        y[:, wrist] = y[:, elbow] + 0.12 * np.cos(arm_angle - 0.3)
+        for hand in (17 + side, 19 + side, 21 + side):
+            x[:, hand] = x[:, wrist] + 0.01
+            y[:, hand] = y[:, wrist] + 0.02
+    
+    out[:, :, 2] = 0.1 * (out[:, :, 0] - 0.5)
+    if noise:
+        out[:, :, :3] += rng.normal(0.0, noise, size=(n_frames, NUM_LANDMARKS, 3)).astype(np.float32)
+    out[:, :, 3] = rng.uniform(0.85, 1.0, size=(n_frames, NUM_LANDMARKS))
+    return out
+
+def iter_walking_chunks(n_frames: int, chunk_size: int = 100_000, **kwargs) -> Iterator[np.ndarray]:
+    """Yield a long walking sequence in chunks so memory stays bounded"""
+    for start in range(0, n_frames, chunk_size):
+        yield walking_sequence(min(chunk_size, n_frames - start), start_frame=start, **kwargs)
+
+class SyntheticPoseEstimator(PoseBackend):
+    """
+    Pose backend that replays synthetic landmarks instead of running a model
+    
+    detect_pose ignores the frame and returns the next generated pose, so
+    MotionAnalyzer.analyze_frame can be benchmarked end to end.
+    """
+    
+    def __init__(self, fps: float = 30.0, chunk_size: int = 4096,
+                 joint_angle_table: Optional[JointAngleTable] = None, **kwargs):
+        super().__init__(joint_angle_table)
+        self.fps = fps
+        self.chunk_size = chunk_size
+        self.kwargs = kwargs
+        self._chunk = np.empty((0, NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+        self._position = 0
+        self._frame = 0
+    
+    def detect_pose(self, frame: Optional[np.ndarray] = None) -> Optional[LandmarkSet]:
+        if self._position >= self._chunk.shape[0]:
+            self._chunk = walking_sequence(self.chunk_size, fps=self.fps,
+                                           start_frame=self._frame, **self.kwargs)
+            self._position = 0
+        landmarks = LandmarkSet(self._chunk[self._position])
+        self._position += 1
+        self._frame += 1
+        return landmarks
@@ -0,0 +1,506 @@
+#!/usr/bin/env python3
+"""
+Columnar session export and cross-session queries
+
+Nested JSON results cost a dict per landmark per frame to parse. This module
+flattens sessions into one table per session, one array per column:
+    
+    frame_ids, timestamps, detected     frame index, seconds, 0/1/2 (none/detected/interpolated)
+    angle_<joint>                       joint angles in degrees, NaN when missing
+    gait_<field>                        per-frame gait metrics, NaN when missing
+    gait_phase                          index into GAIT_PHASES, -1 without gait metrics
+    landmarks                           (frames, 33, 4) float32, zeros without a pose
+                                        (``lm_<index>_<field>`` columns in Parquet)
+
+Tables are written as uncompressed ``.npz`` (numpy only; postprocess.py and
+the replay pose backend read them directly) or ``.parquet`` (pandas with
+pyarrow). Queries load only the columns they touch and aggregate with numpy:
+    
+    python columnar.py export --input session_dir --output exports/walk_01.npz
+    python columnar.py query --inputs exports/ --column angle_right_knee --by-session
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+import re
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from motion_analyzer import (
+    DEFAULT_JOINT_ANGLES, GAIT_FIELDS, GAIT_PHASES, LANDMARK_FIELDS, LandmarkSet, MotionAnalyzer,
+    MotionMetrics, NUM_LANDMARKS
+)
+from result_writer import BinaryResultSink, ResultSink, SessionReader
+
+logger = logging.getLogger(__name__)
+
+_PHASE_CODES = {phase: code for code, phase in enumerate(GAIT_PHASES)}
+
+COLUMNAR_FORMATS = ("npz", "parquet")
+_LANDMARK_COLUMN = re.compile(r"lm_(\d+)_(\w+)$")
+
+def landmark_column_names() -> List[str]:
+    """Flat Parquet column names for the landmark array, in (landmark, field) order"""
+    return [f"lm_{index}_{field}" for index in range(NUM_LANDMARKS) for field in LANDMARK_FIELDS]
+
+class _GrowingArray:
+    """Row-appendable array that doubles its capacity when full"""
+    
+    def __init__(self, row_shape: Tuple[int, ...], dtype, fill=0, initial_capacity: int = 1024):
+        self._data = np.full((initial_capacity,) + row_shape, fill, dtype=dtype)
+        self._fill = fill
+        self.size = 0
+    
+    def next_row(self) -> np.ndarray:
+        """View of the next row (pre-filled with the fill value); counts it as appended"""
+        if self.size == self._data.shape[0]:
+            grown = np.full((self.size * 2,) + self._data.shape[1:], self._fill, dtype=self._data.dtype)
+            grown[:self.size] = self._data
+            self._data = grown
+        self.size += 1
+        return self._data[self.size - 1]
+    
+    def append(self, value):
+        self.next_row()
+        self._data[self.size - 1] = value
+    
+    def values(self) -> np.ndarray:
+        return self._data[:self.size]
+
+class SessionTableBuilder:
+    """Accumulates frames into the flat per-session columns"""
+    
+    def __init__(self, joint_names: Optional[Sequence[str]] = None):
+        self.joint_names = list(joint_names or [spec.name for spec in DEFAULT_JOINT_ANGLES])
+        self._joint_index = {name: i for i, name in enumerate(self.joint_names)}
+        self._frame_ids = _GrowingArray((), np.int64)
+        self._timestamps = _GrowingArray((), np.float64)
+        self._detected = _GrowingArray((), np.uint8)
+        self._landmarks = _GrowingArray((NUM_LANDMARKS, len(LANDMARK_FIELDS)), np.float32)
+        self._angles = _GrowingArray((len(self.joint_names),), np.float32, fill=np.nan)
+        self._gait = _GrowingArray((len(GAIT_FIELDS),), np.float32, fill=np.nan)
+        self._gait_phase = _GrowingArray((), np.int8, fill=-1)
+    
+    def __len__(self) -> int:
+        return self._frame_ids.size
+    
+    def append(self, frame_id: int, timestamp: float, detected: int,
+               landmarks: Optional[np.ndarray], angles: Dict[str, float],
+               gait_metrics: Optional[Dict] = None):
+        """
+        Add one frame
+        
+        Args:
+            frame_id: Frame identifier
+            timestamp: Frame time in seconds
+            detected: 0 no pose, 1 detected, 2 interpolated
+            landmarks: (33, 4) landmark array, or None without a pose
+            angles: Joint name to angle in degrees
+            gait_metrics: Gait metrics dict of the frame, if any
+        """
+        self._frame_ids.append(frame_id)
+        self._timestamps.append(timestamp)
+        self._detected.append(detected)
+        
+        landmark_row = self._landmarks.next_row()
+        if landmarks is not None:
+            landmark_row[...] = landmarks
+        
+        angle_row = self._angles.next_row()
+        for name, angle in angles.items():
+            index = self._joint_index.get(name)
+            if index is not None:
+                angle_row[index] = angle
+        
+        gait_row = self._gait.next_row()
+        phase = -1
+        if gait_metrics and "error" not in gait_metrics:
+            for index, field in enumerate(GAIT_FIELDS):
+                value = gait_metrics.get(field)
+                if value is not None:
+                    gait_row[index] = value
+            phase = _PHASE_CODES.get(gait_metrics.get("gait_phase"), 0)
+        self._gait_phase.append(phase)
+    
+    def append_metrics(self, metrics: MotionMetrics):
+        """Add one frame of MotionAnalyzer output (first pose only, as in binary sessions)"""
+        landmarks = None
+        detected = 0
+        if metrics.poses:
+            pose = metrics.poses[0]
+            pose_landmarks = pose["landmarks"]
+            if not isinstance(pose_landmarks, LandmarkSet):
+                pose_landmarks = LandmarkSet.from_landmarks(pose_landmarks)
+            landmarks = pose_landmarks.array
+            detected = 2 if pose.get("interpolated") else 1
+        self.append(metrics.frame_id, metrics.timestamp, detected, landmarks,
+                    {angle.joint_name: angle.angle_degrees for angle in metrics.joint_angles},
+                    metrics.gait_metrics)
+    
+    def append_dict(self, frame: Dict):
+        """Add one frame in the JSON/NDJSON result layout"""
+        landmarks = None
+        detected = 0
+        poses = frame.get("poses") or []
+        if poses:
+            landmarks = np.array([[landmark[field] for field in LANDMARK_FIELDS]
+                                  for landmark in poses[0]["landmarks"]], dtype=np.float32)
+            detected = 2 if poses[0].get("interpolated") else 1
+        self.append(frame["frame_id"], frame["timestamp"], detected, landmarks,
+                    {angle["joint"]: angle["angle"] for angle in frame.get("joint_angles", [])},
+                    frame.get("gait_metrics"))
+    
+    def columns(self) -> Dict[str, np.ndarray]:
+        """The flat table as column name to array"""
+        columns = {
+            "frame_ids": self._frame_ids.values(),
+            "timestamps": self._timestamps.values(),
+            "detected": self._detected.values(),
+            "landmarks": self._landmarks.values()
+        }
+        angles = self._angles.values()
+        for index, name in enumerate(self.joint_names):
+            columns[f"angle_{name}"] = angles[:, index]
+        gait = self._gait.values()
+        for index, field in enumerate(GAIT_FIELDS):
+            columns[f"gait_{field}"] = gait[:, index]
+        columns["gait_phase"] = self._gait_phase.values()
+        return columns
+
+def infer_columnar_format(path: str) -> str:
+    return "parquet" if path.lower().endswith(".parquet") else "npz"
+
+def write_columns(path: str, columns: Dict[str, np.ndarray], fmt: Optional[str] = None):
+    """
+    Write a flat session table
+    
+    Args:
+        path: Output .npz or .parquet file
+        columns: Column name to array, as built by SessionTableBuilder
+        fmt: "npz" or "parquet" (inferred from the path when omitted)
+    """
+    fmt = fmt or infer_columnar_format(path)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if fmt == "npz":
+        # Uncompressed so single columns load without inflating the rest
+        np.savez(path, **columns)
+    elif fmt == "parquet":
+        import pandas as pd
+        
+        flat = {name: values for name, values in columns.items() if name != "landmarks"}
+        landmarks = columns["landmarks"].reshape(len(columns["frame_ids"]), -1)
+        flat.update(zip(landmark_column_names(), landmarks.T))
+        pd.DataFrame(flat).to_parquet(path, index=False)
+    else:
+        raise ValueError(f"Unknown columnar format: {fmt}")
+
+def load_columns(path: str, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+    """
+    Read columns of a session table, touching only the requested ones
+    
+    Args:
+        path: .npz or .parquet session table
+        columns: Column names (all when None); ``landmarks`` and
+            ``lm_<index>_<field>`` work with either format
+    """
+    if infer_columnar_format(path) == "parquet":
+        import pandas as pd
+        
+        wanted = None
+        if columns is not None:
+            wanted = []
+            for name in columns:
+                wanted.extend(landmark_column_names() if name == "landmarks" else [name])
+        table = pd.read_parquet(path, columns=wanted)
+        result = {name: table[name].to_numpy() for name in table.columns
+                  if not _LANDMARK_COLUMN.match(name)}
+        if columns is None or "landmarks" in columns:
+            landmark_names = landmark_column_names()
+            if all(name in table.columns for name in landmark_names):
+                result["landmarks"] = table[landmark_names].to_numpy(np.float32).reshape(
+                    len(table), NUM_LANDMARKS, len(LANDMARK_FIELDS))
+        for name in columns or []:
+            if _LANDMARK_COLUMN.match(name):
+                result[name] = table[name].to_numpy()
+        return result
+    
+    with np.load(path) as data:
+        if columns is None:
+            return {name: data[name] for name in data.files}
+        result = {}
+        landmarks = None
+        for name in columns:
+            match = _LANDMARK_COLUMN.match(name)
+            if match and name not in data.files:
+                if landmarks is None:
+                    landmarks = data["landmarks"]
+                result[name] = landmarks[:, int(match.group(1)), LANDMARK_FIELDS.index(match.group(2))]
+            else:
+                result[name] = data[name]
+        return result
+
+class ColumnarResultSink(ResultSink):
+    """
+    Streams frames to a binary session and converts it to one .npz/.parquet table on close
+    
+    Frames are appended to ``<path>.session/`` as they arrive (see
+    BinaryResultSink), so memory stays flat during a run and a crash leaves
+    a session that ``columnar.py export`` can still convert. ``close``
+    writes the table from the memory-mapped columns and removes the session.
+    """
+    
+    def __init__(self, path: str, fmt: Optional[str] = None,
+                 joint_names: Optional[Sequence[str]] = None, flush_every: int = 30):
+        self.path = path
+        self.fmt = fmt or infer_columnar_format(path)
+        self.session_path = path + ".session"
+        self.session = BinaryResultSink(self.session_path, joint_names, flush_every)
+        self._closed = False
+    
+    def write(self, metrics: MotionMetrics):
+        self.session.write(metrics)
+    
+    def close(self, comprehensive_analysis: Optional[Dict] = None):
+        if self._closed:
+            return
+        self.session.close()
+        write_columns(self.path, _session_columns(SessionReader(self.session_path)), self.fmt)
+        shutil.rmtree(self.session_path, ignore_errors=True)
+        if comprehensive_analysis is not None:
+            with open(os.path.splitext(self.path)[0] + ".summary.json", "w") as f:
+                json.dump(comprehensive_analysis, f, indent=2, default=float)
+        self._closed = True
+
+def _session_columns(reader: SessionReader) -> Dict[str, np.ndarray]:
+    """Flat table straight from binary session columns; gait rows are joined by frame id"""
+    builder = SessionTableBuilder(reader.joint_names)
+    columns = builder.columns()  # Empty table, for names and dtypes
+    columns.update({
+        "frame_ids": np.array(reader.frame_ids),
+        "timestamps": np.array(reader.timestamps),
+        "detected": np.array(reader.column("detected")),
+        "landmarks": np.array(reader.landmarks)
+    })
+    angles = reader.angles
+    for index, name in enumerate(reader.joint_names):
+        columns[f"angle_{name}"] = np.array(angles[:, index])
+    
+    count = len(reader)
+    gait = np.full((count, len(GAIT_FIELDS)), np.nan, dtype=np.float32)
+    phase = np.full(count, -1, dtype=np.int8)
+    gait_path = os.path.join(reader.path, "gait.ndjson")
+    if count and os.path.exists(gait_path):
+        with open(gait_path) as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+        rows = [row for row in rows if "error" not in row]
+        if rows:
+            positions = np.searchsorted(columns["frame_ids"], [row["frame_id"] for row in rows])
+            for position, row in zip(positions, rows):
+                if position < count and columns["frame_ids"][position] == row["frame_id"]:
+                    gait[position] = [np.nan if row.get(field) is None else row[field]
+                                      for field in GAIT_FIELDS]
+                    phase[position] = _PHASE_CODES.get(row.get("gait_phase"), 0)
+    for index, field in enumerate(GAIT_FIELDS):
+        columns[f"gait_{field}"] = gait[:, index]
+    columns["gait_phase"] = phase
+    return columns
+
+def _iter_result_frames(path: str) -> Iterator[Dict]:
+    """Frame dicts from JSON or NDJSON results"""
+    with open(path) as f:
+        if path.lower().endswith((".ndjson", ".jsonl")):
+            for line in f:
+                if line.strip():
+                    frame = json.loads(line)
+                    if "frame_id" in frame:
+                        yield frame
+        else:
+            yield from json.load(f).get("frame_results", [])
+
+def export_session(input_path: str, output: str, fmt: Optional[str] = None) -> int:
+    """
+    Convert saved results to a columnar session table
+    
+    Args:
+        input_path: JSON/NDJSON results or binary session directory
+        output: .npz or .parquet file to write
+        fmt: "npz" or "parquet" (inferred from the output path when omitted)
+    
+    Returns:
+        Number of frames exported
+    """
+    if os.path.isdir(input_path):
+        columns = _session_columns(SessionReader(input_path))
+    else:
+        builder = SessionTableBuilder()
+        for frame in _iter_result_frames(input_path):
+            builder.append_dict(frame)
+        columns = builder.columns()
+    write_columns(output, columns, fmt)
+    return len(columns["frame_ids"])
+
+def export_history(analyzer: MotionAnalyzer, output: str, fmt: Optional[str] = None) -> int:
+    """Write an analyzer's in-memory motion_history as a columnar table; returns the frame count"""
+    builder = SessionTableBuilder(analyzer.joint_angle_table.names)
+    for motion_metrics in analyzer.iter_history():
+        builder.append_metrics(motion_metrics)
+    write_columns(output, builder.columns(), fmt)
+    return len(builder)
+
+def expand_session_paths(inputs: Sequence[str]) -> List[str]:
+    """Session tables from files and directories (searched one level deep), sorted"""
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            paths.extend(os.path.join(entry, name) for name in os.listdir(entry)
+                         if name.lower().endswith((".npz", ".parquet")))
+        else:
+            paths.append(entry)
+    return sorted(paths)
+
+def column_stats(values: np.ndarray) -> Dict[str, float]:
+    """Count, mean, std, min, percentiles and max of the non-NaN values"""
+    values = values[~np.isnan(values)] if values.dtype.kind == "f" else values
+    if values.size == 0:
+        return {"count": 0}
+    p5, p50, p95 = np.percentile(values, [5, 50, 95])
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        "std": float(values.std()),
+        "min": float(values.min()),
+        "p5": float(p5),
+        "p50": float(p50),
+        "p95": float(p95),
+        "max": float(values.max())
+    }
+
+class SessionQuery:
+    """
+    Vectorized queries over many columnar session tables
+    
+    Columns are loaded on first use (in parallel across files) and cached, so
+    repeated queries over the same columns only scan arrays in memory:
+        
+        query = SessionQuery(expand_session_paths(["exports/"]))
+        query.aggregate("angle_right_knee")                  # across all sessions
+        query.aggregate("gait_cadence", by_session=True)     # per session
+    """
+    
+    def __init__(self, paths: Sequence[str], pose_frames_only: bool = True,
+                 workers: Optional[int] = None):
+        """
+        Args:
+            paths: Session tables (.npz/.parquet)
+            pose_frames_only: Skip frames without a detected or interpolated pose
+            workers: Threads used to read files (default: min(32, cpus + 4))
+        """
+        self.paths = list(paths)
+        self.sessions = [os.path.splitext(os.path.basename(path))[0] for path in self.paths]
+        self.pose_frames_only = pose_frames_only
+        self.workers = workers
+        self._columns: Dict[str, List[np.ndarray]] = {}
+    
+    def _load(self, names: Sequence[str]):
+        missing = [name for name in names if name not in self._columns]
+        if self.pose_frames_only and "detected" not in self._columns and "detected" not in missing:
+            missing.append("detected")
+        if not missing:
+            return
+        
+        def read(path: str) -> Dict[str, np.ndarray]:
+            try:
+                return load_columns(path, missing)
+            except Exception as e:
+                logger.error(f"Error reading {path}: {e}")
+                return {}
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            tables = list(executor.map(read, self.paths))
+        for name in missing:
+            self._columns[name] = [table.get(name, np.zeros(0, dtype=np.float32)) for table in tables]
+    
+    def session_columns(self, name: str) -> List[np.ndarray]:
+        """Per-session arrays of one column (pose frames only unless disabled)"""
+        self._load([name])
+        arrays = self._columns[name]
+        if not self.pose_frames_only or name == "detected":
+            return arrays
+        return [values[detected > 0] if len(values) == len(detected) else values
+                for values, detected in zip(arrays, self._columns["detected"])]
+    
+    def column(self, name: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One column across all sessions
+        
+        Returns:
+            (values, session_index): concatenated values and, per row, the
+            index of its session in ``sessions``
+        """
+        arrays = self.session_columns(name)
+        if not arrays:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int32)
+        session_index = np.repeat(np.arange(len(arrays), dtype=np.int32), [len(a) for a in arrays])
+        return np.concatenate(arrays), session_index
+    
+    def aggregate(self, name: str, by_session: bool = False) -> Dict:
+        """
+        Summary statistics of a column
+        
+        Args:
+            name: Column name, e.g. ``angle_right_knee``, ``gait_cadence`` or ``lm_26_y``
+            by_session: Return statistics per session instead of pooled
+        """
+        if by_session:
+            return {session: column_stats(values)
+                    for session, values in zip(self.sessions, self.session_columns(name))}
+        return column_stats(self.column(name)[0])
+
+def main():
+    """Command-line entry point for columnar export and queries"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Columnar session export and cross-session queries")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = commands.add_parser("export", help="Convert saved results to a columnar table")
+    export_parser.add_argument("--input", "-i", required=True,
+                               help="Saved results (json/ndjson) or binary session directory")
+    export_parser.add_argument("--output", "-o", required=True, help="Output .npz or .parquet file")
+    export_parser.add_argument("--format", "-f", choices=COLUMNAR_FORMATS, default=None,
+                               help="Table format (default: inferred from the output path)")
+    
+    query_parser = commands.add_parser("query", help="Aggregate a column across session tables")
+    query_parser.add_argument("--inputs", nargs="+", required=True,
+                              help="Session tables or directories containing them")
+    query_parser.add_argument("--column", "-c", nargs="+", required=True,
+                              help="Columns to aggregate, e.g. angle_right_knee gait_cadence")
+    query_parser.add_argument("--by-session", action="store_true", help="Statistics per session")
+    query_parser.add_argument("--all-frames", action="store_true",
+                              help="Include frames without a pose")
+    query_parser.add_argument("--output", "-o", default=None, help="Also write the result as JSON")
+    args = parser.parse_args()
+    
+    if args.command == "export":
+        frames = export_session(args.input, args.output, args.format)
+        logger.info(f"Exported {frames} frames to {args.output}")
+        return
+    
+    query = SessionQuery(expand_session_paths(args.inputs), pose_frames_only=not args.all_frames)
+    result = {name: query.aggregate(name, by_session=args.by_session) for name in args.column}
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+if __name__ == "__main__":
+    main()
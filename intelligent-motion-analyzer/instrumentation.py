@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Low-overhead per-stage timing and metrics
+
+Disabled by default. While disabled, ``metrics.stage(...)`` returns a shared
+no-op context manager and ``@metrics.timed(...)`` wrappers only test a flag,
+so the instrumented code paths cost a few hundred nanoseconds per frame.
+    
+    from instrumentation import metrics
+    metrics.enable()
+    metrics.serve(9100)          # Prometheus text at http://127.0.0.1:9100/metrics
+    ...
+    metrics.snapshot()           # In-process dict view
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (100 us .. 2.5 s)
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with Prometheus-compatible buckets"""
+    
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # Last bucket is +Inf
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+    
+    def observe(self, seconds: float):
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+    
+    def quantile(self, q: float) -> float:
+        """Estimate a quantile by linear interpolation inside its bucket"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= target and bucket_count:
+                low = self.buckets[index - 1] if index > 0 else 0.0
+                high = self.buckets[index] if index < len(self.buckets) else self.max
+                return low + (high - low) * (target - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.max
+    
+    def to_dict(self) -> Dict:
+        return {
+            "count": self.count,
+            "mean_ms": 1000.0 * self.total / self.count if self.count else 0.0,
+            "p50_ms": 1000.0 * self.quantile(0.5),
+            "p90_ms": 1000.0 * self.quantile(0.9),
+            "p99_ms": 1000.0 * self.quantile(0.99),
+            "max_ms": 1000.0 * self.max
+        }
+
+class _NoopStage:
+    """Shared do-nothing context manager used while instrumentation is disabled"""
+    
+    __slots__ = ()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+_NOOP_STAGE = _NoopStage()
+
+class _TimedStage:
+    __slots__ = ("_histogram", "_start")
+    
+    def __init__(self, histogram: LatencyHistogram):
+        self._histogram = histogram
+    
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start)
+        return False
+
+class Instrumentation:
+    """Registry of stage histograms, counters and gauges"""
+    
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.counters: Dict[str, int] = {}
+        self.gauges: Dict[str, float] = {}
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+    
+    def enable(self):
+        self.enabled = True
+        self.reset()
+    
+    def disable(self):
+        self.enabled = False
+    
+    def reset(self):
+        with self._lock:
+            self.histograms.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            self.started_at = time.time()
+    
+    def _histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self.histograms.setdefault(name, LatencyHistogram())
+        return histogram
+    
+    def stage(self, name: str):
+        """Context manager timing one stage; a shared no-op when disabled"""
+        if not self.enabled:
+            return _NOOP_STAGE
+        return _TimedStage(self._histogram(name))
+    
+    def timed(self, name: str) -> Callable:
+        """Decorator timing every call of a function as stage ``name``"""
+        def decorator(function: Callable) -> Callable:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                finally:
+                    self._histogram(name).observe(time.perf_counter() - start)
+            return wrapper
+        return decorator
+    
+    def observe(self, name: str, seconds: float):
+        if self.enabled:
+            self._histogram(name).observe(seconds)
+    
+    def inc(self, name: str, amount: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + amount
+    
+    def set_gauge(self, name: str, value: float):
+        if self.enabled:
+            self.gauges[name] = value
+    
+    def snapshot(self) -> Dict:
+        """Current metrics: per-stage latency summaries, counters, gauges and rates"""
+        elapsed = max(time.time() - self.started_at, 1e-9)
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+            histograms = dict(self.histograms)
+        frames = counters.get("frames_analyzed", 0)
+        return {
+            "enabled": self.enabled,
+            "uptime_seconds": elapsed,
+            "fps": frames / elapsed,
+            "detection_rate": counters.get("poses_detected", 0) / frames if frames else 0.0,
+            "stages": {name: histogram.to_dict() for name, histogram in histograms.items()},
+            "counters": counters,
+            "gauges": gauges
+        }
+    
+    def to_prometheus(self, prefix: str = "motion_analyzer") -> str:
+        """Render metrics in the Prometheus text exposition format"""
+        lines: List[str] = []
+        with self._lock:
+            histograms = sorted(self.histograms.items())
+            counters = sorted(self.counters.items())
+            gauges = sorted(self.gauges.items())
+        
+        lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+        for name, histogram in histograms:
+            cumulative = 0
+            for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {histogram.total}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {histogram.count}')
+        for name, value in counters:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            lines.append(f"{prefix}_{name}_total {value}")
+        for name, value in gauges:
+            lines.append(f"# TYPE {prefix}_{name} gauge")
+            lines.append(f"{prefix}_{name} {value}")
+        snapshot = self.snapshot()
+        lines.append(f"# TYPE {prefix}_fps gauge")
+        lines.append(f"{prefix}_fps {snapshot['fps']}")
+        lines.append(f"# TYPE {prefix}_detection_rate gauge")
+        lines.append(f"{prefix}_detection_rate {snapshot['detection_rate']}")
+        return "\n".join(lines) + "\n"
+    
+    def serve(self, port: int, host: str = "127.0.0.1") -> Tuple[str, int]:
+        """Expose /metrics (Prometheus text) and /snapshot (JSON) on a background thread"""
+        import json
+        
+        registry = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith("/metrics"):
+                    body = registry.to_prometheus().encode()
+                    content_type = "text/plain; version=0.0.4"
+                elif self.path.startswith("/snapshot"):
+                    body = json.dumps(registry.snapshot()).encode()
+                    content_type = "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            
+            def log_message(self, format, *args):
+                pass
+        
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        logger.info(f"Metrics available at http://{host}:{self._server.server_port}/metrics")
+        return host, self._server.server_port
+    
+    def shutdown(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server = None
+
+# Process-wide registry used by the analyzer modules
+metrics = Instrumentation()
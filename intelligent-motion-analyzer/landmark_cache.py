@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+On-disk landmark cache for offline re-analysis
+
+Pose inference dominates offline runs, yet reruns often change only the
+downstream logic (angles, gait, risk rules). The cache stores the landmark
+arrays of each analyzed frame range, keyed by the video's content hash and
+the pose model settings, so a rerun replays them without decoding or
+running inference.
+
+Layout::
+    
+    cache_dir/
+        hashes.json                     # path -> (size, mtime, content hash)
+        <key>/                          # <hash>-c<complexity>-d<conf>-t<conf>-v<version>,
+                                        # one entry per video + model settings
+            meta.json
+            000000000_000000900.npz     # landmarks/detected for frames [0, 900)
+            ...
+
+Ranges are stored as they complete, so an interrupted run leaves a usable
+partial entry and the next run only computes the missing ranges. Entries
+are evicted least recently used first once the cache exceeds ``max_bytes``.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+def video_content_hash(path: str, block_size: int = 8 << 20) -> str:
+    """SHA-256 of the file contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class LandmarkCache:
+    """Size-bounded LRU cache of per-range landmark arrays"""
+    
+    def __init__(self, cache_dir: str, max_bytes: int = 2 << 30):
+        """
+        Args:
+            cache_dir: Directory holding the cache (created if missing)
+            max_bytes: Total size above which least recently used entries are evicted
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        self._hashes_path = os.path.join(cache_dir, "hashes.json")
+        self._hashes: Dict[str, List] = self._load_json(self._hashes_path, {})
+    
+    @staticmethod
+    def _load_json(path: str, default):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return default
+    
+    @staticmethod
+    def _write_json(path: str, data):
+        tmp_path = f"{path}.tmp{os.getpid()}"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+    
+    def content_hash(self, video_path: str) -> str:
+        """Content hash of a video, reused while its size and mtime are unchanged"""
+        stat = os.stat(video_path)
+        path = os.path.abspath(video_path)
+        cached = self._hashes.get(path)
+        if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+            return cached[2]
+        digest = video_content_hash(video_path)
+        with self._lock:
+            self._hashes[path] = [stat.st_size, stat.st_mtime_ns, digest]
+            self._write_json(self._hashes_path, self._hashes)
+        return digest
+    
+    def key(self, video_path: str, model_complexity: int, min_detection_confidence: float,
+            min_tracking_confidence: float = 0.5) -> str:
+        """Cache key for a video and the pose model settings used on it"""
+        return (f"{self.content_hash(video_path)}-c{model_complexity}"
+                f"-d{min_detection_confidence:.3f}-t{min_tracking_confidence:.3f}-v{CACHE_VERSION}")
+    
+    def _entry_dir(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key)
+    
+    def meta(self, key: str) -> Dict:
+        """Metadata stored with an entry (empty if none)"""
+        return self._load_json(os.path.join(self._entry_dir(key), "meta.json"), {})
+    
+    def _segments(self, key: str) -> List[Tuple[int, int, str]]:
+        """Stored (start, stop, path) ranges of an entry, sorted by start"""
+        entry_dir = self._entry_dir(key)
+        if not os.path.isdir(entry_dir):
+            return []
+        segments = []
+        for name in os.listdir(entry_dir):
+            stem, extension = os.path.splitext(name)
+            if extension != ".npz" or name.startswith(".") or "_" not in stem:
+                continue
+            start, stop = (int(part) for part in stem.split("_", 1))
+            segments.append((start, stop, os.path.join(entry_dir, name)))
+        return sorted(segments)
+    
+    def plan(self, key: str, start: int, stop: int) -> List[Tuple[int, int, Optional[str]]]:
+        """
+        Split [start, stop) into cached and missing pieces
+        
+        Returns:
+            (piece_start, piece_stop, path) in frame order; path is None for
+            pieces that still need inference
+        """
+        pieces: List[Tuple[int, int, Optional[str]]] = []
+        position = start
+        for seg_start, seg_stop, path in self._segments(key):
+            if seg_stop <= position or seg_start >= stop:
+                continue
+            if seg_start > position:
+                pieces.append((position, seg_start, None))
+                position = seg_start
+            piece_stop = min(seg_stop, stop)
+            pieces.append((position, piece_stop, path))
+            position = piece_stop
+            if position >= stop:
+                break
+        if position < stop:
+            pieces.append((position, stop, None))
+        if any(path is not None for _, _, path in pieces):
+            self._touch(key)
+        return pieces
+    
+    def read(self, path: str, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Landmarks (n, 33, 4) and detection mask (n,) for [start, stop) of a stored range"""
+        seg_start = int(os.path.basename(path).split("_", 1)[0])
+        with np.load(path) as data:
+            landmarks = data["landmarks"][start - seg_start:stop - seg_start]
+            detected = data["detected"][start - seg_start:stop - seg_start]
+        return landmarks, detected
+    
+    def put(self, key: str, start: int, landmarks: np.ndarray, detected: np.ndarray,
+            meta: Optional[Dict] = None):
+        """Store the landmarks of frames [start, start + len(landmarks))"""
+        if not len(landmarks):
+            return
+        try:
+            entry_dir = self._entry_dir(key)
+            os.makedirs(entry_dir, exist_ok=True)
+            stop = start + len(landmarks)
+            path = os.path.join(entry_dir, f"{start:09d}_{stop:09d}.npz")
+            tmp_path = os.path.join(entry_dir, f".{start:09d}_{stop:09d}.tmp{os.getpid()}.npz")
+            np.savez(tmp_path, landmarks=landmarks, detected=detected)
+            os.replace(tmp_path, path)
+            if meta is not None:
+                self._write_json(os.path.join(entry_dir, "meta.json"), meta)
+            self._touch(key)
+            self.evict(keep=key)
+        except OSError as e:
+            logger.error(f"Error writing landmark cache entry {key}: {e}")
+    
+    def _touch(self, key: str):
+        try:
+            os.utime(self._entry_dir(key))
+        except OSError:
+            pass
+    
+    def entries(self) -> List[Tuple[float, int, str]]:
+        """(last_used, bytes, key) for every entry"""
+        result = []
+        for key in os.listdir(self.cache_dir):
+            entry_dir = self._entry_dir(key)
+            if not os.path.isdir(entry_dir):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+            result.append((os.stat(entry_dir).st_mtime, size, key))
+        return result
+    
+    def evict(self, keep: Optional[str] = None) -> int:
+        """Remove least recently used entries until the cache fits; returns bytes freed"""
+        with self._lock:
+            entries = sorted(self.entries())
+            total = sum(size for _, size, _ in entries)
+            freed = 0
+            evicted = set()
+            for _, size, key in entries:
+                if total - freed <= self.max_bytes:
+                    break
+                if key == keep:
+                    continue
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+                freed += size
+                evicted.add(key)
+                logger.info(f"Evicted landmark cache entry {key} ({size / 2**20:.1f} MB)")
+            if evicted:
+                self._forget_hashes(evicted, [key for _, _, key in entries if key not in evicted])
+            return freed
+    
+    def _forget_hashes(self, evicted: Set[str], remaining: List[str]):
+        """Drop hashes.json records of videos whose last entry was evicted"""
+        live = {key.split("-", 1)[0] for key in remaining}
+        stale = {key.split("-", 1)[0] for key in evicted} - live
+        kept = {path: record for path, record in self._hashes.items() if record[2] not in stale}
+        if len(kept) != len(self._hashes):
+            self._hashes = kept
+            self._write_json(self._hashes_path, self._hashes)
+    
+    def clear(self):
+        """Remove every cache entry"""
+        with self._lock:
+            for _, _, key in self.entries():
+                shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            self._hashes = {}
+            self._write_json(self._hashes_path, self._hashes)
+    
+    def stats(self) -> Dict:
+        entries = self.entries()
+        return {
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+            "timestamp": time.time()
+        }
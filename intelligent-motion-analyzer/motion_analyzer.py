@@ -7,20 +7,43 @@ Author: Krishna Gopal Madhavaram
 Email: krishnagopal596@gmail.com
 """
 
-import cv2
 import numpy as np
-import mediapipe as mp
 import json
+import operator
+import os
 import time
-from typing import List, Dict, Optional, Tuple
-from dataclasses import dataclass
+from typing import Deque, List, Dict, Optional, Sequence, Tuple, Union
+from dataclasses import dataclass, replace
+from collections import Counter, defaultdict, deque
 from enum import Enum
 import logging
 
+from instrumentation import metrics
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# OpenCV and MediaPipe take seconds to import and are only needed for
+# pose detection and video I/O; they are loaded on first use so landmark
+# post-processing never pays for them.
+cv2 = None
+mp = None
+
+def _import_cv2():
+    """Import OpenCV on first use"""
+    global cv2
+    if cv2 is None:
+        import cv2
+    return cv2
+
+def _import_mediapipe():
+    """Import MediaPipe on first use"""
+    global mp
+    if mp is None:
+        import mediapipe as mp
+    return mp
+
 class AnalysisType(Enum):
     GAIT_ANALYSIS = "gait_analysis"
     POSE_ESTIMATION = "pose_estimation"
@@ -35,6 +58,240 @@ class PoseLandmark:
     z: float
     visibility: float
 
+NUM_LANDMARKS = 33
+LANDMARK_FIELDS = ("x", "y", "z", "visibility")
+_FIELD_INDEX = {name: i for i, name in enumerate(LANDMARK_FIELDS)}
+
+class LandmarkView:
+    """Read-only view of one landmark row inside a landmark array"""
+    
+    __slots__ = ("_data", "_index")
+    
+    def __init__(self, data: np.ndarray, index: int):
+        self._data = data
+        self._index = index
+    
+    @property
+    def x(self) -> float:
+        return float(self._data[self._index, 0])
+    
+    @property
+    def y(self) -> float:
+        return float(self._data[self._index, 1])
+    
+    @property
+    def z(self) -> float:
+        return float(self._data[self._index, 2])
+    
+    @property
+    def visibility(self) -> float:
+        return float(self._data[self._index, 3])
+    
+    def __getitem__(self, key: str) -> float:
+        # Dict-style access keeps callers of the old landmark dicts working
+        return float(self._data[self._index, _FIELD_INDEX[key]])
+    
+    def __repr__(self) -> str:
+        x, y, z, visibility = self._data[self._index].tolist()
+        return f"LandmarkView(x={x}, y={y}, z={z}, visibility={visibility})"
+
+class LandmarkSet:
+    """Compact pose representation: one contiguous float32 array of shape (33, 4)
+    
+    Columns are (x, y, z, visibility). Indexing returns a LandmarkView so
+    existing code such as ``landmarks[25].visibility`` keeps working without
+    materializing 33 Python objects per frame. ``interpolated`` marks sets
+    that were estimated between detections rather than detected.
+    """
+    
+    __slots__ = ("array", "interpolated")
+    
+    def __init__(self, array: np.ndarray, interpolated: bool = False):
+        array = np.asarray(array, dtype=np.float32)
+        if array.ndim != 2 or array.shape[1] != len(LANDMARK_FIELDS):
+            raise ValueError(f"Expected landmark array of shape (N, 4), got {array.shape}")
+        self.array = array
+        self.interpolated = interpolated
+    
+    @classmethod
+    def from_mediapipe(cls, landmark_list) -> "LandmarkSet":
+        """Build a landmark set from a MediaPipe NormalizedLandmarkList"""
+        return cls(np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmark_list.landmark],
+            dtype=np.float32
+        ))
+    
+    @classmethod
+    def from_landmarks(cls, landmarks: List[PoseLandmark]) -> "LandmarkSet":
+        """Build a landmark set from a list of PoseLandmark objects"""
+        return cls(np.array(
+            [(lm.x, lm.y, lm.z, lm.visibility) for lm in landmarks],
+            dtype=np.float32
+        ))
+    
+    def __len__(self) -> int:
+        return self.array.shape[0]
+    
+    def __getitem__(self, index: int) -> LandmarkView:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("landmark index out of range")
+        return LandmarkView(self.array, index)
+    
+    def __iter__(self):
+        for index in range(len(self)):
+            yield LandmarkView(self.array, index)
+    
+    def to_list(self) -> List[Dict[str, float]]:
+        """Convert to the list-of-dicts layout used in JSON output"""
+        return [dict(zip(LANDMARK_FIELDS, row)) for row in self.array.tolist()]
+
+class LandmarkHistory:
+    """Growable ring buffer of landmark arrays with shape (frames, 33, 4)
+    
+    Storage doubles as frames arrive. When ``max_frames`` is set the buffer
+    stops growing at that size and overwrites the oldest frame instead.
+    """
+    
+    def __init__(self, initial_capacity: int = 256, max_frames: Optional[int] = None,
+                 num_landmarks: int = NUM_LANDMARKS):
+        if max_frames is not None:
+            initial_capacity = min(initial_capacity, max_frames)
+        self.max_frames = max_frames
+        self.num_landmarks = num_landmarks
+        self._landmarks = np.zeros((initial_capacity, num_landmarks, len(LANDMARK_FIELDS)), dtype=np.float32)
+        self._frame_ids = np.zeros(initial_capacity, dtype=np.int64)
+        self._timestamps = np.zeros(initial_capacity, dtype=np.float64)
+        self._interpolated = np.zeros(initial_capacity, dtype=bool)
+        self._start = 0
+        self._size = 0
+    
+    @property
+    def capacity(self) -> int:
+        return self._landmarks.shape[0]
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def append(self, frame_id: int, timestamp: float, landmarks: LandmarkSet):
+        """Copy one frame of landmarks into the buffer"""
+        if self._size == self.capacity:
+            if self.max_frames is not None and self.capacity >= self.max_frames:
+                # Full ring: drop the oldest frame
+                self._start = (self._start + 1) % self.capacity
+                self._size -= 1
+            else:
+                self._grow()
+        
+        slot = (self._start + self._size) % self.capacity
+        self._landmarks[slot] = landmarks.array
+        self._frame_ids[slot] = frame_id
+        self._timestamps[slot] = timestamp
+        self._interpolated[slot] = landmarks.interpolated
+        self._size += 1
+    
+    def _grow(self):
+        new_capacity = self.capacity * 2
+        if self.max_frames is not None:
+            new_capacity = min(new_capacity, self.max_frames)
+        order = self._order()
+        landmarks = np.zeros((new_capacity,) + self._landmarks.shape[1:], dtype=np.float32)
+        frame_ids = np.zeros(new_capacity, dtype=np.int64)
+        timestamps = np.zeros(new_capacity, dtype=np.float64)
+        interpolated = np.zeros(new_capacity, dtype=bool)
+        landmarks[:self._size] = self._landmarks[order]
+        frame_ids[:self._size] = self._frame_ids[order]
+        timestamps[:self._size] = self._timestamps[order]
+        interpolated[:self._size] = self._interpolated[order]
+        self._landmarks, self._frame_ids, self._timestamps = landmarks, frame_ids, timestamps
+        self._interpolated = interpolated
+        self._start = 0
+    
+    def _order(self) -> np.ndarray:
+        return (self._start + np.arange(self._size)) % self.capacity
+    
+    def _ordered(self, buffer: np.ndarray) -> np.ndarray:
+        if self._start + self._size <= self.capacity:
+            return buffer[self._start:self._start + self._size]
+        return buffer[self._order()]
+    
+    @property
+    def landmarks(self) -> np.ndarray:
+        """Landmarks in frame order, shape (frames, 33, 4); a view when not wrapped"""
+        return self._ordered(self._landmarks)
+    
+    @property
+    def frame_ids(self) -> np.ndarray:
+        return self._ordered(self._frame_ids)
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._ordered(self._timestamps)
+    
+    def __getitem__(self, index: int) -> LandmarkSet:
+        """Copy of one frame's landmarks (ring slots are overwritten once the buffer wraps)"""
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("history index out of range")
+        slot = (self._start + index) % self.capacity
+        return LandmarkSet(self._landmarks[slot].copy(), interpolated=bool(self._interpolated[slot]))
+    
+    def popleft(self):
+        """Drop the oldest frame"""
+        if self._size:
+            self._start = (self._start + 1) % self.capacity
+            self._size -= 1
+    
+    def evict_before(self, timestamp: float):
+        """Drop frames recorded before ``timestamp``"""
+        while self._size and self._timestamps[self._start] < timestamp:
+            self.popleft()
+    
+    def clear(self):
+        self._start = 0
+        self._size = 0
+
+class RunningStats:
+    """Streaming mean/variance/min/max using Welford's algorithm, O(1) per update"""
+    
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+    
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+    
+    def update(self, value: float):
+        if value != value:  # Skip NaN from degenerate segments
+            return
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.count if self.count else 0.0
+    
+    def to_dict(self) -> Dict[str, float]:
+        if not self.count:
+            return {"count": 0}
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "variance": self.variance
+        }
+
 @dataclass
 class JointAngle:
     """Represents joint angle measurement"""
@@ -47,37 +304,130 @@ class MotionMetrics:
     """Container for motion analysis results"""
     frame_id: int
     timestamp: float
-    poses: List[Dict]
+    poses: List[Dict]  # each pose: {"landmarks": LandmarkSet, "interpolated": bool}
     joint_angles: List[JointAngle]
     gait_metrics: Optional[Dict] = None
     biomechanical_data: Optional[Dict] = None
 
-class PoseEstimator:
-    """Advanced pose estimation using MediaPipe with custom enhancements"""
+@dataclass(frozen=True)
+class JointAngleSpec:
+    """Angle at ``vertex`` between the segments to ``proximal`` and ``distal``"""
+    name: str
+    proximal: int
+    vertex: int
+    distal: int
+
+# Joint triplets evaluated by PoseEstimator.calculate_joint_angles
+DEFAULT_JOINT_ANGLES = (
+    JointAngleSpec("left_knee", 23, 25, 27),    # Hip, Knee, Ankle
+    JointAngleSpec("right_knee", 24, 26, 28),
+    JointAngleSpec("left_hip", 11, 23, 25),     # Shoulder, Hip, Knee
+    JointAngleSpec("right_hip", 12, 24, 26),
+    JointAngleSpec("left_ankle", 25, 27, 29),   # Knee, Ankle, Foot
+    JointAngleSpec("right_ankle", 26, 28, 30),
+)
+
+UPPER_BODY_JOINT_ANGLES = (
+    JointAngleSpec("left_elbow", 11, 13, 15),   # Shoulder, Elbow, Wrist
+    JointAngleSpec("right_elbow", 12, 14, 16),
+    JointAngleSpec("left_shoulder", 23, 11, 13),  # Hip, Shoulder, Elbow
+    JointAngleSpec("right_shoulder", 24, 12, 14),
+)
+
+class JointAngleTable:
+    """Vectorized joint angle engine driven by a table of JointAngleSpec triplets
+    
+    All joints of all frames are evaluated in a single NumPy pass, so adding
+    rows to the table costs no extra Python-level work per frame.
+    """
+    
+    def __init__(self, joints: Sequence[JointAngleSpec] = DEFAULT_JOINT_ANGLES,
+                 use_z: bool = False, chunk_size: int = 65536):
+        self.joints = tuple(joints)
+        self.names = [joint.name for joint in self.joints]
+        self.use_z = use_z
+        self.chunk_size = chunk_size
+        self._proximal = np.array([joint.proximal for joint in self.joints], dtype=np.intp)
+        self._vertex = np.array([joint.vertex for joint in self.joints], dtype=np.intp)
+        self._distal = np.array([joint.distal for joint in self.joints], dtype=np.intp)
     
-    def __init__(self, model_complexity: int = 2, min_detection_confidence: float = 0.7):
-        self.mp_pose = mp.solutions.pose
-        self.mp_drawing = mp.solutions.drawing_utils
-        self.mp_drawing_styles = mp.solutions.drawing_styles
+    def angles(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Calculate joint angles for a landmark tensor
         
-        self.pose = self.mp_pose.Pose(
-            static_image_mode=False,
-            model_complexity=model_complexity,
-            enable_segmentation=True,
-            min_detection_confidence=min_detection_confidence,
-            min_tracking_confidence=0.5
-        )
+        Args:
+            landmarks: Array of shape (N, 33, 4)
+            
+        Returns:
+            Array of shape (N, J) with angles in degrees (NaN for degenerate segments)
+        """
+        landmarks = np.asarray(landmarks)
+        angles = np.empty((landmarks.shape[0], len(self.joints)), dtype=np.float64)
+        # Work in chunks so temporaries stay bounded for very long sequences
+        for start in range(0, landmarks.shape[0], self.chunk_size):
+            stop = start + self.chunk_size
+            angles[start:stop] = self._angles(landmarks[start:stop])
+        return angles
+    
+    def _angles(self, landmarks: np.ndarray) -> np.ndarray:
+        coords = landmarks[..., :3 if self.use_z else 2]
+        vertex = coords[:, self._vertex].astype(np.float64)
+        v1 = coords[:, self._proximal] - vertex
+        v2 = coords[:, self._distal] - vertex
         
-        # Landmark indices for key joints
-        self.joint_connections = {
-            'left_leg': [23, 25, 27, 29, 31],  # Hip to foot
-            'right_leg': [24, 26, 28, 30, 32],
-            'left_arm': [11, 13, 15, 17, 19, 21],  # Shoulder to hand
-            'right_arm': [12, 14, 16, 18, 20, 22],
-            'spine': [11, 12, 23, 24]  # Shoulders and hips
-        }
+        dot = np.einsum("njk,njk->nj", v1, v2)
+        norms = np.sqrt(np.einsum("njk,njk->nj", v1, v1) * np.einsum("njk,njk->nj", v2, v2))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cos_angle = dot / norms
+        cos_angle = np.clip(cos_angle, -1.0, 1.0)  # Avoid numerical errors
+        return np.degrees(np.arccos(cos_angle))
+    
+    def confidences(self, landmarks: np.ndarray) -> np.ndarray:
+        """Visibility of each joint's vertex landmark, shape (N, J)"""
+        return np.asarray(landmarks)[:, self._vertex, 3]
+    
+    def joint_angles(self, landmarks: Union[LandmarkSet, np.ndarray, List[PoseLandmark]]) -> List[JointAngle]:
+        """JointAngle objects for a single frame of landmarks"""
+        frame = as_landmark_array(landmarks)[np.newaxis]
+        angles = self._angles(frame)[0]
+        confidences = self.confidences(frame)[0]
+        return [JointAngle(name, angle, confidence)
+                for name, angle, confidence in zip(self.names, angles.tolist(), confidences.tolist())]
+
+def as_landmark_array(landmarks: Union[LandmarkSet, np.ndarray, List[PoseLandmark]]) -> np.ndarray:
+    """Return the (33, 4) array behind any supported landmark container"""
+    if isinstance(landmarks, LandmarkSet):
+        return landmarks.array
+    if isinstance(landmarks, np.ndarray):
+        return landmarks
+    return LandmarkSet.from_landmarks(landmarks).array
+
+# Landmark indices for key joints
+JOINT_CONNECTIONS = {
+    'left_leg': [23, 25, 27, 29, 31],  # Hip to foot
+    'right_leg': [24, 26, 28, 30, 32],
+    'left_arm': [11, 13, 15, 17, 19, 21],  # Shoulder to hand
+    'right_arm': [12, 14, 16, 18, 20, 22],
+    'spine': [11, 12, 23, 24]  # Shoulders and hips
+}
+
+class PoseBackend:
+    """
+    Pose detection interface MotionAnalyzer depends on
+    
+    A backend turns BGR frames (or person crops) into 33-landmark sets in
+    MediaPipe's layout. Subclasses implement ``detect_pose``, ``detect_poses``
+    or both; ``batch_size`` is the number of frames a backend prefers per
+    ``detect_poses`` call (1 for frame-at-a-time backends).
+    """
+    
+    batch_size = 1
+    
+    def __init__(self, joint_angle_table: Optional[JointAngleTable] = None):
+        self.joint_angle_table = joint_angle_table or JointAngleTable()
+        self.joint_connections = {name: list(indices) for name, indices in JOINT_CONNECTIONS.items()}
     
-    def detect_pose(self, frame: np.ndarray) -> Optional[List[PoseLandmark]]:
+    def detect_pose(self, frame: np.ndarray) -> Optional[LandmarkSet]:
         """
         Detect human pose in the given frame
         
@@ -85,38 +435,32 @@ class PoseEstimator:
             frame: Input image frame (BGR format)
             
         Returns:
-            List of pose landmarks or None if no pose detected
+            LandmarkSet of shape (33, 4) or None if no pose detected
         """
-        try:
-            # Convert BGR to RGB
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            
-            # Process frame
-            results = self.pose.process(rgb_frame)
-            
-            if results.pose_landmarks:
-                landmarks = []
-                for landmark in results.pose_landmarks.landmark:
-                    landmarks.append(PoseLandmark(
-                        x=landmark.x,
-                        y=landmark.y,
-                        z=landmark.z,
-                        visibility=landmark.visibility
-                    ))
-                return landmarks
-            
-            return None
+        return self.detect_poses([frame])[0]
+    
+    def detect_poses(self, frames: Sequence[np.ndarray]) -> List[Optional[LandmarkSet]]:
+        """
+        Detect poses in a batch of consecutive frames
+        
+        The default runs the frames one at a time, in order; backends that
+        batch inference override it.
+        
+        Args:
+            frames: Input image frames (BGR format), in temporal order
             
-        except Exception as e:
-            logger.error(f"Error in pose detection: {e}")
-            return None
+        Returns:
+            One LandmarkSet (or None) per frame
+        """
+        return [self.detect_pose(frame) for frame in frames]
     
-    def calculate_joint_angles(self, landmarks: List[PoseLandmark]) -> List[JointAngle]:
+    @metrics.timed("joint_angles")
+    def calculate_joint_angles(self, landmarks: Union[LandmarkSet, List[PoseLandmark]]) -> List[JointAngle]:
         """
         Calculate joint angles from pose landmarks
         
         Args:
-            landmarks: List of pose landmarks
+            landmarks: Pose landmarks for a single frame
             
         Returns:
             List of joint angles
@@ -124,292 +468,778 @@ class PoseEstimator:
         joint_angles = []
         
         try:
-            # Calculate knee angles
-            left_knee_angle = self._calculate_angle(
-                landmarks[23], landmarks[25], landmarks[27]  # Hip, Knee, Ankle
-            )
-            right_knee_angle = self._calculate_angle(
-                landmarks[24], landmarks[26], landmarks[28]
-            )
-            
-            # Calculate hip angles
-            left_hip_angle = self._calculate_angle(
-                landmarks[11], landmarks[23], landmarks[25]  # Shoulder, Hip, Knee
-            )
-            right_hip_angle = self._calculate_angle(
-                landmarks[12], landmarks[24], landmarks[26]
-            )
-            
-            # Calculate ankle angles
-            left_ankle_angle = self._calculate_angle(
-                landmarks[25], landmarks[27], landmarks[29]  # Knee, Ankle, Foot
-            )
-            right_ankle_angle = self._calculate_angle(
-                landmarks[26], landmarks[28], landmarks[30]
-            )
-            
-            joint_angles.extend([
-                JointAngle("left_knee", left_knee_angle, landmarks[25].visibility),
-                JointAngle("right_knee", right_knee_angle, landmarks[26].visibility),
-                JointAngle("left_hip", left_hip_angle, landmarks[23].visibility),
-                JointAngle("right_hip", right_hip_angle, landmarks[24].visibility),
-                JointAngle("left_ankle", left_ankle_angle, landmarks[27].visibility),
-                JointAngle("right_ankle", right_ankle_angle, landmarks[28].visibility)
-            ])
+            joint_angles = self.joint_angle_table.joint_angles(landmarks)
             
         except Exception as e:
             logger.error(f"Error calculating joint angles: {e}")
         
         return joint_angles
     
-    def _calculate_angle(self, point1: PoseLandmark, point2: PoseLandmark, point3: PoseLandmark) -> float:
-        """Calculate angle between three points"""
+    def calculate_joint_angles_batch(self, landmarks: np.ndarray) -> np.ndarray:
+        """
+        Calculate joint angles for a whole landmark sequence in one pass
+        
+        Args:
+            landmarks: Landmark tensor of shape (N, 33, 4)
+            
+        Returns:
+            Angle matrix of shape (N, J) in degrees, columns ordered as
+            ``self.joint_angle_table.names``
+        """
+        return self.joint_angle_table.angles(landmarks)
+    
+    def close(self):
+        """Release model resources"""
+
+class PoseEstimator(PoseBackend):
+    """Advanced pose estimation using MediaPipe with custom enhancements"""
+    
+    def __init__(self, model_complexity: int = 2, min_detection_confidence: float = 0.7,
+                 joint_angle_table: Optional[JointAngleTable] = None,
+                 static_image_mode: bool = False,
+                 min_tracking_confidence: float = 0.5,
+                 enable_segmentation: bool = True):
+        """
+        Args:
+            model_complexity: MediaPipe pose model (0 lite, 1 full, 2 heavy)
+            min_detection_confidence: Person detection threshold
+            joint_angle_table: Joint angles to compute (defaults to the lower body)
+            static_image_mode: Detect on every frame instead of tracking
+            min_tracking_confidence: Landmark tracking threshold below which detection reruns
+            enable_segmentation: Also compute the segmentation mask (unused by the
+                analysis; disable it in headless/batch jobs)
+        """
+        super().__init__(joint_angle_table)
+        self._rgb_buffer: Optional[np.ndarray] = None
+        self._pose = None
+        self._pose_options = dict(
+            static_image_mode=static_image_mode,
+            model_complexity=model_complexity,
+            enable_segmentation=enable_segmentation,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence
+        )
+    
+    @property
+    def mp_pose(self):
+        return _import_mediapipe().solutions.pose
+    
+    @property
+    def pose(self):
+        """MediaPipe pose graph, built on the first detection"""
+        if self._pose is None:
+            self._pose = self.mp_pose.Pose(**self._pose_options)
+        return self._pose
+    
+    def detect_pose(self, frame: np.ndarray) -> Optional[LandmarkSet]:
+        """
+        Detect human pose in the given frame
+        
+        Args:
+            frame: Input image frame (BGR format)
+            
+        Returns:
+            LandmarkSet of shape (33, 4) or None if no pose detected
+        """
         try:
-            # Convert to numpy arrays for easier calculation
-            p1 = np.array([point1.x, point1.y])
-            p2 = np.array([point2.x, point2.y])
-            p3 = np.array([point3.x, point3.y])
+            # Convert BGR to RGB into a reused buffer
+            with metrics.stage("color_conversion"):
+                if self._rgb_buffer is None or self._rgb_buffer.shape != frame.shape:
+                    self._rgb_buffer = np.empty_like(frame)
+                cv = _import_cv2()
+                rgb_frame = cv.cvtColor(frame, cv.COLOR_BGR2RGB, dst=self._rgb_buffer)
             
-            # Calculate vectors
-            v1 = p1 - p2
-            v2 = p3 - p2
+            # Process frame
+            with metrics.stage("inference"):
+                results = self.pose.process(rgb_frame)
             
-            # Calculate angle
-            cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
-            cos_angle = np.clip(cos_angle, -1.0, 1.0)  # Avoid numerical errors
+            if results.pose_landmarks:
+                return LandmarkSet.from_mediapipe(results.pose_landmarks)
             
-            angle = np.arccos(cos_angle)
-            return np.degrees(angle)
+            return None
             
         except Exception as e:
-            logger.error(f"Error calculating angle: {e}")
-            return 0.0
+            logger.error(f"Error in pose detection: {e}")
+            return None
+    
+    def close(self):
+        if self._pose is not None:
+            self._pose.close()
+            self._pose = None
+
+@dataclass
+class GaitEvent:
+    """Heel strike or toe off of one foot"""
+    event: str        # "heel_strike" or "toe_off"
+    side: str         # "left" or "right"
+    frame_id: int
+    timestamp: float
+
+class StreamingExtremaDetector:
+    """
+    Online peak/trough detector with hysteresis, O(1) per sample
+    
+    A maximum is confirmed once the signal has fallen ``prominence`` below
+    the best candidate seen since the last minimum, and vice versa. The
+    threshold follows a fraction of the recent peak-to-trough swing, with
+    ``min_prominence`` as a floor, so it adapts to subject size in the image.
+    Nothing is reported until the signal has moved far enough to know which
+    way it is heading, so the first sample is never mistaken for an extreme.
+    """
+    
+    __slots__ = ("min_prominence", "relative_prominence", "_direction", "_high", "_low",
+                 "_last_extreme", "amplitude")
+    
+    def __init__(self, min_prominence: float = 0.01, relative_prominence: float = 0.35):
+        self.min_prominence = min_prominence
+        self.relative_prominence = relative_prominence
+        self.reset()
+    
+    def reset(self):
+        self._direction = 0  # +1 looking for a maximum, -1 for a minimum, 0 unknown
+        self._high: Optional[Tuple[float, int, float]] = None  # (value, frame_id, timestamp)
+        self._low: Optional[Tuple[float, int, float]] = None
+        self._last_extreme: Optional[float] = None
+        self.amplitude = 0.0
+    
+    def update(self, value: float, frame_id: int, timestamp: float) -> Optional[Tuple[str, int, float]]:
+        """
+        Feed one sample
+        
+        Returns:
+            ("max" | "min", frame_id, timestamp) of a newly confirmed extreme, else None
+        """
+        if self._high is None or value > self._high[0]:
+            self._high = (value, frame_id, timestamp)
+        if self._low is None or value < self._low[0]:
+            self._low = (value, frame_id, timestamp)
+        threshold = max(self.min_prominence, self.relative_prominence * self.amplitude)
+        
+        if self._direction >= 0 and self._high[0] - value >= threshold:
+            extreme, self._direction = "max", -1
+            confirmed = self._high
+        elif self._direction <= 0 and value - self._low[0] >= threshold:
+            extreme, self._direction = "min", 1
+            confirmed = self._low
+        else:
+            return None
+        
+        # Restart the search for the opposite extreme from the current sample
+        self._high = self._low = (value, frame_id, timestamp)
+        if self._last_extreme is None:
+            self._last_extreme = confirmed[0]
+            return None  # First turn only tells us the direction
+        swing = abs(confirmed[0] - self._last_extreme)
+        self.amplitude = swing if not self.amplitude else 0.8 * self.amplitude + 0.2 * swing
+        self._last_extreme = confirmed[0]
+        return extreme, confirmed[1], confirmed[2]
+
+# Per-frame scalar gait metrics, in the order GaitAnalyzer reports them; flat
+# exports (columnar.py) and the binary stream (api_server.py) use this order
+GAIT_FIELDS = ("step_length", "cadence", "stride_time", "stance_ratio", "symmetry_score")
+# Values of gait_phase (see GaitAnalyzer._detect_gait_phase); exports store the index
+GAIT_PHASES = ("unknown", "double_support", "left_single_support", "right_single_support", "flight")
 
 class GaitAnalyzer:
-    """Advanced gait analysis for movement pattern assessment"""
+    """
+    Streaming gait analysis for movement pattern assessment
     
-    def __init__(self):
-        self.step_history = []
-        self.stride_history = []
-        self.cadence_history = []
+    Heel and ankle trajectories are kept in a fixed-size ring buffer. Each
+    foot's horizontal heel position relative to the pelvis (signed by the
+    facing direction) is low-pass filtered and fed to a streaming extrema
+    detector: a forward peak is a heel strike and a backward trough is a toe
+    off. Cadence, step and stride times, stance/swing phases and left/right
+    symmetry are derived from those events, so every frame costs O(1) and
+    history is never rescanned. Assumes a roughly side-on camera view.
+    """
+    
+    TRAJECTORY_COLUMNS = ("timestamp", "left_heel_x", "left_heel_y", "right_heel_x", "right_heel_y",
+                          "left_ankle_x", "left_ankle_y", "right_ankle_x", "right_ankle_y",
+                          "left_signal", "right_signal")
+    SIDES = ("left", "right")
     
-    def analyze_gait(self, landmarks: List[PoseLandmark], frame_id: int) -> Dict:
+    def __init__(self, fps: float = 30.0, buffer_size: int = 256, cutoff_hz: float = 6.0,
+                 min_prominence: float = 0.01, min_visibility: float = 0.5,
+                 max_gap_seconds: float = 0.5, max_step_seconds: float = 2.0,
+                 window_steps: int = 8):
+        """
+        Args:
+            fps: Frame rate used to derive timestamps when none are given
+            buffer_size: Frames of heel/ankle trajectory kept in the ring buffer
+            cutoff_hz: Cut-off frequency of the low-pass filter on the foot signals
+            min_prominence: Smallest heel excursion (normalized image units) counted as an event
+            min_visibility: Frames whose hips or heels are less visible are skipped
+            max_gap_seconds: A longer gap between usable frames restarts event tracking
+            max_step_seconds: Longer intervals are not counted as steps or strides
+            window_steps: Number of recent steps used for cadence and symmetry
+        """
+        self.fps = fps
+        self.cutoff_hz = cutoff_hz
+        self.min_visibility = min_visibility
+        self.max_gap_seconds = max_gap_seconds
+        self.max_step_seconds = max_step_seconds
+        self.window_steps = window_steps
+        
+        self.step_history: Deque[Dict] = deque(maxlen=window_steps)
+        self.stride_history: Deque[Dict] = deque(maxlen=window_steps)
+        self.cadence_history: Deque[float] = deque(maxlen=window_steps)
+        self.events: Deque[GaitEvent] = deque(maxlen=4 * window_steps)
+        
+        self._trajectory = np.full((buffer_size, len(self.TRAJECTORY_COLUMNS)), np.nan)
+        self._trajectory_frames = np.full(buffer_size, -1, dtype=np.int64)  # frame_id per ring slot
+        self._detectors = [StreamingExtremaDetector(min_prominence) for _ in self.SIDES]
+        self._strike_times: Deque[float] = deque(maxlen=window_steps + 1)
+        self._reset_tracking()
+    
+    def _reset_tracking(self):
+        """Forget filter and event state, e.g. after the subject was lost"""
+        for detector in self._detectors:
+            detector.reset()
+        self._strike_times.clear()
+        self._filtered: List[Optional[float]] = [None, None]
+        self._facing = 0.0
+        self._last_time: Optional[float] = None
+        self._last_strike: List[Optional[GaitEvent]] = [None, None]
+        self._last_toe_off: List[Optional[GaitEvent]] = [None, None]
+        self._phase = ["unknown", "unknown"]
+    
+    @property
+    def trajectory(self) -> np.ndarray:
+        """Buffered trajectory rows, oldest first, columns as TRAJECTORY_COLUMNS"""
+        valid = np.flatnonzero(self._trajectory_frames >= 0)
+        order = valid[np.argsort(self._trajectory_frames[valid], kind="stable")]
+        return self._trajectory[order]
+    
+    def _trajectory_row(self, frame_id: int) -> Optional[np.ndarray]:
+        """Ring-buffer row for a recent frame, or None if already overwritten"""
+        slot = frame_id % self._trajectory.shape[0]
+        return self._trajectory[slot] if self._trajectory_frames[slot] == frame_id else None
+    
+    @metrics.timed("gait")
+    def analyze_gait(self, landmarks: Union[LandmarkSet, List[PoseLandmark]], frame_id: int,
+                     timestamp: Optional[float] = None) -> Dict:
         """
         Analyze gait pattern from pose landmarks
         
         Args:
             landmarks: Current frame pose landmarks
             frame_id: Frame identifier
+            timestamp: Capture time in seconds (defaults to frame_id / fps)
             
         Returns:
             Dictionary containing gait analysis results
         """
         try:
-            # Extract foot positions
-            left_foot = landmarks[31] if len(landmarks) > 31 else None
-            right_foot = landmarks[32] if len(landmarks) > 32 else None
-            
-            if not left_foot or not right_foot:
+            array = as_landmark_array(landmarks)
+            if array.shape[0] <= 32:
                 return {"error": "Insufficient landmark data"}
             
-            # Calculate step length
-            step_length = self._calculate_step_length(left_foot, right_foot)
-            
-            # Calculate cadence (steps per minute)
-            cadence = self._calculate_cadence(frame_id)
-            
-            # Calculate symmetry
-            symmetry_score = self._calculate_symmetry(landmarks)
-            
-            # Detect gait phases
-            gait_phase = self._detect_gait_phase(landmarks)
+            event_time = timestamp if timestamp is not None else frame_id / self.fps
+            new_events = self._update(array, frame_id, event_time)
             
             return {
-                "step_length": step_length,
-                "cadence": cadence,
-                "symmetry_score": symmetry_score,
-                "gait_phase": gait_phase,
+                "step_length": self._calculate_step_length(array[31], array[32]),
+                "cadence": self._calculate_cadence(frame_id),
+                "stride_time": self.stride_history[-1]["stride_time"] if self.stride_history else None,
+                "stance_ratio": self.stride_history[-1]["stance_ratio"] if self.stride_history else None,
+                "symmetry_score": self._calculate_symmetry(landmarks),
+                "gait_phase": self._detect_gait_phase(landmarks),
+                "left_phase": self._phase[0],
+                "right_phase": self._phase[1],
+                "events": [{"event": e.event, "side": e.side, "frame_id": e.frame_id,
+                            "timestamp": e.timestamp} for e in new_events],
                 "frame_id": frame_id,
-                "timestamp": time.time()
+                "timestamp": timestamp if timestamp is not None else time.time()
             }
             
         except Exception as e:
             logger.error(f"Error in gait analysis: {e}")
             return {"error": str(e)}
     
-    def _calculate_step_length(self, left_foot: PoseLandmark, right_foot: PoseLandmark) -> float:
+    def _update(self, array: np.ndarray, frame_id: int, timestamp: float) -> List[GaitEvent]:
+        """Filter the foot signals for one frame and run event detection"""
+        if min(array[23, 3], array[24, 3], array[29, 3], array[30, 3]) < self.min_visibility:
+            return []
+        if self._last_time is not None:
+            if timestamp <= self._last_time:
+                return []
+            if timestamp - self._last_time > self.max_gap_seconds:
+                self._reset_tracking()
+        dt = timestamp - self._last_time if self._last_time is not None else 1.0 / self.fps
+        self._last_time = timestamp
+        
+        # Facing direction from nose vs. ears, smoothed so one bad frame cannot flip it
+        facing = float(array[0, 0]) - 0.5 * float(array[7, 0] + array[8, 0])
+        self._facing = facing if not self._facing else 0.9 * self._facing + 0.1 * facing
+        sign = 1.0 if self._facing >= 0.0 else -1.0
+        pelvis_x = 0.5 * float(array[23, 0] + array[24, 0])
+        alpha = dt / (dt + 1.0 / (2.0 * np.pi * self.cutoff_hz))
+        
+        slot = frame_id % self._trajectory.shape[0]
+        self._trajectory_frames[slot] = frame_id
+        row = self._trajectory[slot]
+        row[0] = timestamp
+        row[1:5] = array[29, :2].tolist() + array[30, :2].tolist()
+        row[5:9] = array[27, :2].tolist() + array[28, :2].tolist()
+        
+        new_events = []
+        for side in range(2):
+            signal = sign * (float(array[29 + side, 0]) - pelvis_x)
+            previous = self._filtered[side]
+            filtered = signal if previous is None else previous + alpha * (signal - previous)
+            self._filtered[side] = filtered
+            row[9 + side] = filtered
+            
+            extreme = self._detectors[side].update(filtered, frame_id, timestamp)
+            if extreme is None:
+                continue
+            kind, event_frame, event_time = extreme
+            event = GaitEvent("heel_strike" if kind == "max" else "toe_off",
+                              self.SIDES[side], event_frame, event_time)
+            if kind == "max":
+                self._on_heel_strike(side, event)
+            else:
+                self._on_toe_off(side, event)
+            self.events.append(event)
+            new_events.append(event)
+        return new_events
+    
+    def _on_heel_strike(self, side: int, event: GaitEvent):
+        other = 1 - side
+        self._phase[side] = "stance"
+        
+        # Step: contralateral heel strike to this one
+        previous = self._last_strike[other]
+        if previous is not None and 0.0 < event.timestamp - previous.timestamp <= self.max_step_seconds:
+            row = self._trajectory_row(event.frame_id)
+            step_length = (abs(row[1] - row[3]) if row is not None else None)
+            self.step_history.append({
+                "side": event.side,
+                "frame_id": event.frame_id,
+                "timestamp": event.timestamp,
+                "step_time": event.timestamp - previous.timestamp,
+                "step_length": float(step_length) if step_length is not None else None
+            })
+        
+        # Stride: previous heel strike of the same foot to this one
+        previous = self._last_strike[side]
+        if previous is not None and 0.0 < event.timestamp - previous.timestamp <= 2 * self.max_step_seconds:
+            stride_time = event.timestamp - previous.timestamp
+            toe_off = self._last_toe_off[side]
+            stance_time = None
+            if toe_off is not None and previous.timestamp < toe_off.timestamp < event.timestamp:
+                stance_time = toe_off.timestamp - previous.timestamp
+            self.stride_history.append({
+                "side": event.side,
+                "timestamp": event.timestamp,
+                "stride_time": stride_time,
+                "stance_time": stance_time,
+                "swing_time": stride_time - stance_time if stance_time is not None else None,
+                "stance_ratio": stance_time / stride_time if stance_time is not None else None
+            })
+        
+        self._last_strike[side] = event
+        if self._strike_times and event.timestamp - self._strike_times[-1] > self.max_step_seconds:
+            self._strike_times.clear()
+        self._strike_times.append(event.timestamp)
+        if len(self._strike_times) >= 3:
+            span = self._strike_times[-1] - self._strike_times[0]
+            if span > 0:
+                self.cadence_history.append(60.0 * (len(self._strike_times) - 1) / span)
+    
+    def _on_toe_off(self, side: int, event: GaitEvent):
+        self._phase[side] = "swing"
+        self._last_toe_off[side] = event
+    
+    def _calculate_step_length(self, left_foot: np.ndarray, right_foot: np.ndarray) -> float:
         """Calculate step length between feet"""
         try:
-            distance = np.sqrt(
-                (left_foot.x - right_foot.x)**2 + 
-                (left_foot.y - right_foot.y)**2
-            )
-            return distance
-        except:
+            return float(np.hypot(left_foot[0] - right_foot[0], left_foot[1] - right_foot[1]))
+        except Exception:
             return 0.0
     
-    def _calculate_cadence(self, frame_id: int) -> float:
-        """Calculate cadence (steps per minute)"""
-        # Simplified implementation - would need more sophisticated tracking
-        return 120.0  # Placeholder
+    def _calculate_cadence(self, frame_id: int) -> Optional[float]:
+        """Cadence (steps per minute) over the recent heel strikes, None until known"""
+        return self.cadence_history[-1] if self.cadence_history else None
     
-    def _calculate_symmetry(self, landmarks: List[PoseLandmark]) -> float:
-        """Calculate gait symmetry score"""
+    def _calculate_symmetry(self, landmarks: Union[LandmarkSet, List[PoseLandmark]]) -> float:
+        """
+        Gait symmetry score (1.0 is perfectly symmetric)
+        
+        Ratio of the mean left and right step times over the recent steps.
+        Until both sides have a step, falls back to comparing knee heights.
+        """
         try:
-            # Compare left and right leg joint angles
+            totals = [0.0, 0.0]
+            counts = [0, 0]
+            for step in self.step_history:
+                side = 0 if step["side"] == "left" else 1
+                totals[side] += step["step_time"]
+                counts[side] += 1
+            if counts[0] and counts[1]:
+                left, right = totals[0] / counts[0], totals[1] / counts[1]
+                return min(left, right) / max(left, right)
+            
+            # Compare left and right leg joint positions
             left_knee = landmarks[25]
             right_knee = landmarks[26]
-            
-            # Calculate symmetry based on joint positions
             symmetry = 1.0 - abs(left_knee.y - right_knee.y)
             return max(0.0, min(1.0, symmetry))
-        except:
+        except Exception:
             return 0.5
     
-    def _detect_gait_phase(self, landmarks: List[PoseLandmark]) -> str:
-        """Detect current gait phase (stance, swing, etc.)"""
-        # Simplified implementation
-        return "stance"  # Placeholder
+    def _detect_gait_phase(self, landmarks: Union[LandmarkSet, List[PoseLandmark]]) -> str:
+        """
+        Current gait phase from the latest events of both feet
+        
+        Returns:
+            "double_support", "left_single_support" (right foot swinging),
+            "right_single_support", "flight" (running) or "unknown"
+        """
+        left, right = self._phase
+        if "unknown" in self._phase:
+            return "unknown"
+        if left == "stance" and right == "stance":
+            return "double_support"
+        if left == "stance":
+            return "left_single_support"
+        if right == "stance":
+            return "right_single_support"
+        return "flight"
 
-class BiomechanicalAnalyzer:
-    """Biomechanical analysis for injury risk assessment"""
+_RULE_OPERATORS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+@dataclass(frozen=True)
+class RiskRule:
+    """
+    One row of the injury-risk rule table
+    
+    ``metric`` is ``"angle:<joint_name>"`` for a joint angle in degrees or
+    ``"gait:<key>"`` for a gait metric. The factor is raised once the
+    condition ``metric <op> threshold`` has held for ``min_duration``
+    seconds; while raised it contributes ``weight`` to the risk score.
+    """
+    factor: str
+    metric: str
+    op: str
+    threshold: float
+    weight: float = 0.2
+    min_duration: float = 0.0
+    recommendations: Tuple[str, ...] = ()
+    
+    def __post_init__(self):
+        if self.op not in _RULE_OPERATORS:
+            raise ValueError(f"Unknown operator in risk rule {self.factor}: {self.op}")
+        if self.metric.split(":", 1)[0] not in ("angle", "gait") or ":" not in self.metric:
+            raise ValueError(f"Risk rule metric must be 'angle:<name>' or 'gait:<key>', got {self.metric}")
+    
+    @classmethod
+    def from_dict(cls, entry: Dict) -> "RiskRule":
+        """Build a rule from a JSON-style dict"""
+        entry = dict(entry)
+        entry["recommendations"] = tuple(entry.get("recommendations", ()))
+        return cls(**entry)
+
+_KNEE_RECOMMENDATIONS = ("Focus on hip strengthening exercises", "Practice proper landing mechanics")
+_GAIT_RECOMMENDATIONS = ("Work on balance and proprioception", "Consider physical therapy assessment")
+
+# Thresholds applied by BiomechanicalAnalyzer
+DEFAULT_RISK_RULES = (
+    RiskRule("excessive_knee_valgus_left", "angle:left_knee", "<", 160.0,
+             recommendations=_KNEE_RECOMMENDATIONS),
+    RiskRule("excessive_knee_valgus_right", "angle:right_knee", "<", 160.0,
+             recommendations=_KNEE_RECOMMENDATIONS),
+    RiskRule("gait_asymmetry", "gait:symmetry_score", "<", 0.8,
+             recommendations=_GAIT_RECOMMENDATIONS),
+)
+
+def load_risk_rules(path: str) -> Tuple[RiskRule, ...]:
+    """Load a rule table from a JSON file holding a list of RiskRule fields"""
+    with open(path) as f:
+        return tuple(RiskRule.from_dict(entry) for entry in json.load(f))
+
+class _RuleState:
+    """Running counters for one rule"""
+    
+    __slots__ = ("frames", "seconds", "run_seconds", "episodes", "active", "level", "last_value")
     
     def __init__(self):
-        self.risk_factors = []
-        self.movement_patterns = []
+        self.frames = 0          # Frames where the condition held
+        self.seconds = 0.0       # Time the condition held
+        self.run_seconds = 0.0   # Length of the current uninterrupted run
+        self.episodes = 0        # Times the factor was raised
+        self.active = False      # Raised right now
+        self.level = 0.0         # 1 while raised, then decays with the half-life
+        self.last_value: Optional[float] = None
+
+class BiomechanicalAnalyzer:
+    """
+    Incremental injury risk assessment driven by a declarative rule table
     
-    def assess_injury_risk(self, motion_data: List[MotionMetrics]) -> Dict:
+    Frames are folded in as they arrive with ``update`` in O(rules). Per
+    rule it keeps frame counts, seconds the condition held and episodes. A
+    raised factor contributes its full weight to the risk score; after it
+    clears, the contribution decays with ``decay_half_life``. ``current_assessment`` reads those
+    counters in O(rules), independent of session length.
+    """
+    
+    def __init__(self, rules: Sequence[RiskRule] = DEFAULT_RISK_RULES,
+                 decay_half_life: float = 30.0, max_frame_gap: float = 1.0):
         """
-        Assess injury risk based on movement patterns
-        
         Args:
-            motion_data: List of motion metrics over time
-            
-        Returns:
-            Dictionary containing injury risk assessment
+            rules: Risk rule table
+            decay_half_life: Seconds for a cleared factor's contribution to halve
+            max_frame_gap: Longest time credited between two consecutive frames
         """
+        self.rules = tuple(rules)
+        self.decay_half_life = decay_half_life
+        self.max_frame_gap = max_frame_gap
+        self._metrics = [tuple(rule.metric.split(":", 1)) for rule in self.rules]
+        self._operators = [_RULE_OPERATORS[rule.op] for rule in self.rules]
+        self.reset()
+    
+    def reset(self):
+        """Forget all accumulated state"""
+        self.rule_states = {rule.factor: _RuleState() for rule in self.rules}
+        self.risk_factor_counts: Counter = Counter()
+        self.frames_assessed = 0
+        self.last_timestamp: Optional[float] = None
+    
+    def update(self, motion_metrics: MotionMetrics):
+        """Fold one frame into the running rule state in O(rules)"""
+        timestamp = motion_metrics.timestamp
+        dt = 0.0
+        if self.last_timestamp is not None:
+            dt = min(max(timestamp - self.last_timestamp, 0.0), self.max_frame_gap)
+        self.last_timestamp = timestamp
+        self.frames_assessed += 1
+        decay = 0.5 ** (dt / self.decay_half_life) if self.decay_half_life > 0 else 0.0
+        
+        angles = {angle.joint_name: angle.angle_degrees for angle in motion_metrics.joint_angles}
+        gait = motion_metrics.gait_metrics or {}
+        for rule, (source, key), compare in zip(self.rules, self._metrics, self._operators):
+            value = angles.get(key) if source == "angle" else gait.get(key)
+            state = self.rule_states[rule.factor]
+            state.last_value = value
+            holds = isinstance(value, (int, float)) and value == value and compare(value, rule.threshold)
+            if holds:
+                state.frames += 1
+                state.seconds += dt
+                state.run_seconds += dt
+                if not state.active and state.run_seconds >= rule.min_duration:
+                    state.active = True
+                    state.episodes += 1
+                if state.active:
+                    self.risk_factor_counts[rule.factor] += 1
+            else:
+                state.run_seconds = 0.0
+                state.active = False
+            state.level = 1.0 if state.active else state.level * decay
+    
+    def current_assessment(self) -> Dict:
+        """Injury risk assessment from the running rule state, O(rules)"""
         try:
-            # Analyze movement patterns
-            risk_factors = self._identify_risk_factors(motion_data)
-            
-            # Calculate overall risk score
-            risk_score = self._calculate_risk_score(risk_factors)
-            
-            # Generate recommendations
-            recommendations = self._generate_recommendations(risk_factors)
-            
+            risk_factors = [rule.factor for rule in self.rules if self.rule_states[rule.factor].episodes]
+            active = [rule.factor for rule in self.rules if self.rule_states[rule.factor].active]
             return {
-                "overall_risk_score": risk_score,
+                "overall_risk_score": self._calculate_risk_score(),
                 "risk_factors": risk_factors,
-                "recommendations": recommendations,
+                "active_risk_factors": active,
+                "risk_factor_counts": dict(self.risk_factor_counts),
+                "risk_factor_details": {
+                    factor: {
+                        "frames": state.frames,
+                        "seconds": state.seconds,
+                        "episodes": state.episodes,
+                        "active": state.active,
+                        "level": state.level
+                    }
+                    for factor, state in self.rule_states.items()
+                },
+                "recommendations": self._generate_recommendations(risk_factors),
                 "assessment_timestamp": time.time()
             }
-            
         except Exception as e:
             logger.error(f"Error in injury risk assessment: {e}")
             return {"error": str(e)}
     
-    def _identify_risk_factors(self, motion_data: List[MotionMetrics]) -> List[str]:
-        """Identify potential injury risk factors"""
-        risk_factors = []
+    def assess_injury_risk(self, motion_data: List[MotionMetrics]) -> Dict:
+        """
+        Assess injury risk for a batch of frames
         
-        try:
-            for metrics in motion_data:
-                # Check for excessive knee valgus
-                for angle in metrics.joint_angles:
-                    if angle.joint_name == "left_knee" and angle.angle_degrees < 160:
-                        risk_factors.append("excessive_knee_valgus_left")
-                    elif angle.joint_name == "right_knee" and angle.angle_degrees < 160:
-                        risk_factors.append("excessive_knee_valgus_right")
-                
-                # Check for asymmetry
-                if metrics.gait_metrics and metrics.gait_metrics.get("symmetry_score", 1.0) < 0.8:
-                    risk_factors.append("gait_asymmetry")
+        Uses a fresh copy of the rule engine, so this analyzer's running
+        state is untouched. Live callers should use ``update`` and
+        ``current_assessment`` instead of re-assessing the whole history.
+        
+        Args:
+            motion_data: List of motion metrics over time
             
-            return list(set(risk_factors))  # Remove duplicates
+        Returns:
+            Dictionary containing injury risk assessment
+        """
+        try:
+            engine = BiomechanicalAnalyzer(self.rules, self.decay_half_life, self.max_frame_gap)
+            for motion_metrics in motion_data:
+                engine.update(motion_metrics)
+            return engine.current_assessment()
             
         except Exception as e:
-            logger.error(f"Error identifying risk factors: {e}")
-            return []
+            logger.error(f"Error in injury risk assessment: {e}")
+            return {"error": str(e)}
     
-    def _calculate_risk_score(self, risk_factors: List[str]) -> float:
-        """Calculate overall injury risk score (0-1)"""
-        if not risk_factors:
-            return 0.0
-        
-        # Simple scoring based on number of risk factors
-        base_score = len(risk_factors) * 0.2
-        return min(1.0, base_score)
+    def _calculate_risk_score(self) -> float:
+        """Weighted sum of the factor levels, capped at 1"""
+        score = sum(rule.weight * self.rule_states[rule.factor].level for rule in self.rules)
+        return min(1.0, score)
     
     def _generate_recommendations(self, risk_factors: List[str]) -> List[str]:
-        """Generate recommendations based on risk factors"""
-        recommendations = []
-        
-        if "excessive_knee_valgus" in str(risk_factors):
-            recommendations.append("Focus on hip strengthening exercises")
-            recommendations.append("Practice proper landing mechanics")
-        
-        if "gait_asymmetry" in risk_factors:
-            recommendations.append("Work on balance and proprioception")
-            recommendations.append("Consider physical therapy assessment")
-        
+        """Recommendations of the raised rules, in table order without repeats"""
+        raised = set(risk_factors)
+        recommendations: List[str] = []
+        for rule in self.rules:
+            if rule.factor in raised:
+                recommendations.extend(r for r in rule.recommendations if r not in recommendations)
         return recommendations
 
 class MotionAnalyzer:
-    """Main motion analysis orchestrator"""
+    """Main motion analysis orchestrator
     
-    def __init__(self, analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS):
+    History can be bounded with ``max_history_frames`` and/or
+    ``max_history_seconds``; older frames are evicted as new ones arrive.
+    Session aggregates (joint angle statistics, detection and risk-factor
+    counts) are updated incrementally per frame and cover the whole session,
+    so summaries are O(1) to query regardless of the history window.
+    
+    An optional ``landmark_filter`` (see smoothing.py) smooths landmarks
+    between detection and analysis; it keeps state, so use one per stream.
+    """
+    
+    def __init__(self, analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                 max_history_frames: Optional[int] = None,
+                 max_history_seconds: Optional[float] = None,
+                 pose_estimator: Optional[PoseBackend] = None,
+                 joint_angle_table: Optional[JointAngleTable] = None,
+                 landmark_filter=None,
+                 risk_rules: Sequence[RiskRule] = DEFAULT_RISK_RULES):
         self.analysis_type = analysis_type
-        self.pose_estimator = PoseEstimator()
+        self.landmark_filter = landmark_filter
+        self._pose_estimator = pose_estimator
+        if joint_angle_table is None:
+            joint_angle_table = pose_estimator.joint_angle_table if pose_estimator else JointAngleTable()
+        self.joint_angle_table = joint_angle_table
         self.gait_analyzer = GaitAnalyzer()
-        self.biomechanical_analyzer = BiomechanicalAnalyzer()
-        self.motion_history = []
+        self.biomechanical_analyzer = BiomechanicalAnalyzer(risk_rules)
+        self.max_history_frames = max_history_frames
+        self.max_history_seconds = max_history_seconds
+        self.motion_history: Deque[MotionMetrics] = deque(maxlen=max_history_frames)
+        self.landmark_history = LandmarkHistory(max_frames=max_history_frames)
+        
+        # Running session aggregates
+        self.angle_stats: Dict[str, RunningStats] = defaultdict(RunningStats)
+        self.frames_analyzed = 0
+        self.poses_detected = 0
+        self.first_timestamp: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+    
+    @property
+    def pose_estimator(self) -> PoseBackend:
+        """Pose backend (MediaPipe unless one was given), built on first use so landmark-only analysis skips the model graph"""
+        if self._pose_estimator is None:
+            self._pose_estimator = PoseEstimator()
+        return self._pose_estimator
     
-    def analyze_frame(self, frame: np.ndarray, frame_id: int) -> MotionMetrics:
+    @metrics.timed("analyze_frame")
+    def analyze_frame(self, frame: np.ndarray, frame_id: int,
+                      timestamp: Optional[float] = None) -> MotionMetrics:
         """
         Analyze a single frame for motion metrics
         
         Args:
             frame: Input image frame
             frame_id: Frame identifier
+            timestamp: Capture time of the frame (defaults to now)
             
         Returns:
             MotionMetrics object with analysis results
         """
+        # Detect pose
+        landmarks = self.pose_estimator.detect_pose(frame)
+        return self.analyze_landmarks(landmarks, frame_id, timestamp)
+    
+    @metrics.timed("analyze_batch")
+    def analyze_frames(self, frames: Sequence[np.ndarray], frame_ids: Sequence[int],
+                       timestamps: Optional[Sequence[float]] = None) -> List[MotionMetrics]:
+        """
+        Analyze a batch of consecutive frames with one batched pose detection call
+        
+        Args:
+            frames: Input image frames, in temporal order
+            frame_ids: Frame identifier of each frame
+            timestamps: Capture time of each frame (defaults to now)
+            
+        Returns:
+            MotionMetrics per frame
+        """
+        batch_landmarks = self.pose_estimator.detect_poses(frames)
+        if timestamps is None:
+            timestamps = [None] * len(frames)
+        return [self.analyze_landmarks(landmarks, frame_id, timestamp)
+                for landmarks, frame_id, timestamp in zip(batch_landmarks, frame_ids, timestamps)]
+    
+    def analyze_landmarks(self, landmarks: Optional[LandmarkSet], frame_id: int,
+                          timestamp: Optional[float] = None) -> MotionMetrics:
+        """
+        Run the analysis stages on landmarks that were already detected
+        
+        Args:
+            landmarks: Detected landmarks, or None if no pose was found
+            frame_id: Frame identifier
+            timestamp: Capture time of the frame (defaults to now)
+            
+        Returns:
+            MotionMetrics object with analysis results
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        
         try:
-            # Detect pose
-            landmarks = self.pose_estimator.detect_pose(frame)
+            self.frames_analyzed += 1
+            metrics.inc("frames_analyzed")
             
             if landmarks is None:
                 return MotionMetrics(
                     frame_id=frame_id,
-                    timestamp=time.time(),
+                    timestamp=timestamp,
                     poses=[],
                     joint_angles=[]
                 )
             
+            # Temporal smoothing before any angle math
+            if self.landmark_filter is not None:
+                with metrics.stage("smoothing"):
+                    landmarks = self.landmark_filter.filter(landmarks, timestamp)
+            
             # Calculate joint angles
-            joint_angles = self.pose_estimator.calculate_joint_angles(landmarks)
+            with metrics.stage("joint_angles"):
+                joint_angles = self.joint_angle_table.joint_angles(landmarks)
             
             # Perform gait analysis
             gait_metrics = None
             if self.analysis_type == AnalysisType.GAIT_ANALYSIS:
-                gait_metrics = self.gait_analyzer.analyze_gait(landmarks, frame_id)
+                gait_metrics = self.gait_analyzer.analyze_gait(landmarks, frame_id, timestamp)
             
             # Create motion metrics
             motion_metrics = MotionMetrics(
                 frame_id=frame_id,
-                timestamp=time.time(),
-                poses=[{
-                    "landmarks": [{"x": lm.x, "y": lm.y, "z": lm.z, "visibility": lm.visibility} 
-                               for lm in landmarks]
-                }],
+                timestamp=timestamp,
+                poses=[{"landmarks": landmarks, "interpolated": landmarks.interpolated}],
                 joint_angles=joint_angles,
                 gait_metrics=gait_metrics
             )
             
             # Store in history
-            self.motion_history.append(motion_metrics)
+            with metrics.stage("history"):
+                self._record(motion_metrics, landmarks)
             
             return motion_metrics
             
@@ -417,23 +1247,56 @@ class MotionAnalyzer:
             logger.error(f"Error analyzing frame {frame_id}: {e}")
             return MotionMetrics(
                 frame_id=frame_id,
-                timestamp=time.time(),
+                timestamp=timestamp,
                 poses=[],
                 joint_angles=[]
             )
     
+    def _record(self, motion_metrics: MotionMetrics, landmarks: LandmarkSet):
+        """Append a frame to the history window and update running aggregates
+        
+        Landmarks are kept once, in landmark_history; motion_history holds the
+        same frames without poses (see iter_history).
+        """
+        timestamp = motion_metrics.timestamp
+        self.motion_history.append(replace(motion_metrics, poses=[]))
+        self.landmark_history.append(motion_metrics.frame_id, timestamp, landmarks)
+        
+        if self.max_history_seconds is not None:
+            cutoff = timestamp - self.max_history_seconds
+            while self.motion_history and self.motion_history[0].timestamp < cutoff:
+                self.motion_history.popleft()
+            self.landmark_history.evict_before(cutoff)
+        
+        self.poses_detected += 1
+        metrics.inc("poses_detected")
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+        self.last_timestamp = timestamp
+        for angle in motion_metrics.joint_angles:
+            self.angle_stats[angle.joint_name].update(angle.angle_degrees)
+        self.biomechanical_analyzer.update(motion_metrics)
+    
+    def iter_history(self):
+        """Yield the frames in the history window with their poses restored from landmark_history"""
+        for index, motion_metrics in enumerate(self.motion_history):
+            landmarks = self.landmark_history[index]
+            yield replace(motion_metrics, poses=[{"landmarks": landmarks,
+                                                  "interpolated": landmarks.interpolated}])
+    
     def get_comprehensive_analysis(self) -> Dict:
         """Get comprehensive analysis of all motion data"""
         try:
-            if not self.motion_history:
+            if not self.poses_detected:
                 return {"error": "No motion data available"}
             
-            # Perform biomechanical analysis
-            biomechanical_data = self.biomechanical_analyzer.assess_injury_risk(self.motion_history)
+            # Biomechanical assessment from running risk-factor counts
+            biomechanical_data = self.biomechanical_analyzer.current_assessment()
             
             return {
-                "total_frames": len(self.motion_history),
-                "analysis_duration": self.motion_history[-1].timestamp - self.motion_history[0].timestamp,
+                "total_frames": self.poses_detected,
+                "history_frames": len(self.motion_history),
+                "analysis_duration": self.last_timestamp - self.first_timestamp,
                 "biomechanical_assessment": biomechanical_data,
                 "motion_summary": self._generate_motion_summary()
             }
@@ -445,23 +1308,21 @@ class MotionAnalyzer:
     def _generate_motion_summary(self) -> Dict:
         """Generate summary of motion analysis"""
         try:
-            if not self.motion_history:
+            if not self.poses_detected:
                 return {}
             
-            # Calculate average joint angles
+            # Average joint angles from running statistics
             avg_angles = {}
             for joint_name in ["left_knee", "right_knee", "left_hip", "right_hip"]:
-                angles = [metrics.joint_angles for metrics in self.motion_history 
-                         if metrics.joint_angles]
-                if angles:
-                    joint_angles = [angle.angle_degrees for angle_list in angles 
-                                  for angle in angle_list if angle.joint_name == joint_name]
-                    if joint_angles:
-                        avg_angles[joint_name] = np.mean(joint_angles)
+                stats = self.angle_stats.get(joint_name)
+                if stats and stats.count:
+                    avg_angles[joint_name] = stats.mean
             
             return {
                 "average_joint_angles": avg_angles,
-                "total_poses_detected": len([m for m in self.motion_history if m.poses]),
+                "joint_angle_stats": {name: stats.to_dict() for name, stats in self.angle_stats.items()},
+                "total_poses_detected": self.poses_detected,
+                "frames_analyzed": self.frames_analyzed,
                 "analysis_type": self.analysis_type.value
             }
             
@@ -469,6 +1330,17 @@ class MotionAnalyzer:
             logger.error(f"Error generating motion summary: {e}")
             return {}
 
+def serialize_poses(poses: List[Dict]) -> List[Dict]:
+    """Convert poses holding LandmarkSet arrays into JSON-serializable dicts"""
+    serialized = []
+    for pose in poses:
+        pose_dict = dict(pose)
+        landmarks = pose_dict.get("landmarks")
+        if isinstance(landmarks, LandmarkSet):
+            pose_dict["landmarks"] = landmarks.to_list()
+        serialized.append(pose_dict)
+    return serialized
+
 def main():
     """Main function for testing the motion analyzer"""
     import argparse
@@ -476,86 +1348,295 @@ def main():
     parser = argparse.ArgumentParser(description="Intelligent Motion Analyzer")
     parser.add_argument("--input", "-i", help="Input video file or camera index", default=0)
     parser.add_argument("--output", "-o", help="Output file for results", default="motion_analysis.json")
+    parser.add_argument("--format", "-f", choices=["json", "ndjson", "binary", "npz", "parquet"], default=None,
+                       help="Result format (default: inferred from the output path)")
     parser.add_argument("--analysis-type", "-t", choices=[e.value for e in AnalysisType], 
                        default=AnalysisType.GAIT_ANALYSIS.value, help="Type of analysis to perform")
+    parser.add_argument("--max-history-frames", type=int, default=None,
+                       help="Keep at most this many frames in motion history")
+    parser.add_argument("--max-history-seconds", type=float, default=None,
+                       help="Keep only this many seconds of motion history")
+    parser.add_argument("--pipelined", action="store_true",
+                       help="Run capture, inference and analysis as concurrent pipeline stages")
+    parser.add_argument("--queue-size", type=int, default=8,
+                       help="Capacity of each pipeline queue")
+    parser.add_argument("--backpressure", choices=["block", "drop_oldest", "drop_newest"], default=None,
+                       help="Pipeline queue policy (default: block for files, drop_oldest for cameras)")
+    
+    parser.add_argument("--adaptive", action="store_true",
+                       help="Skip detection on low-motion frames and infer on a cropped region of interest")
+    parser.add_argument("--adaptive-max-interval", type=int, default=4,
+                       help="Largest number of frames between detections in adaptive mode")
+    parser.add_argument("--multi-person", action="store_true",
+                       help="Track and analyze several people per frame")
+    parser.add_argument("--max-people", type=int, default=10,
+                       help="Most people analyzed per frame in multi-person mode")
+    parser.add_argument("--risk-rules", default=None,
+                       help="JSON file with the injury-risk rule table (list of RiskRule fields)")
+    parser.add_argument("--smoothing", choices=["none", "one_euro", "kalman"], default="none",
+                       help="Temporal landmark filter applied before analysis")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                       help="Enable stage instrumentation and serve Prometheus metrics on this port")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Process video files offline on this many worker processes")
+    parser.add_argument("--chunk-size", type=int, default=900,
+                       help="Frames per offline work chunk")
+    parser.add_argument("--cache-dir", default=None,
+                       help="Cache landmarks per video so offline reruns skip decode and inference")
+    parser.add_argument("--cache-max-mb", type=int, default=2048,
+                       help="Landmark cache size limit; least recently used videos are evicted")
+    parser.add_argument("--headless", action="store_true",
+                       help="No display window or segmentation mask; process the whole input "
+                            "(offline runs always are)")
+    parser.add_argument("--max-frames", type=int, default=None,
+                       help="Stop after this many frames (default: 101 with display, all when headless)")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=2,
+                       help="MediaPipe pose model: 0 lite, 1 full, 2 heavy")
+    parser.add_argument("--min-detection-confidence", type=float, default=0.7,
+                       help="Person detection threshold")
+    parser.add_argument("--min-tracking-confidence", type=float, default=0.5,
+                       help="Landmark tracking threshold below which detection reruns")
+    parser.add_argument("--start-frame", type=int, default=0,
+                       help="First frame of a video file to analyze")
+    parser.add_argument("--stop-frame", type=int, default=None,
+                       help="Frame of a video file to stop before")
+    parser.add_argument("--stride", type=int, default=1,
+                       help="Analyze every n-th frame")
+    parser.add_argument("--max-side", type=int, default=None,
+                       help="Downscale frames at decode time so the longest side is at most this")
+    parser.add_argument("--batch-size", type=int, default=1,
+                       help="Frames handed to the pose estimator per call")
+    parser.add_argument("--prefetch", type=int, default=8,
+                       help="Frames decoded ahead on the read-ahead thread")
+    parser.add_argument("--hw-decode", action="store_true",
+                       help="Request hardware video decoding when OpenCV supports it")
+    parser.add_argument("--pose-backend", choices=["mediapipe", "tflite", "onnx", "replay"], default="mediapipe",
+                       help="Pose detection backend")
+    parser.add_argument("--pose-model", default=None,
+                       help="Landmark model file (tflite/onnx) or saved landmarks (replay)")
+    parser.add_argument("--pose-threads", type=int, default=None,
+                       help="Inference threads of the tflite/onnx backends (default: all cores)")
+    parser.add_argument("--save-video", default=None,
+                       help="Write the pose overlay to this video file (rendered and encoded on a background thread)")
+    parser.add_argument("--video-codec", default="mp4v", help="FourCC codec for --save-video")
     
     args = parser.parse_args()
+    if args.multi_person and args.format in ("binary", "npz", "parquet"):
+        parser.error("--multi-person results need a json or ndjson output")
+    if args.pose_backend != "mediapipe" and not args.pose_model:
+        parser.error(f"--pose-backend {args.pose_backend} needs --pose-model")
+    if args.multi_person and args.pose_backend == "replay":
+        parser.error("--multi-person needs a detecting pose backend")
+    if args.multi_person and args.pipelined:
+        parser.error("--pipelined does not support --multi-person")
     
-    # Initialize analyzer
-    analyzer = MotionAnalyzer(AnalysisType(args.analysis_type))
+    # Offline mode infers with MediaPipe on worker processes over whole videos
+    offline = args.workers > 1 or os.path.isdir(str(args.input)) or bool(args.cache_dir)
+    if offline:
+        unsupported = [flag for flag, used in (
+            ("--pose-backend", args.pose_backend != "mediapipe"),
+            ("--adaptive", args.adaptive),
+            ("--multi-person", args.multi_person),
+            ("--pipelined", args.pipelined),
+            ("--start-frame", args.start_frame != 0),
+            ("--stop-frame", args.stop_frame is not None),
+            ("--stride", args.stride != 1),
+            ("--max-frames", args.max_frames is not None),
+            ("--save-video", args.save_video is not None)
+        ) if used]
+        if unsupported:
+            parser.error(f"{', '.join(unsupported)} cannot be combined with offline mode "
+                         f"(--workers > 1, a directory input or --cache-dir)")
     
-    # Open video source
-    if args.input.isdigit():
-        cap = cv2.VideoCapture(int(args.input))
+    if args.metrics_port is not None:
+        metrics.enable()
+        metrics.serve(args.metrics_port)
+    
+    # Offline multi-process mode for video files and directories of videos
+    risk_rules = load_risk_rules(args.risk_rules) if args.risk_rules else DEFAULT_RISK_RULES
+    if offline:
+        from offline import run_offline
+        run_offline(str(args.input), args.output, AnalysisType(args.analysis_type),
+                    workers=args.workers, chunk_size=args.chunk_size, fmt=args.format,
+                    smoothing=args.smoothing, cache_dir=args.cache_dir,
+                    cache_max_bytes=args.cache_max_mb << 20, risk_rules=risk_rules,
+                    model_complexity=args.model_complexity,
+                    min_detection_confidence=args.min_detection_confidence,
+                    min_tracking_confidence=args.min_tracking_confidence,
+                    max_history_frames=args.max_history_frames,
+                    max_history_seconds=args.max_history_seconds)
+        return
+    
+    # Initialize analyzer
+    pose_estimator = None
+    crop_estimator_factory = None
+    roi_estimator = None
+    if args.pose_backend == "mediapipe":
+        if not args.multi_person:
+            pose_estimator = PoseEstimator(model_complexity=args.model_complexity,
+                                           min_detection_confidence=args.min_detection_confidence,
+                                           min_tracking_confidence=args.min_tracking_confidence,
+                                           enable_segmentation=not args.headless)
     else:
-        cap = cv2.VideoCapture(args.input)
+        from pose_backends import make_pose_backend
+        
+        def build_pose_backend(**kwargs) -> PoseBackend:
+            return make_pose_backend(args.pose_backend, args.pose_model, batch_size=args.batch_size,
+                                     num_threads=args.pose_threads, **kwargs)
+        
+        if args.multi_person:
+            crop_estimator_factory = lambda: build_pose_backend(static_image_mode=True)
+        else:
+            pose_estimator = build_pose_backend()
+            if args.adaptive and args.pose_backend != "replay":
+                roi_estimator = build_pose_backend(static_image_mode=True)
+    if args.adaptive and pose_estimator is not None:
+        from adaptive import AdaptivePoseEstimator
+        pose_estimator = AdaptivePoseEstimator(pose_estimator, max_interval=args.adaptive_max_interval,
+                                               roi_estimator=roi_estimator)
+    
+    from smoothing import make_landmark_filter
+    analyzer = MotionAnalyzer(AnalysisType(args.analysis_type),
+                              max_history_frames=args.max_history_frames,
+                              max_history_seconds=args.max_history_seconds,
+                              pose_estimator=pose_estimator,
+                              landmark_filter=make_landmark_filter(args.smoothing),
+                              risk_rules=risk_rules)
+    
+    multi_person = None
+    if args.multi_person:
+        from multi_person import MultiPersonAnalyzer, MultiPersonPoseEstimator
+        multi_person = MultiPersonAnalyzer(
+            AnalysisType(args.analysis_type),
+            estimator=MultiPersonPoseEstimator(max_people=args.max_people,
+                                               estimator_factory=crop_estimator_factory),
+            max_history_frames=args.max_history_frames,
+            max_history_seconds=args.max_history_seconds,
+            landmark_filter_factory=lambda: make_landmark_filter(args.smoothing),
+            risk_rules=risk_rules)
+    
+    _import_cv2()
+    from video_source import VideoSource
+    
+    # Open video source; the pipelined runner holds frames across stages,
+    # so its buffers are not recycled
+    is_camera = str(args.input).isdigit()
+    cap = VideoSource(args.input, start=args.start_frame, stop=args.stop_frame,
+                      stride=args.stride, max_side=args.max_side, prefetch=args.prefetch,
+                      batch_size=args.batch_size, reuse_buffers=not args.pipelined,
+                      hw_accel=args.hw_decode)
     
     if not cap.isOpened():
         logger.error("Error opening video source")
         return
     
-    frame_id = 0
-    results = []
+    from result_writer import open_result_sink
+    
+    sink = open_result_sink(args.output, args.format)
+    max_frames = args.max_frames
+    if max_frames is None and not args.headless:
+        max_frames = 101  # Limit interactive analysis for demo
+    
+    renderer = None
+    video_writer = None
+    if not args.headless or args.save_video:
+        from overlay import AnnotatedVideoWriter, OverlayRenderer
+        
+        renderer = OverlayRenderer()
+        if args.save_video:
+            video_writer = AnnotatedVideoWriter(args.save_video, fps=cap.fps / cap.stride,
+                                                renderer=renderer, fourcc=args.video_codec)
+    
+    def handle_result(frame: np.ndarray, motion_metrics: MotionMetrics) -> bool:
+        sink.write(motion_metrics)
+        return show_poses(frame, [motion_metrics])
+    
+    def handle_people(frame: np.ndarray, people: Dict[int, MotionMetrics]) -> bool:
+        for motion_metrics in people.values():
+            sink.write(motion_metrics)
+        return show_poses(frame, list(people.values()))
+    
+    def show_poses(frame: np.ndarray, results: List[MotionMetrics]) -> bool:
+        # The writer copies the frame before the display overlay is drawn on it
+        if video_writer is not None:
+            video_writer.submit(frame, results)
+        if args.headless:
+            return True
+        
+        # Display frame with pose overlay
+        cv2.imshow("Motion Analysis", renderer.draw(frame, results))
+        
+        # Break on 'q' key
+        return not (cv2.waitKey(1) & 0xFF == ord('q'))
     
     logger.info("Starting motion analysis...")
     
     try:
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
+        if args.pipelined and multi_person is None:
+            from pipeline import BackpressurePolicy, PipelinedRunner
             
-            # Analyze frame
-            motion_metrics = analyzer.analyze_frame(frame, frame_id)
-            results.append(motion_metrics)
-            
-            # Display frame with pose overlay
-            if motion_metrics.poses:
-                # Draw pose landmarks (simplified)
-                for pose in motion_metrics.poses:
-                    for landmark in pose["landmarks"]:
-                        x = int(landmark["x"] * frame.shape[1])
-                        y = int(landmark["y"] * frame.shape[0])
-                        cv2.circle(frame, (x, y), 5, (0, 255, 0), -1)
-            
-            # Show frame
-            cv2.imshow("Motion Analysis", frame)
-            
-            # Break on 'q' key
-            if cv2.waitKey(1) & 0xFF == ord('q'):
-                break
-            
-            frame_id += 1
-            
-            # Limit analysis for demo
-            if frame_id > 100:
-                break
+            policy = args.backpressure or ("drop_oldest" if is_camera else "block")
+            runner = PipelinedRunner(analyzer, cap, handle_result,
+                                     queue_size=args.queue_size,
+                                     policy=BackpressurePolicy(policy),
+                                     max_frames=max_frames)
+            try:
+                runner.run()
+            finally:
+                for stage, stage_stats in runner.get_stats().items():
+                    logger.info(f"Stage {stage}: {stage_stats}")
+        else:
+            processed = 0
+            keep_going = True
+            for batch in cap.batches():
+                if max_frames is not None:
+                    batch = batch[:max_frames - processed]
+                
+                # Analyze frames
+                if multi_person is not None:
+                    for frame in batch:
+                        people = multi_person.analyze_frame(frame.image, frame.frame_id, frame.timestamp)
+                        keep_going = handle_people(frame.image, people)
+                        if not keep_going:
+                            break
+                else:
+                    results = analyzer.analyze_frames([frame.image for frame in batch],
+                                                      [frame.frame_id for frame in batch],
+                                                      [frame.timestamp for frame in batch])
+                    for frame, motion_metrics in zip(batch, results):
+                        keep_going = handle_result(frame.image, motion_metrics)
+                        if not keep_going:
+                            break
+                
+                processed += len(batch)
+                if not keep_going or (max_frames is not None and processed >= max_frames):
+                    break
     
     except KeyboardInterrupt:
         logger.info("Analysis interrupted by user")
     
     finally:
         cap.release()
-        cv2.destroyAllWindows()
+        if video_writer is not None:
+            video_writer.close()
+            if video_writer.frames_written:
+                logger.info(f"Annotated video saved to {args.save_video} "
+                            f"({video_writer.frames_written} frames)")
+        if not args.headless:
+            cv2.destroyAllWindows()
         
         # Get comprehensive analysis
-        comprehensive_analysis = analyzer.get_comprehensive_analysis()
-        
-        # Save results
-        with open(args.output, 'w') as f:
-            json.dump({
-                "frame_results": [
-                    {
-                        "frame_id": m.frame_id,
-                        "timestamp": m.timestamp,
-                        "poses": m.poses,
-                        "joint_angles": [{"joint": ja.joint_name, "angle": ja.angle_degrees, 
-                                        "confidence": ja.confidence} for ja in m.joint_angles],
-                        "gait_metrics": m.gait_metrics
-                    } for m in results
-                ],
-                "comprehensive_analysis": comprehensive_analysis
-            }, f, indent=2)
+        if multi_person is not None:
+            multi_person.close()
+            comprehensive_analysis = multi_person.get_comprehensive_analysis()
+        else:
+            comprehensive_analysis = analyzer.get_comprehensive_analysis()
+        
+        # Finish results with the session summary
+        sink.close(comprehensive_analysis)
+        
+        if metrics.enabled:
+            logger.info(f"Stage metrics: {json.dumps(metrics.snapshot()['stages'])}")
         
         logger.info(f"Analysis complete. Results saved to {args.output}")
 
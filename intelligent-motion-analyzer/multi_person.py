@@ -0,0 +1,507 @@
+#!/usr/bin/env python3
+"""
+Multi-person pose tracking
+
+Finds person crops, runs single-person pose estimation on every crop with a
+pool of estimators, and keeps identities stable across frames by Hungarian
+matching on box overlap and keypoint distance. Each track gets its own
+MotionAnalyzer (and so its own GaitAnalyzer and history).
+
+The person detector runs only every ``detect_interval`` frames; in between,
+crops come from each track's last pose box. Per-frame cost therefore grows
+with the number of people in view, not with the length of the history.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import queue
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import logging
+
+import cv2
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+from motion_analyzer import (
+    DEFAULT_RISK_RULES, AnalysisType, LandmarkSet, MotionAnalyzer, MotionMetrics, PoseBackend, PoseEstimator,
+    RiskRule
+)
+
+logger = logging.getLogger(__name__)
+
+def box_iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Pairwise IoU of (N, 4) and (M, 4) boxes given as (x0, y0, x1, y1)"""
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)))
+    x0 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y0 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x1 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y1 = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(x1 - x0, 0, None) * np.clip(y1 - y0, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    return np.where(union > 0, intersection / np.maximum(union, 1e-9), 0.0)
+
+def keypoint_distance_matrix(a: np.ndarray, b: np.ndarray, min_visibility: float = 0.5) -> np.ndarray:
+    """
+    Pairwise mean keypoint distance of (N, 33, 4) and (M, 33, 4) poses
+    
+    Distances use landmarks visible in both poses and are divided by the
+    diagonal of the first pose's bounding box, so 1.0 means "one body apart".
+    Pairs without common visible landmarks get infinity.
+    """
+    if not len(a) or not len(b):
+        return np.zeros((len(a), len(b)))
+    visible = (a[:, None, :, 3] >= min_visibility) & (b[None, :, :, 3] >= min_visibility)
+    distance = np.linalg.norm(a[:, None, :, :2] - b[None, :, :, :2], axis=-1)
+    count = visible.sum(axis=-1)
+    mean = np.where(count > 0, (distance * visible).sum(axis=-1) / np.maximum(count, 1), np.inf)
+    scale = np.linalg.norm(a[:, :, :2].max(axis=1) - a[:, :, :2].min(axis=1), axis=-1)
+    return mean / np.maximum(scale, 1e-6)[:, None]
+
+def landmarks_box(array: np.ndarray, width: int, height: int,
+                  min_visibility: float = 0.5) -> Optional[np.ndarray]:
+    """Pixel bounding box (x0, y0, x1, y1) of the visible landmarks"""
+    visible = array[array[:, 3] >= min_visibility, :2]
+    if visible.shape[0] < 4:
+        return None
+    low = np.clip(visible.min(axis=0), 0.0, 1.0) * (width, height)
+    high = np.clip(visible.max(axis=0), 0.0, 1.0) * (width, height)
+    return np.array([low[0], low[1], high[0], high[1]], dtype=np.float64)
+
+def pad_box(box: np.ndarray, padding: float, width: int, height: int) -> Tuple[int, int, int, int]:
+    """Grow a box by ``padding`` of its size on every side and clip it to the frame"""
+    pad_x = (box[2] - box[0]) * padding
+    pad_y = (box[3] - box[1]) * padding
+    return (max(0, int(box[0] - pad_x)), max(0, int(box[1] - pad_y)),
+            min(width, int(np.ceil(box[2] + pad_x))), min(height, int(np.ceil(box[3] + pad_y))))
+
+class HogPersonDetector:
+    """
+    OpenCV HOG + linear SVM pedestrian detector
+    
+    Needs no model files. The frame is downscaled to ``max_side`` before
+    detection. Any object with a ``detect(frame) -> (K, 5)`` method returning
+    (x0, y0, x1, y1, score) rows can be used instead, e.g. a DNN detector.
+    """
+    
+    def __init__(self, max_side: int = 640, min_score: float = 0.3,
+                 win_stride: Tuple[int, int] = (8, 8), scale: float = 1.05):
+        self.max_side = max_side
+        self.min_score = min_score
+        self.win_stride = win_stride
+        self.scale = scale
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+    
+    def detect(self, frame: np.ndarray) -> np.ndarray:
+        height, width = frame.shape[:2]
+        factor = min(1.0, self.max_side / max(height, width))
+        image = frame if factor == 1.0 else cv2.resize(
+            frame, (int(width * factor), int(height * factor)), interpolation=cv2.INTER_AREA)
+        rects, weights = self.hog.detectMultiScale(image, winStride=self.win_stride, scale=self.scale)
+        if len(rects) == 0:
+            return np.zeros((0, 5))
+        rects = np.asarray(rects, dtype=np.float64) / factor
+        scores = np.asarray(weights, dtype=np.float64).reshape(-1)
+        boxes = np.column_stack([rects[:, 0], rects[:, 1], rects[:, 0] + rects[:, 2],
+                                 rects[:, 1] + rects[:, 3], scores])
+        return boxes[scores >= self.min_score]
+
+@dataclass
+class PersonPose:
+    """One person found in a frame: pixel box and full-frame landmarks"""
+    box: np.ndarray
+    landmarks: LandmarkSet
+
+class MultiPersonPoseEstimator:
+    """
+    Person crops + per-crop pose estimation with a pool of estimators
+    
+    Crops from a frame are estimated concurrently on ``workers`` threads,
+    each borrowing an estimator from the pool (MediaPipe releases the GIL
+    during inference). Estimators run in static image mode because crops of
+    different people interleave on the same instance.
+    """
+    
+    def __init__(self, detector=None, workers: int = 2, max_people: int = 10,
+                 detect_interval: int = 10, crop_padding: float = 0.2,
+                 crop_max_side: int = 256, min_visibility: float = 0.5,
+                 duplicate_iou: float = 0.6,
+                 estimator_factory: Optional[Callable[[], PoseBackend]] = None):
+        """
+        Args:
+            detector: Person detector with detect(frame) -> (K, 5); HOG by default
+            workers: Number of pose estimators and threads
+            max_people: Most crops estimated per frame
+            detect_interval: Run the person detector every this many frames
+            crop_padding: Padding around each person box, as a fraction of its size
+            crop_max_side: Longest side of a crop handed to the estimator
+            min_visibility: Landmark visibility needed to count towards a pose box
+            duplicate_iou: Poses overlapping more than this are treated as one person
+            estimator_factory: Builds one pose estimator per worker; a backend with
+                batch_size > 1 receives all crops of a frame in one call
+        """
+        self._detector = detector
+        self.workers = max(1, workers)
+        self.max_people = max_people
+        self.detect_interval = max(1, detect_interval)
+        self.crop_padding = crop_padding
+        self.crop_max_side = crop_max_side
+        self.min_visibility = min_visibility
+        self.duplicate_iou = duplicate_iou
+        self.estimator_factory = estimator_factory or (
+            lambda: PoseEstimator(model_complexity=1, static_image_mode=True))
+        self._estimators: Optional[queue.Queue] = None
+        self.batched = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._frames = 0
+        self.detector_calls = 0
+        self.crops_estimated = 0
+    
+    @property
+    def detector(self):
+        if self._detector is None:
+            self._detector = HogPersonDetector()
+        return self._detector
+    
+    def _ensure_pool(self):
+        if self._estimators is None:
+            self._estimators = queue.Queue()
+            for _ in range(self.workers):
+                self._estimators.put(self.estimator_factory())
+            # Backends that batch get every crop of a frame in one call
+            self.batched = self._estimators.queue[0].batch_size > 1
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pose-crop")
+    
+    def close(self):
+        """Shut down the worker threads"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    def _crop_boxes(self, frame: np.ndarray, track_boxes: np.ndarray) -> np.ndarray:
+        """Boxes to estimate this frame: detections on detector frames, else track boxes"""
+        detect = self._frames % self.detect_interval == 0 or not len(track_boxes)
+        self._frames += 1
+        if not detect:
+            return track_boxes[:self.max_people]
+        
+        self.detector_calls += 1
+        detections = self.detector.detect(frame)
+        detections = detections[np.argsort(-detections[:, 4])][:, :4] if len(detections) else np.zeros((0, 4))
+        if len(track_boxes):
+            # Keep tracks the detector missed, e.g. partially occluded people
+            overlap = box_iou_matrix(track_boxes, detections)
+            missed = overlap.max(axis=1) < 0.3 if len(detections) else np.ones(len(track_boxes), dtype=bool)
+            detections = np.concatenate([detections, track_boxes[missed]])
+        return detections[:self.max_people]
+    
+    def _crop(self, frame: np.ndarray, box: np.ndarray) -> Optional[Tuple[np.ndarray, Tuple[int, int, int, int]]]:
+        """Padded, downscaled crop of one person box and its pixel region"""
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = pad_box(box, self.crop_padding, width, height)
+        if x1 - x0 < 16 or y1 - y0 < 16:
+            return None
+        crop = frame[y0:y1, x0:x1]
+        scale = self.crop_max_side / max(crop.shape[:2])
+        if scale < 1.0:
+            crop = cv2.resize(crop, (max(1, int(crop.shape[1] * scale)), max(1, int(crop.shape[0] * scale))),
+                              interpolation=cv2.INTER_AREA)
+        return crop, (x0, y0, x1, y1)
+    
+    def _estimate_crop(self, frame: np.ndarray, box: np.ndarray) -> Optional[LandmarkSet]:
+        cropped = self._crop(frame, box)
+        if cropped is None:
+            return None
+        crop, region = cropped
+        
+        estimator = self._estimators.get()
+        try:
+            landmarks = estimator.detect_pose(crop)
+        finally:
+            self._estimators.put(estimator)
+        return self._to_frame(landmarks, region, frame)
+    
+    def _estimate_crops_batched(self, frame: np.ndarray, boxes: np.ndarray) -> List[Optional[LandmarkSet]]:
+        """All crops of a frame in one detect_poses call, for batching backends"""
+        cropped = [self._crop(frame, box) for box in boxes]
+        valid = [item for item in cropped if item is not None]
+        estimator = self._estimators.get()
+        try:
+            batch_landmarks = iter(estimator.detect_poses([crop for crop, _ in valid]))
+        finally:
+            self._estimators.put(estimator)
+        return [self._to_frame(next(batch_landmarks), item[1], frame) if item is not None else None
+                for item in cropped]
+    
+    @staticmethod
+    def _to_frame(landmarks: Optional[LandmarkSet], region: Tuple[int, int, int, int],
+                  frame: np.ndarray) -> Optional[LandmarkSet]:
+        if landmarks is None:
+            return None
+        height, width = frame.shape[:2]
+        x0, y0, x1, y1 = region
+        
+        # Map crop-normalized coordinates back to full-frame normalized ones
+        array = landmarks.array.copy()
+        array[:, 0] = (array[:, 0] * (x1 - x0) + x0) / width
+        array[:, 1] = (array[:, 1] * (y1 - y0) + y0) / height
+        array[:, 2] = array[:, 2] * (x1 - x0) / width
+        return LandmarkSet(array)
+    
+    def detect_poses(self, frame: np.ndarray, track_boxes: Optional[np.ndarray] = None) -> List[PersonPose]:
+        """
+        Find every person in a frame
+        
+        Args:
+            frame: Input image frame (BGR format)
+            track_boxes: (T, 4) pixel boxes of the current tracks, used as crops
+                between detector runs
+        
+        Returns:
+            One PersonPose per distinct person found
+        """
+        try:
+            self._ensure_pool()
+            if track_boxes is None:
+                track_boxes = np.zeros((0, 4))
+            boxes = self._crop_boxes(frame, track_boxes)
+            if not len(boxes):
+                return []
+            self.crops_estimated += len(boxes)
+            if self.batched:
+                results = self._estimate_crops_batched(frame, boxes)
+            elif len(boxes) == 1:
+                results = [self._estimate_crop(frame, boxes[0])]
+            else:
+                results = list(self._executor.map(lambda box: self._estimate_crop(frame, box), boxes))
+            
+            height, width = frame.shape[:2]
+            people = []
+            for landmarks in results:
+                if landmarks is None:
+                    continue
+                box = landmarks_box(landmarks.array, width, height, self.min_visibility)
+                if box is not None:
+                    people.append(PersonPose(box, landmarks))
+            return self._suppress_duplicates(people)
+            
+        except Exception as e:
+            logger.error(f"Error in multi-person pose detection: {e}")
+            return []
+    
+    def _suppress_duplicates(self, people: List[PersonPose]) -> List[PersonPose]:
+        """Drop poses that overlap a more visible pose (two crops on one person)"""
+        if len(people) < 2:
+            return people
+        order = sorted(range(len(people)), key=lambda i: -float(people[i].landmarks.array[:, 3].mean()))
+        boxes = np.stack([people[i].box for i in order])
+        overlap = box_iou_matrix(boxes, boxes)
+        kept: List[int] = []
+        for rank in range(len(order)):
+            if all(overlap[rank, other] <= self.duplicate_iou for other in kept):
+                kept.append(rank)
+        return [people[order[rank]] for rank in kept]
+
+@dataclass
+class Track:
+    """Identity kept across frames"""
+    track_id: int
+    box: np.ndarray
+    landmarks: LandmarkSet
+    hits: int = 1
+    misses: int = 0
+    last_seen: float = 0.0
+
+class PoseTracker:
+    """
+    Frame-to-frame identity association with Hungarian matching
+    
+    The cost of pairing a track with a pose blends 1 - IoU of their boxes
+    with the normalized keypoint distance. Pairs above ``max_cost`` are not
+    matched; unmatched poses start new tracks and tracks unmatched for more
+    than ``max_misses`` frames are dropped. The tracks dropped by the latest
+    update are listed in ``expired``.
+    """
+    
+    def __init__(self, iou_weight: float = 0.5, max_cost: float = 0.7, max_misses: int = 15,
+                 min_visibility: float = 0.5):
+        self.iou_weight = iou_weight
+        self.max_cost = max_cost
+        self.max_misses = max_misses
+        self.min_visibility = min_visibility
+        self.tracks: Dict[int, Track] = {}
+        self.expired: List[Track] = []
+        self._next_id = 0
+    
+    @property
+    def boxes(self) -> np.ndarray:
+        """(T, 4) boxes of the live tracks"""
+        if not self.tracks:
+            return np.zeros((0, 4))
+        return np.stack([track.box for track in self.tracks.values()])
+    
+    def update(self, people: List[PersonPose], timestamp: float) -> List[Tuple[Track, PersonPose]]:
+        """
+        Associate this frame's poses with tracks
+        
+        Returns:
+            (track, pose) pairs for every pose, including newly started tracks
+        """
+        tracks = list(self.tracks.values())
+        self.expired = []
+        matched: List[Tuple[Track, PersonPose]] = []
+        unmatched_people = set(range(len(people)))
+        
+        if tracks and people:
+            track_boxes = np.stack([track.box for track in tracks])
+            person_boxes = np.stack([person.box for person in people])
+            iou_cost = 1.0 - box_iou_matrix(track_boxes, person_boxes)
+            keypoint_cost = np.minimum(keypoint_distance_matrix(
+                np.stack([track.landmarks.array for track in tracks]),
+                np.stack([person.landmarks.array for person in people]),
+                self.min_visibility), 1.0)
+            cost = self.iou_weight * iou_cost + (1.0 - self.iou_weight) * keypoint_cost
+            for row, col in zip(*linear_sum_assignment(cost)):
+                if cost[row, col] > self.max_cost:
+                    continue
+                track, person = tracks[row], people[col]
+                track.box, track.landmarks = person.box, person.landmarks
+                track.hits += 1
+                track.last_seen = timestamp
+                matched.append((track, person))
+                unmatched_people.discard(col)
+        
+        matched_ids = {track.track_id for track, _ in matched}
+        for track in tracks:
+            if track.track_id in matched_ids:
+                track.misses = 0
+                continue
+            track.misses += 1
+            if track.misses > self.max_misses:
+                del self.tracks[track.track_id]
+                self.expired.append(track)
+        
+        for index in sorted(unmatched_people):
+            person = people[index]
+            track = Track(self._next_id, person.box, person.landmarks, last_seen=timestamp)
+            self.tracks[track.track_id] = track
+            self._next_id += 1
+            matched.append((track, person))
+        return matched
+
+class MultiPersonAnalyzer:
+    """
+    Per-person motion analysis for frames with several people
+    
+    Each track ID gets its own MotionAnalyzer, so gait events, history
+    windows and risk aggregates never mix between people. When the tracker
+    drops a track, its analyzer is finalized into a summary and released;
+    only the latest ``max_finished_tracks`` summaries are kept.
+    """
+    
+    def __init__(self, analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                 estimator: Optional[MultiPersonPoseEstimator] = None,
+                 tracker: Optional[PoseTracker] = None,
+                 max_history_frames: Optional[int] = None,
+                 max_history_seconds: Optional[float] = None,
+                 landmark_filter_factory: Optional[Callable[[], object]] = None,
+                 max_finished_tracks: Optional[int] = 100,
+                 risk_rules: Sequence[RiskRule] = DEFAULT_RISK_RULES):
+        """
+        Args:
+            analysis_type: Type of analysis to perform per person
+            estimator: Multi-person pose estimator (built with defaults if None)
+            tracker: Identity tracker (built with defaults if None)
+            max_history_frames: History window per track, in frames
+            max_history_seconds: History window per track, in seconds
+            landmark_filter_factory: Builds a fresh landmark filter for each track
+            max_finished_tracks: Summaries of expired tracks to keep (None keeps all)
+            risk_rules: Injury-risk rule table applied to every track
+        """
+        self.analysis_type = analysis_type
+        self.estimator = estimator or MultiPersonPoseEstimator()
+        self.tracker = tracker or PoseTracker()
+        self.max_history_frames = max_history_frames
+        self.max_history_seconds = max_history_seconds
+        self.landmark_filter_factory = landmark_filter_factory
+        self.max_finished_tracks = max_finished_tracks
+        self.risk_rules = tuple(risk_rules)
+        self.analyzers: Dict[int, MotionAnalyzer] = {}
+        self.finished_tracks: "OrderedDict[int, Dict]" = OrderedDict()
+        self.finished_tracks_discarded = 0
+    
+    def _analyzer(self, track_id: int) -> MotionAnalyzer:
+        analyzer = self.analyzers.get(track_id)
+        if analyzer is None:
+            analyzer = MotionAnalyzer(
+                self.analysis_type,
+                max_history_frames=self.max_history_frames,
+                max_history_seconds=self.max_history_seconds,
+                landmark_filter=self.landmark_filter_factory() if self.landmark_filter_factory else None,
+                risk_rules=self.risk_rules)
+            self.analyzers[track_id] = analyzer
+        return analyzer
+    
+    def _finish_track(self, track_id: int):
+        """Replace an expired track's analyzer with its comprehensive analysis"""
+        analyzer = self.analyzers.pop(track_id, None)
+        if analyzer is None:
+            return
+        self.finished_tracks[track_id] = analyzer.get_comprehensive_analysis()
+        if self.max_finished_tracks is not None:
+            while len(self.finished_tracks) > self.max_finished_tracks:
+                self.finished_tracks.popitem(last=False)
+                self.finished_tracks_discarded += 1
+    
+    def analyze_frame(self, frame: np.ndarray, frame_id: int,
+                      timestamp: Optional[float] = None) -> Dict[int, MotionMetrics]:
+        """
+        Detect, track and analyze everyone in a frame
+        
+        Args:
+            frame: Input image frame
+            frame_id: Frame identifier
+            timestamp: Capture time of the frame (defaults to now)
+        
+        Returns:
+            MotionMetrics per track ID seen in this frame; each pose entry
+            carries ``track_id`` and its pixel ``bbox``
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        people = self.estimator.detect_poses(frame, self.tracker.boxes)
+        results = {}
+        for track, person in self.tracker.update(people, timestamp):
+            motion_metrics = self._analyzer(track.track_id).analyze_landmarks(person.landmarks, frame_id,
+                                                                              timestamp)
+            for pose in motion_metrics.poses:
+                pose["track_id"] = track.track_id
+                pose["bbox"] = [float(v) for v in person.box]
+            results[track.track_id] = motion_metrics
+        for track in self.tracker.expired:
+            self._finish_track(track.track_id)
+        return results
+    
+    def get_comprehensive_analysis(self) -> Dict:
+        """Comprehensive analysis for the live tracks and the kept finished ones"""
+        tracks = {str(track_id): summary for track_id, summary in self.finished_tracks.items()}
+        tracks.update({str(track_id): analyzer.get_comprehensive_analysis()
+                       for track_id, analyzer in self.analyzers.items()})
+        return {
+            "tracks": tracks,
+            "active_tracks": sorted(self.tracker.tracks),
+            "finished_tracks_discarded": self.finished_tracks_discarded,
+            "detector_calls": self.estimator.detector_calls,
+            "crops_estimated": self.estimator.crops_estimated
+        }
+    
+    def close(self):
+        self.estimator.close()
@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Multi-process offline video analysis
+
+Splits videos into frame-range chunks, runs pose inference for each chunk
+on a process pool (one PoseEstimator per worker) and merges the landmark
+streams back in frame order. Gait and biomechanical analysis then run
+sequentially over the merged stream, so their state carries across chunk
+boundaries exactly as in a single-process run.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from landmark_cache import LandmarkCache
+from motion_analyzer import (
+    AnalysisType, DEFAULT_RISK_RULES, LandmarkSet, MotionAnalyzer, MotionMetrics, NUM_LANDMARKS,
+    LANDMARK_FIELDS, PoseEstimator, RiskRule
+)
+from result_writer import open_result_sink
+from smoothing import make_landmark_filter
+from video_source import VideoSource
+
+logger = logging.getLogger(__name__)
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v")
+
+@dataclass
+class ChunkJob:
+    """Frame range [start, stop) of one video to run inference on"""
+    video_path: str
+    start: int
+    stop: Optional[int]  # None reads to the end of the video
+    model_complexity: int = 2
+    min_detection_confidence: float = 0.7
+    min_tracking_confidence: float = 0.5
+    warmup_frames: int = 15
+    batch_size: int = 8  # Frames per detect_poses call
+
+@dataclass
+class ChunkResult:
+    """Landmarks for one chunk: array of shape (frames, 33, 4) plus a detection mask"""
+    video_path: str
+    start: int
+    landmarks: np.ndarray
+    detected: np.ndarray
+
+def list_videos(path: str) -> List[str]:
+    """Return the video files to process for a file or directory input"""
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(VIDEO_EXTENSIONS)
+        )
+    return [path]
+
+def probe_video(video_path: str) -> Tuple[int, float]:
+    """Return (frame_count, fps); frame_count is 0 when the container does not report it"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        frame_count = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT)))
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        return frame_count, fps
+    finally:
+        cap.release()
+
+def plan_chunks(frame_count: int, chunk_size: int) -> List[Tuple[int, Optional[int]]]:
+    """Split [0, frame_count) into consecutive ranges of at most chunk_size frames"""
+    if frame_count <= 0:
+        # Unknown length: a single chunk read to the end
+        return [(0, None)]
+    return [(start, min(start + chunk_size, frame_count))
+            for start in range(0, frame_count, chunk_size)]
+
+_worker_estimators = {}
+
+def _get_worker_estimator(model_complexity: int, min_detection_confidence: float,
+                          min_tracking_confidence: float = 0.5) -> PoseEstimator:
+    """Reuse one PoseEstimator per worker process and settings across chunks"""
+    key = (model_complexity, min_detection_confidence, min_tracking_confidence)
+    if key not in _worker_estimators:
+        # Workers never display or use the segmentation mask
+        _worker_estimators[key] = PoseEstimator(model_complexity=model_complexity,
+                                                min_detection_confidence=min_detection_confidence,
+                                                min_tracking_confidence=min_tracking_confidence,
+                                                enable_segmentation=False)
+    return _worker_estimators[key]
+
+def analyze_chunk(job: ChunkJob) -> ChunkResult:
+    """
+    Run pose inference over one chunk (executes in a worker process)
+    
+    Decoding starts ``warmup_frames`` before the chunk so MediaPipe's
+    tracker has locked on by the first frame that is kept.
+    """
+    cv2.setNumThreads(1)  # One process per core already; avoid oversubscription
+    estimator = _get_worker_estimator(job.model_complexity, job.min_detection_confidence,
+                                      job.min_tracking_confidence)
+    
+    seek_to = max(0, job.start - job.warmup_frames)
+    source = VideoSource(job.video_path, start=seek_to, stop=job.stop,
+                         prefetch=4, batch_size=job.batch_size)
+    
+    capacity = (job.stop - job.start) if job.stop is not None else 1024
+    landmarks = np.zeros((capacity, NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+    detected = np.zeros(capacity, dtype=bool)
+    count = 0
+    
+    try:
+        for batch in source.batches():
+            results = estimator.detect_poses([frame.image for frame in batch])
+            for frame, result in zip(batch, results):
+                if frame.frame_id < job.start:
+                    continue
+                if count == landmarks.shape[0]:
+                    landmarks = np.concatenate([landmarks, np.zeros_like(landmarks)])
+                    detected = np.concatenate([detected, np.zeros_like(detected)])
+                if result is not None:
+                    landmarks[count] = result.array
+                    detected[count] = True
+                count += 1
+    finally:
+        source.release()
+    
+    return ChunkResult(job.video_path, job.start, landmarks[:count], detected[:count])
+
+def iter_merged_landmarks(jobs: List[ChunkJob],
+                          executor: Optional[ProcessPoolExecutor] = None) -> Iterator[ChunkResult]:
+    """Run jobs on a process pool and yield chunk results in submission (frame) order"""
+    if executor is None:
+        for job in jobs:
+            yield analyze_chunk(job)
+        return
+    
+    # map() yields in submission order while later chunks keep running
+    yield from executor.map(analyze_chunk, jobs)
+
+def iter_video_offline(video_path: str, analyzer: MotionAnalyzer,
+                       executor: Optional[ProcessPoolExecutor] = None,
+                       chunk_size: int = 900,
+                       model_complexity: int = 2,
+                       min_detection_confidence: float = 0.7,
+                       cache: Optional[LandmarkCache] = None,
+                       min_tracking_confidence: float = 0.5) -> Iterator[MotionMetrics]:
+    """
+    Analyze one video file, yielding per-frame metrics in frame order
+    
+    With a ``cache``, frame ranges already analyzed with the same model
+    settings are replayed from disk without decoding, and newly computed
+    ranges are stored as they complete.
+    
+    Args:
+        video_path: Path to the video file
+        analyzer: Analyzer that accumulates session state (its pose model is never used)
+        executor: Process pool for inference (None runs chunks in-process)
+        chunk_size: Frames per chunk
+        model_complexity: MediaPipe model complexity for each worker
+        min_detection_confidence: Detection threshold for each worker
+        cache: Landmark cache to replay from and fill
+        min_tracking_confidence: Tracking threshold for each worker
+    """
+    frame_count, fps = probe_video(video_path)
+    key = None
+    if cache is not None:
+        key = cache.key(video_path, model_complexity, min_detection_confidence, min_tracking_confidence)
+        if frame_count <= 0:
+            frame_count = cache.meta(key).get("frame_count", 0)
+    
+    # Split chunks into cached pieces (path set) and pieces that need inference
+    pieces: List[Tuple[int, Optional[int], Optional[str]]] = []
+    for start, stop in plan_chunks(frame_count, chunk_size):
+        if cache is None or stop is None:
+            pieces.append((start, stop, None))
+        else:
+            pieces.extend(cache.plan(key, start, stop))
+    jobs = [ChunkJob(video_path, start, stop, model_complexity, min_detection_confidence,
+                     min_tracking_confidence)
+            for start, stop, path in pieces if path is None]
+    logger.info(f"Analyzing {video_path}: {frame_count} frames, "
+                f"{len(jobs)} chunks to infer, {len(pieces) - len(jobs)} cached")
+    
+    results = iter_merged_landmarks(jobs, executor)
+    for start, stop, path in pieces:
+        if path is not None:
+            landmark_arrays, detected = cache.read(path, start, stop)
+        else:
+            chunk = next(results)
+            landmark_arrays, detected = chunk.landmarks, chunk.detected
+            if cache is not None:
+                cache.put(key, start, landmark_arrays, detected, meta={
+                    "video_path": os.path.abspath(video_path),
+                    "fps": fps,
+                    "frame_count": frame_count if stop is not None else start + len(landmark_arrays),
+                    "model_complexity": model_complexity,
+                    "min_detection_confidence": min_detection_confidence,
+                    "min_tracking_confidence": min_tracking_confidence
+                })
+        
+        for offset in range(landmark_arrays.shape[0]):
+            frame_id = start + offset
+            landmarks = LandmarkSet(landmark_arrays[offset]) if detected[offset] else None
+            yield analyzer.analyze_landmarks(landmarks, frame_id, timestamp=frame_id / fps)
+
+def analyze_video_offline(video_path: str,
+                          analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                          executor: Optional[ProcessPoolExecutor] = None,
+                          chunk_size: int = 900) -> Tuple[MotionAnalyzer, List[MotionMetrics]]:
+    """
+    Analyze one video file using a process pool for inference
+    
+    Returns:
+        The analyzer holding session state and the per-frame metrics in frame order
+    """
+    # The analyzer only consumes landmarks, so it never builds a pose model here
+    analyzer = MotionAnalyzer(analysis_type)
+    results = list(iter_video_offline(video_path, analyzer, executor, chunk_size))
+    return analyzer, results
+
+def run_offline(input_path: str, output: str,
+                analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                workers: int = os.cpu_count() or 1, chunk_size: int = 900,
+                fmt: Optional[str] = None, smoothing: Optional[str] = None,
+                cache_dir: Optional[str] = None, cache_max_bytes: int = 2 << 30,
+                risk_rules: Sequence[RiskRule] = DEFAULT_RISK_RULES,
+                model_complexity: int = 2, min_detection_confidence: float = 0.7,
+                min_tracking_confidence: float = 0.5, max_history_frames: Optional[int] = None,
+                max_history_seconds: Optional[float] = None):
+    """
+    Analyze a video file or every video in a directory and stream results to disk
+    
+    For a directory input, ``output`` is treated as a directory and one
+    result file (or binary session directory) is written per video.
+    ``smoothing`` names a landmark filter from smoothing.LANDMARK_FILTERS.
+    With ``cache_dir``, landmarks are cached per video content and reruns
+    only repeat the analysis stages. Offline runs are always headless: no
+    display and no segmentation mask.
+    """
+    videos = list_videos(input_path)
+    if not videos:
+        logger.error(f"No videos found in {input_path}")
+        return
+    
+    multiple = os.path.isdir(input_path)
+    if multiple:
+        os.makedirs(output, exist_ok=True)
+    
+    cache = LandmarkCache(cache_dir, cache_max_bytes) if cache_dir else None
+    
+    # One pool for all videos so worker start-up is paid once
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for video_path in videos:
+            if multiple:
+                name = os.path.splitext(os.path.basename(video_path))[0]
+                extension = {"json": ".json", "ndjson": ".ndjson", "binary": "",
+                             "npz": ".npz", "parquet": ".parquet"}[fmt or "json"]
+                output_path = os.path.join(output, name + extension)
+            else:
+                output_path = output
+            
+            analyzer = MotionAnalyzer(analysis_type, max_history_frames=max_history_frames,
+                                      max_history_seconds=max_history_seconds,
+                                      landmark_filter=make_landmark_filter(smoothing),
+                                      risk_rules=risk_rules)
+            sink = open_result_sink(output_path, fmt)
+            try:
+                for metrics in iter_video_offline(video_path, analyzer, executor, chunk_size,
+                                                  model_complexity=model_complexity,
+                                                  min_detection_confidence=min_detection_confidence,
+                                                  cache=cache,
+                                                  min_tracking_confidence=min_tracking_confidence):
+                    sink.write(metrics)
+            finally:
+                sink.close(analyzer.get_comprehensive_analysis())
+            logger.info(f"Analysis complete. Results saved to {output_path}")
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Pose overlay rendering and background annotated-video writing
+
+``OverlayRenderer`` draws straight from the (33, 4) landmark array: every
+skeleton segment in one cv2.polylines call, every landmark as a zero-length
+round-capped segment in a second, plus joint-angle labels at the joint
+vertices. ``AnnotatedVideoWriter`` moves rendering and encoding to a
+background thread so review videos cost the analysis loop one frame copy:
+    
+    with AnnotatedVideoWriter("review.mp4", fps=30) as writer:
+        for frame in source:
+            motion_metrics = analyzer.analyze_frame(frame.image, frame.frame_id, frame.timestamp)
+            writer.submit(frame.image, [motion_metrics])
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import queue
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import cv2
+import numpy as np
+
+from motion_analyzer import (
+    DEFAULT_JOINT_ANGLES, JOINT_CONNECTIONS, UPPER_BODY_JOINT_ANGLES, JointAngle, LandmarkSet,
+    MotionMetrics
+)
+
+logger = logging.getLogger(__name__)
+
+# BGR colors per chain side
+LEFT_COLOR = (255, 160, 0)
+RIGHT_COLOR = (0, 140, 255)
+CENTER_COLOR = (0, 255, 0)
+LABEL_COLOR = (255, 255, 255)
+
+def skeleton_segments(joint_connections: Dict[str, List[int]]) -> Tuple[np.ndarray, List[str]]:
+    """
+    Landmark index pairs to draw for each chain
+    
+    Limb chains are drawn as paths. ``spine`` lists both shoulders then both
+    hips, so it is drawn as the closed torso outline instead.
+    
+    Returns:
+        (pairs, chains): (K, 2) landmark indices and the chain name of each pair
+    """
+    pairs = []
+    chains = []
+    for name, indices in joint_connections.items():
+        if name == "spine" and len(indices) == 4:
+            left_shoulder, right_shoulder, left_hip, right_hip = indices
+            path = [left_shoulder, right_shoulder, right_hip, left_hip, left_shoulder]
+        else:
+            path = list(indices)
+        for start, end in zip(path[:-1], path[1:]):
+            pairs.append((start, end))
+            chains.append(name)
+    return np.array(pairs, dtype=np.intp).reshape(-1, 2), chains
+
+def _chain_color(name: str) -> Tuple[int, int, int]:
+    if name.startswith("left"):
+        return LEFT_COLOR
+    if name.startswith("right"):
+        return RIGHT_COLOR
+    return CENTER_COLOR
+
+class OverlayRenderer:
+    """Draws skeletons, landmarks and joint-angle labels onto BGR frames in place"""
+    
+    def __init__(self, joint_connections: Optional[Dict[str, List[int]]] = None,
+                 min_visibility: float = 0.5, point_radius: int = 4, line_thickness: int = 2,
+                 draw_angles: bool = True, font_scale: float = 0.5, antialias: bool = False):
+        """
+        Args:
+            joint_connections: Chains of landmark indices (default: JOINT_CONNECTIONS,
+                as in PoseBackend.joint_connections)
+            min_visibility: Landmarks below this visibility are not drawn
+            point_radius: Landmark dot radius in pixels at 720p (scaled with frame height)
+            line_thickness: Skeleton line thickness at 720p (scaled with frame height)
+            draw_angles: Label joint angles at their vertex landmark
+            font_scale: Angle label size at 720p (scaled with frame height)
+            antialias: Anti-alias lines and dots (about 3x slower to draw; labels
+                are always anti-aliased)
+        """
+        self.min_visibility = min_visibility
+        self.point_radius = point_radius
+        self.line_thickness = line_thickness
+        self.draw_angles = draw_angles
+        self.font_scale = font_scale
+        self.line_type = cv2.LINE_AA if antialias else cv2.LINE_8
+        
+        pairs, chains = skeleton_segments(joint_connections or JOINT_CONNECTIONS)
+        # One polylines call per color
+        self._segment_groups = []
+        for color in (LEFT_COLOR, RIGHT_COLOR, CENTER_COLOR):
+            mask = np.array([_chain_color(name) == color for name in chains], dtype=bool)
+            if mask.any():
+                self._segment_groups.append((color, pairs[mask]))
+        self._vertices = {spec.name: spec.vertex for spec in DEFAULT_JOINT_ANGLES + UPPER_BODY_JOINT_ANGLES}
+    
+    def _scaled(self, frame: np.ndarray, size: float) -> float:
+        return size * frame.shape[0] / 720.0
+    
+    def draw_pose(self, frame: np.ndarray, landmarks: np.ndarray,
+                  joint_angles: Sequence[JointAngle] = ()):
+        """
+        Draw one pose
+        
+        Args:
+            frame: BGR frame, modified in place
+            landmarks: (33, 4) array of normalized x, y, z, visibility
+            joint_angles: Angles to label at their vertex landmark
+        """
+        height, width = frame.shape[:2]
+        points = np.rint(landmarks[:, :2] * (width, height)).astype(np.int32)
+        visible = landmarks[:, 3] >= self.min_visibility
+        thickness = max(1, round(self._scaled(frame, self.line_thickness)))
+        radius = max(1, round(self._scaled(frame, self.point_radius)))
+        
+        for color, pairs in self._segment_groups:
+            pairs = pairs[visible[pairs].all(axis=1)]
+            if len(pairs):
+                cv2.polylines(frame, points[pairs], False, color, thickness, self.line_type)
+        
+        # Zero-length segments with round caps draw all dots in one call
+        dots = points[visible]
+        if len(dots):
+            cv2.polylines(frame, np.repeat(dots[:, None, :], 2, axis=1), False, CENTER_COLOR,
+                          2 * radius, self.line_type)
+        
+        if self.draw_angles and joint_angles:
+            font_scale = self._scaled(frame, self.font_scale)
+            for angle in joint_angles:
+                vertex = self._vertices.get(angle.joint_name)
+                if vertex is None or not visible[vertex]:
+                    continue
+                x, y = points[vertex]
+                cv2.putText(frame, f"{angle.angle_degrees:.0f}", (int(x) + radius + 2, int(y) - radius),
+                            cv2.FONT_HERSHEY_SIMPLEX, font_scale, LABEL_COLOR, max(1, thickness // 2),
+                            cv2.LINE_AA)
+    
+    def draw(self, frame: np.ndarray, results: Sequence[MotionMetrics]) -> np.ndarray:
+        """Draw every pose of every result (one per tracked person) onto ``frame``"""
+        for motion_metrics in results:
+            for pose in motion_metrics.poses:
+                landmarks = pose["landmarks"]
+                if not isinstance(landmarks, LandmarkSet):
+                    landmarks = LandmarkSet.from_landmarks(landmarks)
+                self.draw_pose(frame, landmarks.array, motion_metrics.joint_angles)
+        return frame
+
+_STOP = object()
+
+class AnnotatedVideoWriter:
+    """
+    Renders overlays and encodes video on a background thread
+    
+    ``submit`` copies the frame (pool buffers are reused by the reader) and
+    queues it with its landmark arrays and angles. The queue blocks when full
+    so review videos keep every frame; pass ``drop_when_full`` to favour
+    the analysis loop instead. If the output cannot be opened, ``error``
+    says why and later frames are ignored; check ``frames_written`` after
+    ``close``.
+    """
+    
+    def __init__(self, path: str, fps: float, renderer: Optional[OverlayRenderer] = None,
+                 fourcc: str = "mp4v", queue_size: int = 64, drop_when_full: bool = False):
+        """
+        Args:
+            path: Output video file
+            fps: Output frame rate (source fps divided by any stride)
+            renderer: Overlay renderer (default settings if None)
+            fourcc: Codec FourCC understood by the OpenCV build
+            queue_size: Frames buffered between the analysis loop and the encoder
+            drop_when_full: Drop frames instead of blocking when the encoder lags
+        """
+        self.path = path
+        self.fps = fps
+        self.renderer = renderer or OverlayRenderer()
+        self.fourcc = fourcc
+        self.drop_when_full = drop_when_full
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._writer: Optional[cv2.VideoWriter] = None
+        self._closed = False
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.error: Optional[str] = None  # Why the video could not be opened, if it could not
+        self._thread = threading.Thread(target=self._write_loop, name="annotated-video-writer", daemon=True)
+        self._thread.start()
+    
+    def submit(self, frame: np.ndarray, results: Sequence[MotionMetrics]):
+        """Queue a frame and its analysis results for rendering and encoding"""
+        if self.error is not None:
+            return
+        poses = []
+        for motion_metrics in results:
+            for pose in motion_metrics.poses:
+                landmarks = pose["landmarks"]
+                array = landmarks.array if isinstance(landmarks, LandmarkSet) else \
+                    LandmarkSet.from_landmarks(landmarks).array
+                poses.append((array.copy(), list(motion_metrics.joint_angles)))
+        item = (frame.copy(), poses)
+        if self.drop_when_full:
+            try:
+                self._queue.put_nowait(item)
+            except queue.Full:
+                self.frames_dropped += 1
+        else:
+            self._queue.put(item)
+    
+    def _open(self, frame: np.ndarray) -> cv2.VideoWriter:
+        height, width = frame.shape[:2]
+        writer = cv2.VideoWriter(self.path, cv2.VideoWriter_fourcc(*self.fourcc), self.fps, (width, height))
+        if not writer.isOpened():
+            raise RuntimeError(f"Cannot open video writer for {self.path} ({self.fourcc})")
+        return writer
+    
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            if self.error is not None:
+                continue
+            frame, poses = item
+            if self._writer is None:
+                # Opened once; a failure is remembered instead of retried per frame
+                try:
+                    self._writer = self._open(frame)
+                except Exception as e:
+                    self.error = str(e)
+                    logger.error(f"Error opening annotated video {self.path}: {e}")
+                    continue
+            try:
+                for landmarks, joint_angles in poses:
+                    self.renderer.draw_pose(frame, landmarks, joint_angles)
+                self._writer.write(frame)
+                self.frames_written += 1
+            except Exception as e:
+                logger.error(f"Error writing annotated frame to {self.path}: {e}")
+    
+    def close(self):
+        """Flush queued frames and finalize the video file"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._writer is not None:
+            self._writer.release()
+        if self.error is not None:
+            logger.warning(f"Annotated video {self.path} was not written: {self.error}")
+        elif self.frames_written == 0:
+            logger.warning(f"Annotated video {self.path}: no frames were written")
+        if self.frames_dropped:
+            logger.warning(f"Annotated video {self.path}: dropped {self.frames_dropped} frames")
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Pipelined runner for the Intelligent Motion Analyzer
+
+Splits frame processing into capture, inference, analysis and sink stages
+connected by bounded queues, so frame decode and pose inference overlap.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, Optional
+import logging
+
+import numpy as np
+
+from instrumentation import metrics
+from motion_analyzer import MotionAnalyzer, MotionMetrics
+
+logger = logging.getLogger(__name__)
+
+class BackpressurePolicy(Enum):
+    BLOCK = "block"              # Producer waits for space (no frames lost)
+    DROP_OLDEST = "drop_oldest"  # Discard the oldest queued item (bounded latency)
+    DROP_NEWEST = "drop_newest"  # Discard the incoming item
+
+class QueueClosed(Exception):
+    """Raised by BoundedQueue.get once the queue is closed and drained"""
+
+class BoundedQueue:
+    """Thread-safe bounded FIFO with a configurable backpressure policy"""
+    
+    def __init__(self, maxsize: int, policy: BackpressurePolicy = BackpressurePolicy.BLOCK,
+                 name: str = "queue"):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.name = name
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self._items = deque()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+    
+    def __len__(self) -> int:
+        return len(self._items)
+    
+    def put(self, item: Any) -> bool:
+        """
+        Add an item according to the backpressure policy
+        
+        Returns:
+            False if the item was dropped or the queue is closed
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            if len(self._items) >= self.maxsize:
+                if self.policy == BackpressurePolicy.DROP_NEWEST:
+                    self.dropped += 1
+                    return False
+                if self.policy == BackpressurePolicy.DROP_OLDEST:
+                    self._items.popleft()
+                    self.dropped += 1
+                else:
+                    while len(self._items) >= self.maxsize and not self._closed:
+                        self._not_full.wait()
+                    if self._closed:
+                        return False
+            self._items.append(item)
+            metrics.set_gauge(f"queue_depth_{self.name}", len(self._items))
+            self._not_empty.notify()
+            return True
+    
+    def get(self) -> Any:
+        """Remove and return the next item, blocking until one is available"""
+        with self._lock:
+            while not self._items:
+                if self._closed:
+                    raise QueueClosed()
+                self._not_empty.wait()
+            item = self._items.popleft()
+            metrics.set_gauge(f"queue_depth_{self.name}", len(self._items))
+            self._not_full.notify()
+            return item
+    
+    def close(self):
+        """Stop accepting items; consumers drain what is left"""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+
+@dataclass
+class StageStats:
+    """Throughput counters for one pipeline stage"""
+    name: str
+    items: int = 0
+    busy_seconds: float = 0.0
+    started_at: float = field(default_factory=time.perf_counter)
+    finished_at: Optional[float] = None
+    
+    def record(self, seconds: float):
+        self.items += 1
+        self.busy_seconds += seconds
+    
+    def to_dict(self) -> Dict:
+        elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "items": self.items,
+            "fps": self.items / elapsed if elapsed > 0 else 0.0,
+            "avg_latency_ms": 1000.0 * self.busy_seconds / self.items if self.items else 0.0,
+            "utilization": self.busy_seconds / elapsed if elapsed > 0 else 0.0
+        }
+
+class PipelinedRunner:
+    """
+    Runs capture, inference, analysis and sink as separate stages
+    
+    Capture, inference and analysis each run on their own thread. The sink
+    runs on the calling thread so GUI calls such as cv2.imshow stay on the
+    main thread. Each stage handles items in order, so frame order is kept.
+    """
+    
+    def __init__(self, analyzer: MotionAnalyzer, capture,
+                 sink: Callable[[np.ndarray, MotionMetrics], bool],
+                 queue_size: int = 8,
+                 policy: BackpressurePolicy = BackpressurePolicy.BLOCK,
+                 max_frames: Optional[int] = None):
+        """
+        Args:
+            analyzer: Motion analyzer whose pose estimator and state are used
+            capture: Opened cv2.VideoCapture (or any object with read()); a
+                VideoSource also supplies source frame ids and timestamps
+            sink: Called with (frame, motion_metrics) per frame; return False to stop
+            queue_size: Capacity of each inter-stage queue
+            policy: Backpressure policy applied to every queue
+            max_frames: Stop after this many captured frames
+        """
+        self.analyzer = analyzer
+        self.capture = capture
+        self.sink = sink
+        self.max_frames = max_frames
+        self.queues = {name: BoundedQueue(queue_size, policy, name)
+                       for name in ("inference", "analysis", "sink")}
+        self.stats = {name: StageStats(name) for name in ("capture", "inference", "analysis", "sink")}
+        self._stop = threading.Event()
+        self._threads = []
+    
+    def run(self):
+        """Run the pipeline until the source ends or the sink asks to stop"""
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="inference", daemon=True),
+            threading.Thread(target=self._analysis_loop, name="analysis", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        
+        try:
+            self._sink_loop()
+        finally:
+            self.stop()
+            for thread in self._threads:
+                thread.join()
+    
+    def stop(self):
+        """Ask every stage to finish and unblock waiting threads"""
+        self._stop.set()
+        for queue in self.queues.values():
+            queue.close()
+    
+    def _capture_loop(self):
+        stats = self.stats["capture"]
+        frame_id = 0
+        frames = self.capture.frames() if hasattr(self.capture, "frames") else None
+        try:
+            while not self._stop.is_set():
+                if self.max_frames is not None and frame_id >= self.max_frames:
+                    break
+                start = time.perf_counter()
+                if frames is not None:
+                    video_frame = next(frames, None)
+                    if video_frame is None:
+                        break
+                    source_id, timestamp, frame = video_frame.frame_id, video_frame.timestamp, video_frame.image
+                else:
+                    ret, frame = self.capture.read()
+                    if not ret:
+                        break
+                    source_id, timestamp = frame_id, time.time()
+                stats.record(time.perf_counter() - start)
+                self.queues["inference"].put((source_id, timestamp, frame))
+                frame_id += 1
+        except Exception as e:
+            logger.error(f"Error in capture stage: {e}")
+        finally:
+            stats.finished_at = time.perf_counter()
+            self.queues["inference"].close()
+    
+    def _inference_loop(self):
+        stats = self.stats["inference"]
+        estimator = self.analyzer.pose_estimator
+        try:
+            while True:
+                frame_id, timestamp, frame = self.queues["inference"].get()
+                start = time.perf_counter()
+                landmarks = estimator.detect_pose(frame)
+                stats.record(time.perf_counter() - start)
+                self.queues["analysis"].put((frame_id, timestamp, frame, landmarks))
+        except QueueClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Error in inference stage: {e}")
+        finally:
+            stats.finished_at = time.perf_counter()
+            self.queues["analysis"].close()
+    
+    def _analysis_loop(self):
+        stats = self.stats["analysis"]
+        try:
+            while True:
+                frame_id, timestamp, frame, landmarks = self.queues["analysis"].get()
+                start = time.perf_counter()
+                motion_metrics = self.analyzer.analyze_landmarks(landmarks, frame_id, timestamp)
+                stats.record(time.perf_counter() - start)
+                self.queues["sink"].put((frame, motion_metrics))
+        except QueueClosed:
+            pass
+        except Exception as e:
+            logger.error(f"Error in analysis stage: {e}")
+        finally:
+            stats.finished_at = time.perf_counter()
+            self.queues["sink"].close()
+    
+    def _sink_loop(self):
+        stats = self.stats["sink"]
+        try:
+            while True:
+                frame, motion_metrics = self.queues["sink"].get()
+                start = time.perf_counter()
+                keep_going = self.sink(frame, motion_metrics)
+                stats.record(time.perf_counter() - start)
+                if keep_going is False:
+                    break
+        except QueueClosed:
+            pass
+        finally:
+            stats.finished_at = time.perf_counter()
+    
+    def get_stats(self) -> Dict:
+        """Per-stage throughput plus queue depth and drop counts"""
+        report = {name: stage.to_dict() for name, stage in self.stats.items()}
+        for name, queue in self.queues.items():
+            report[name]["queue_depth"] = len(queue)
+            report[name]["dropped"] = queue.dropped
+        return report
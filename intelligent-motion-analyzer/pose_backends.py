@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Pose backends besides MediaPipe: batched landmark models and landmark replay
+
+MotionAnalyzer works with any motion_analyzer.PoseBackend. Next to the
+MediaPipe PoseEstimator this module provides:
+
+- TFLitePoseBackend / OnnxPoseBackend: run a MediaPipe-style pose landmark
+  model (256x256 RGB in; 33 or 39 landmarks x 5 values and a presence
+  score out) on the CPU, ``batch_size`` frames or crops per call on
+  ``num_threads`` intra-op threads.
+- ReplayPoseBackend: hands back stored landmarks in order, for reproducible
+  runs and for timing everything except inference.
+
+Larger batches raise throughput at the cost of latency: a frame's result
+is ready only once its whole batch has run, and while tracking, every
+frame of a batch uses the region of interest found in the previous batch.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple, Type
+import logging
+
+import cv2
+import numpy as np
+
+from instrumentation import metrics
+from motion_analyzer import JointAngleTable, LandmarkSet, NUM_LANDMARKS, PoseBackend, PoseEstimator
+
+logger = logging.getLogger(__name__)
+
+# MediaPipe's landmark models emit 33 body landmarks plus 6 auxiliary ones
+_MODEL_LANDMARK_COUNTS = (NUM_LANDMARKS, 39)
+
+def _pick_outputs(outputs: Sequence[Tuple[object, Sequence]]) -> Tuple[object, object]:
+    """Find the landmark and presence outputs among (key, shape) pairs by their per-sample size"""
+    landmarks_key = presence_key = None
+    for key, shape in outputs:
+        if not all(isinstance(dim, (int, np.integer)) for dim in shape[1:]):
+            continue
+        size = int(np.prod(shape[1:]))
+        if landmarks_key is None and size % 5 == 0 and size // 5 in _MODEL_LANDMARK_COUNTS:
+            landmarks_key = key
+        elif presence_key is None and size == 1:
+            presence_key = key
+    if landmarks_key is None or presence_key is None:
+        raise ValueError("Model outputs do not look like a pose landmark model "
+                         "(need N x 33*5 or 39*5 landmarks and N x 1 presence)")
+    return landmarks_key, presence_key
+
+def _tflite_interpreter_class():
+    """TFLite interpreter from LiteRT, tflite-runtime or TensorFlow, whichever is installed"""
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        import tensorflow as tf
+        return tf.lite.Interpreter
+    except ImportError:
+        raise ImportError("The tflite backend needs tensorflow, tflite-runtime or ai-edge-litert")
+
+class _TFLiteRunner:
+    """TFLite interpreter resized to a fixed batch"""
+    
+    def __init__(self, model_path: str, batch_size: int, num_threads: int):
+        self.interpreter = _tflite_interpreter_class()(model_path=model_path, num_threads=num_threads)
+        model_input = self.interpreter.get_input_details()[0]
+        self.input_size = int(model_input["shape"][1])
+        self._input_index = model_input["index"]
+        self.interpreter.resize_tensor_input(self._input_index,
+                                             [batch_size, self.input_size, self.input_size, 3])
+        self.interpreter.allocate_tensors()
+        self._landmarks_index, self._presence_index = _pick_outputs(
+            [(output["index"], output["shape"]) for output in self.interpreter.get_output_details()])
+    
+    def run(self, inputs: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        # The interpreter always runs its full batch; rows past ``count`` are ignored
+        self.interpreter.set_tensor(self._input_index, inputs)
+        self.interpreter.invoke()
+        landmarks = self.interpreter.get_tensor(self._landmarks_index)[:count]
+        presence = self.interpreter.get_tensor(self._presence_index)[:count]
+        return landmarks.reshape(count, -1), presence.reshape(count)
+
+class _OnnxRunner:
+    """ONNX Runtime CPU session; NHWC or NCHW input, fixed or dynamic batch"""
+    
+    def __init__(self, model_path: str, batch_size: int, num_threads: int):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise ImportError("The onnx backend needs onnxruntime")
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        
+        model_input = self.session.get_inputs()[0]
+        shape = model_input.shape
+        self._input_name = model_input.name
+        self.channels_first = shape[1] == 3
+        self.input_size = int(shape[2] if self.channels_first else shape[1])
+        self.fixed_batch = shape[0] if isinstance(shape[0], int) else None
+        if self.fixed_batch is not None and self.fixed_batch != batch_size:
+            raise ValueError(f"{model_path} has a fixed batch of {self.fixed_batch}; "
+                             f"use batch_size={self.fixed_batch} or export with a dynamic batch")
+        self._landmarks_name, self._presence_name = _pick_outputs(
+            [(output.name, output.shape) for output in self.session.get_outputs()])
+    
+    def run(self, inputs: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+        batch = inputs if self.fixed_batch is not None else inputs[:count]
+        if self.channels_first:
+            batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+        landmarks, presence = self.session.run([self._landmarks_name, self._presence_name],
+                                               {self._input_name: batch})
+        return landmarks[:count].reshape(count, -1), presence[:count].reshape(count)
+
+class LandmarkModelBackend(PoseBackend):
+    """
+    Batched CPU pose landmark model
+    
+    Each frame is warped into the model's square input: the whole frame
+    (letterboxed) until a pose is found, then a padded square around the
+    last pose, as MediaPipe's tracker does. With ``static_image_mode`` every
+    image is used whole, which suits person crops from the multi-person path.
+    """
+    
+    runtime = ""
+    
+    def __init__(self, model_path: str, batch_size: int = 8, num_threads: Optional[int] = None,
+                 static_image_mode: bool = False, roi_padding: float = 0.25,
+                 min_presence: float = 0.5, roi_visibility: float = 0.5,
+                 joint_angle_table: Optional[JointAngleTable] = None):
+        """
+        Args:
+            model_path: Landmark model file
+            batch_size: Frames or crops per inference call
+            num_threads: Intra-op threads (defaults to all cores)
+            static_image_mode: Use every image whole instead of tracking a region of interest
+            roi_padding: Padding around the tracked pose, as a fraction of its size
+            min_presence: Presence probability (sigmoid of the model's presence
+                logit) below which no pose is reported
+            roi_visibility: Minimum visibility for landmarks used to place the region
+            joint_angle_table: Joint angles to compute (defaults to the lower body)
+        """
+        super().__init__(joint_angle_table)
+        self.model_path = model_path
+        self.batch_size = max(1, batch_size)
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.static_image_mode = static_image_mode
+        self.roi_padding = roi_padding
+        self.min_presence = min_presence
+        self.roi_visibility = roi_visibility
+        self._runner = None
+        self._roi: Optional[Tuple[float, float, float]] = None  # (center x, center y, side) in pixels
+        self._images: Optional[np.ndarray] = None  # uint8 warp targets, (batch, S, S, 3)
+        self._inputs: Optional[np.ndarray] = None  # float32 model input, (batch, S, S, 3)
+    
+    @property
+    def runner(self):
+        """Model runtime session, created on first use"""
+        if self._runner is None:
+            self._runner = RUNNERS[self.runtime](self.model_path, self.batch_size, self.num_threads)
+            size = self._runner.input_size
+            self._images = np.zeros((self.batch_size, size, size, 3), dtype=np.uint8)
+            self._inputs = np.zeros((self.batch_size, size, size, 3), dtype=np.float32)
+        return self._runner
+    
+    def reset(self):
+        """Forget the tracked region, e.g. after a scene cut"""
+        self._roi = None
+    
+    def close(self):
+        self._runner = None
+    
+    def detect_poses(self, frames: Sequence[np.ndarray]) -> List[Optional[LandmarkSet]]:
+        results: List[Optional[LandmarkSet]] = []
+        for start in range(0, len(frames), self.batch_size):
+            results.extend(self._detect_batch(frames[start:start + self.batch_size]))
+        return results
+    
+    def _region(self, frame: np.ndarray) -> Tuple[float, float, float]:
+        if self._roi is not None and not self.static_image_mode:
+            return self._roi
+        height, width = frame.shape[:2]
+        return width / 2.0, height / 2.0, float(max(width, height))
+    
+    def _track(self, landmarks: Optional[LandmarkSet], width: int, height: int):
+        """Place the next region of interest around a detected pose"""
+        self._roi = None
+        if landmarks is None:
+            return
+        array = landmarks.array
+        visible = array[:, 3] >= self.roi_visibility
+        if visible.sum() < 4:
+            return
+        xs = array[visible, 0] * width
+        ys = array[visible, 1] * height
+        side = max(xs.max() - xs.min(), ys.max() - ys.min()) * (1.0 + 2.0 * self.roi_padding)
+        if side >= 16:
+            self._roi = ((xs.min() + xs.max()) / 2.0, (ys.min() + ys.max()) / 2.0, float(side))
+    
+    def _detect_batch(self, frames: Sequence[np.ndarray]) -> List[Optional[LandmarkSet]]:
+        try:
+            runner = self.runner
+            size = runner.input_size
+            count = len(frames)
+            
+            # Warp each frame's region into the batch, then BGR -> RGB in [0, 1]
+            regions = []
+            with metrics.stage("preprocess"):
+                for index, frame in enumerate(frames):
+                    center_x, center_y, side = self._region(frame)
+                    scale = size / side
+                    transform = np.array([[scale, 0.0, size / 2.0 - center_x * scale],
+                                          [0.0, scale, size / 2.0 - center_y * scale]])
+                    cv2.warpAffine(frame, transform, (size, size), dst=self._images[index],
+                                   flags=cv2.INTER_LINEAR, borderMode=cv2.BORDER_CONSTANT)
+                    regions.append((center_x, center_y, side))
+                np.multiply(self._images[:count, ..., ::-1], 1.0 / 255.0, out=self._inputs[:count])
+            
+            with metrics.stage("inference"):
+                raw_landmarks, presence = runner.run(self._inputs, count)
+            
+            # The presence output is a logit, like the visibility values
+            presence = 1.0 / (1.0 + np.exp(-presence))
+            results: List[Optional[LandmarkSet]] = []
+            for index, frame in enumerate(frames):
+                if presence[index] < self.min_presence:
+                    results.append(None)
+                    continue
+                height, width = frame.shape[:2]
+                center_x, center_y, side = regions[index]
+                scale = side / size
+                raw = raw_landmarks[index].reshape(-1, 5)[:NUM_LANDMARKS]
+                array = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+                array[:, 0] = ((raw[:, 0] - size / 2.0) * scale + center_x) / width
+                array[:, 1] = ((raw[:, 1] - size / 2.0) * scale + center_y) / height
+                array[:, 2] = raw[:, 2] * scale / width
+                array[:, 3] = 1.0 / (1.0 + np.exp(-raw[:, 3]))
+                results.append(LandmarkSet(array))
+            
+            if not self.static_image_mode:
+                height, width = frames[-1].shape[:2]
+                self._track(results[-1], width, height)
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in batched pose detection: {e}")
+            return [None] * len(frames)
+
+class TFLitePoseBackend(LandmarkModelBackend):
+    """Landmark model on the TFLite interpreter"""
+    runtime = "tflite"
+
+class OnnxPoseBackend(LandmarkModelBackend):
+    """Landmark model on ONNX Runtime"""
+    runtime = "onnx"
+
+RUNNERS = {
+    "tflite": _TFLiteRunner,
+    "onnx": _OnnxRunner
+}
+
+class ReplayPoseBackend(PoseBackend):
+    """
+    Stored landmarks handed back in order instead of running a model
+    
+    Frames passed in are ignored, so a replay can drive MotionAnalyzer
+    without video (pass ``None`` frames) or alongside the original video.
+    """
+    
+    def __init__(self, path: str, batch_size: int = 1, loop: bool = False,
+                 joint_angle_table: Optional[JointAngleTable] = None):
+        """
+        Args:
+            path: Saved results or landmark arrays (see postprocess.iter_saved_landmarks)
+            batch_size: Preferred frames per detect_poses call
+            loop: Start over after the last stored frame instead of returning None
+        """
+        from postprocess import iter_saved_landmarks
+        
+        super().__init__(joint_angle_table)
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self.loop = loop
+        self.landmarks: List[Optional[LandmarkSet]] = [landmarks for _, _, landmarks in iter_saved_landmarks(path)]
+        self.position = 0
+    
+    def seek(self, index: int):
+        self.position = max(0, index)
+    
+    def detect_poses(self, frames: Sequence[Optional[np.ndarray]]) -> List[Optional[LandmarkSet]]:
+        results: List[Optional[LandmarkSet]] = []
+        for _ in frames:
+            if self.position >= len(self.landmarks):
+                if not self.loop or not self.landmarks:
+                    results.append(None)
+                    continue
+                self.position = 0
+            results.append(self.landmarks[self.position])
+            self.position += 1
+        return results
+
+POSE_BACKENDS: Dict[str, Type[PoseBackend]] = {
+    "mediapipe": PoseEstimator,
+    "tflite": TFLitePoseBackend,
+    "onnx": OnnxPoseBackend,
+    "replay": ReplayPoseBackend
+}
+
+def make_pose_backend(name: str, model_path: Optional[str] = None, batch_size: int = 1,
+                      num_threads: Optional[int] = None, **kwargs) -> PoseBackend:
+    """
+    Build a pose backend by name
+    
+    Args:
+        name: One of POSE_BACKENDS
+        model_path: Model file (tflite/onnx) or stored landmarks (replay)
+        batch_size: Frames per inference call (model and replay backends)
+        num_threads: Inference threads (model backends)
+        **kwargs: Backend-specific options, e.g. model_complexity for mediapipe
+    """
+    if name not in POSE_BACKENDS:
+        raise ValueError(f"Unknown pose backend: {name}")
+    if name == "mediapipe":
+        return PoseEstimator(**kwargs)
+    if model_path is None:
+        raise ValueError(f"The {name} backend needs a model or landmark file")
+    if name == "replay":
+        return ReplayPoseBackend(model_path, batch_size=batch_size, **kwargs)
+    return POSE_BACKENDS[name](model_path, batch_size=batch_size, num_threads=num_threads, **kwargs)
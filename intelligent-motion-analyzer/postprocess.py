@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Rerun gait and risk analysis on saved landmarks
+
+Replays landmarks stored by an earlier run through
+MotionAnalyzer.analyze_landmarks, e.g. after changing risk rules or
+smoothing. Only numpy and the analysis modules are imported; OpenCV and
+MediaPipe are never loaded, so start-up takes a fraction of a second.
+
+Accepted inputs:
+    results.json / results.ndjson   frame results written by motion_analyzer.py
+    session_dir/                    binary session (BinaryResultSink)
+    landmarks.npz                   ``landmarks`` (n, 33, 4) plus optional
+                                    ``detected``, ``frame_ids``, ``timestamps``
+                                    (landmark cache segments and columnar
+                                    exports qualify)
+    session.parquet                 columnar export (see columnar.py)
+    
+    python postprocess.py --input session_dir --output rerun.json --risk-rules rules.json
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from motion_analyzer import (
+    AnalysisType, DEFAULT_RISK_RULES, LANDMARK_FIELDS, LandmarkSet, MotionAnalyzer,
+    RiskRule, load_risk_rules
+)
+from result_writer import SessionReader, open_result_sink
+from smoothing import make_landmark_filter
+
+logger = logging.getLogger(__name__)
+
+SavedFrame = Tuple[int, float, Optional[LandmarkSet]]
+
+def _landmarks_from_pose(pose: Dict) -> LandmarkSet:
+    array = np.array([[landmark[field] for field in LANDMARK_FIELDS] for landmark in pose["landmarks"]],
+                     dtype=np.float32)
+    return LandmarkSet(array, interpolated=bool(pose.get("interpolated", False)))
+
+def _frame_from_dict(frame: Dict) -> SavedFrame:
+    poses = frame.get("poses") or []
+    landmarks = _landmarks_from_pose(poses[0]) if poses else None
+    return frame["frame_id"], frame["timestamp"], landmarks
+
+def _iter_arrays(landmarks: np.ndarray, detected: np.ndarray, frame_ids: np.ndarray,
+                 timestamps: np.ndarray) -> Iterator[SavedFrame]:
+    """Frames from columnar arrays; detected is 0 (none), 1 (detected) or 2 (interpolated)"""
+    for index in range(landmarks.shape[0]):
+        code = int(detected[index])
+        frame_landmarks = None
+        if code:
+            frame_landmarks = LandmarkSet(np.array(landmarks[index], dtype=np.float32),
+                                          interpolated=code == 2)
+        yield int(frame_ids[index]), float(timestamps[index]), frame_landmarks
+
+def iter_saved_landmarks(path: str, fps: float = 30.0) -> Iterator[SavedFrame]:
+    """
+    Read (frame_id, timestamp, landmarks) per frame from a saved result or landmark file
+    
+    Args:
+        path: JSON/NDJSON results, binary session directory, .npz landmark arrays
+            or .parquet columnar export
+        fps: Frame rate used to derive timestamps when the file stores none
+    """
+    if os.path.isdir(path):
+        reader = SessionReader(path)
+        yield from _iter_arrays(reader.landmarks, reader.column("detected"),
+                                reader.frame_ids, reader.timestamps)
+        return
+    
+    lowered = path.lower()
+    if lowered.endswith(".npz"):
+        with np.load(path) as data:
+            landmarks = data["landmarks"]
+            count = landmarks.shape[0]
+            if "detected" in data:
+                detected = data["detected"].astype(np.uint8)
+            else:
+                detected = np.ones(count, dtype=np.uint8)
+            frame_ids = data["frame_ids"] if "frame_ids" in data else np.arange(count)
+            timestamps = data["timestamps"] if "timestamps" in data else frame_ids / fps
+        yield from _iter_arrays(landmarks, detected, frame_ids, timestamps)
+    elif lowered.endswith(".parquet"):
+        from columnar import load_columns
+        
+        columns = load_columns(path, ["landmarks", "detected", "frame_ids", "timestamps"])
+        yield from _iter_arrays(columns["landmarks"], columns["detected"], columns["frame_ids"],
+                                columns["timestamps"])
+    elif lowered.endswith((".ndjson", ".jsonl")):
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                frame = json.loads(line)
+                if "frame_id" in frame:
+                    yield _frame_from_dict(frame)
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        for frame in data.get("frame_results", []):
+            yield _frame_from_dict(frame)
+
+def rerun_analysis(input_path: str, output: str,
+                   analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                   fmt: Optional[str] = None, smoothing: Optional[str] = None,
+                   risk_rules: Sequence[RiskRule] = DEFAULT_RISK_RULES,
+                   fps: float = 30.0) -> Dict:
+    """
+    Analyze saved landmarks and write fresh results
+    
+    Args:
+        input_path: Saved results or landmark arrays (see iter_saved_landmarks)
+        output: Result file or binary session directory to write
+        analysis_type: Analysis to run
+        fmt: Output format (default: inferred from the output path)
+        smoothing: Landmark filter name from smoothing.LANDMARK_FILTERS
+        risk_rules: Injury-risk rule table
+        fps: Frame rate for inputs without timestamps
+    
+    Returns:
+        Comprehensive analysis of the rerun
+    """
+    analyzer = MotionAnalyzer(analysis_type, landmark_filter=make_landmark_filter(smoothing),
+                              risk_rules=risk_rules)
+    sink = open_result_sink(output, fmt)
+    try:
+        for frame_id, timestamp, landmarks in iter_saved_landmarks(input_path, fps):
+            sink.write(analyzer.analyze_landmarks(landmarks, frame_id, timestamp))
+    finally:
+        comprehensive_analysis = analyzer.get_comprehensive_analysis()
+        sink.close(comprehensive_analysis)
+    return comprehensive_analysis
+
+def main():
+    """Command-line entry point for landmark post-processing"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Rerun motion analysis on saved landmarks")
+    parser.add_argument("--input", "-i", required=True,
+                       help="Saved results (json/ndjson), binary session directory, .npz landmarks "
+                            "or .parquet export")
+    parser.add_argument("--output", "-o", default="motion_analysis_rerun.json", help="Output file for results")
+    parser.add_argument("--format", "-f", choices=["json", "ndjson", "binary", "npz", "parquet"], default=None,
+                       help="Result format (default: inferred from the output path)")
+    parser.add_argument("--analysis-type", "-t", choices=[e.value for e in AnalysisType],
+                       default=AnalysisType.GAIT_ANALYSIS.value, help="Type of analysis to perform")
+    parser.add_argument("--smoothing", choices=["none", "one_euro", "kalman"], default="none",
+                       help="Temporal landmark filter applied before analysis")
+    parser.add_argument("--risk-rules", default=None,
+                       help="JSON file with the injury-risk rule table (list of RiskRule fields)")
+    parser.add_argument("--fps", type=float, default=30.0,
+                       help="Frame rate for inputs that store no timestamps")
+    args = parser.parse_args()
+    
+    risk_rules = load_risk_rules(args.risk_rules) if args.risk_rules else DEFAULT_RISK_RULES
+    rerun_analysis(args.input, args.output, AnalysisType(args.analysis_type), fmt=args.format,
+                   smoothing=args.smoothing, risk_rules=risk_rules, fps=args.fps)
+    logger.info(f"Analysis complete. Results saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""
+Streaming result sinks for motion analysis output
+
+Each frame is written as soon as it is produced, so memory stays flat and a
+crash loses at most the frames still buffered. Formats:
+
+- json:   the legacy ``{"frame_results": [...], "comprehensive_analysis": ...}`` layout
+- ndjson: one JSON object per line, summary on the last line
+- binary: a session directory of append-only columns that SessionReader memory-maps
+- npz / parquet: streamed as a binary session, converted to one flat columnar
+  table per session on close (see columnar.py)
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence
+import logging
+
+import numpy as np
+
+from motion_analyzer import (
+    DEFAULT_JOINT_ANGLES, LANDMARK_FIELDS, LandmarkSet, MotionMetrics, NUM_LANDMARKS,
+    serialize_poses
+)
+
+logger = logging.getLogger(__name__)
+
+def metrics_to_dict(metrics: MotionMetrics) -> Dict:
+    """Convert one frame of results into its JSON-serializable form"""
+    return {
+        "frame_id": metrics.frame_id,
+        "timestamp": metrics.timestamp,
+        "poses": serialize_poses(metrics.poses),
+        "joint_angles": [{"joint": ja.joint_name, "angle": ja.angle_degrees,
+                          "confidence": ja.confidence} for ja in metrics.joint_angles],
+        "gait_metrics": metrics.gait_metrics
+    }
+
+class ResultSink(ABC):
+    """Base class for per-frame result writers"""
+    
+    @abstractmethod
+    def write(self, metrics: MotionMetrics):
+        """Append one analyzed frame"""
+    
+    @abstractmethod
+    def close(self, comprehensive_analysis: Optional[Dict] = None):
+        """Write the session summary (if given) and release the output"""
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+class JsonResultSink(ResultSink):
+    """Streams the legacy single-document JSON layout one frame at a time"""
+    
+    def __init__(self, path: str, flush_every: int = 30):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "w")
+        self._file.write('{"frame_results": [\n')
+        self._first = True
+        self._pending = 0
+        self._closed = False
+    
+    def write(self, metrics: MotionMetrics):
+        if not self._first:
+            self._file.write(",\n")
+        json.dump(metrics_to_dict(metrics), self._file, default=float)
+        self._first = False
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+    
+    def close(self, comprehensive_analysis: Optional[Dict] = None):
+        if self._closed:
+            return
+        self._file.write('\n],\n"comprehensive_analysis": ')
+        json.dump(comprehensive_analysis, self._file, indent=2, default=float)
+        self._file.write("}\n")
+        self._file.close()
+        self._closed = True
+
+class NdjsonResultSink(ResultSink):
+    """Newline-delimited JSON: one frame per line, readable even after a crash"""
+    
+    def __init__(self, path: str, flush_every: int = 30):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "w")
+        self._pending = 0
+        self._closed = False
+    
+    def write(self, metrics: MotionMetrics):
+        self._file.write(json.dumps(metrics_to_dict(metrics), default=float))
+        self._file.write("\n")
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._file.flush()
+            self._pending = 0
+    
+    def close(self, comprehensive_analysis: Optional[Dict] = None):
+        if self._closed:
+            return
+        if comprehensive_analysis is not None:
+            self._file.write(json.dumps({"comprehensive_analysis": comprehensive_analysis}, default=float))
+            self._file.write("\n")
+        self._file.close()
+        self._closed = True
+
+class BinaryResultSink(ResultSink):
+    """
+    Append-only columnar session directory
+    
+    Layout (one record per frame, all little-endian):
+        landmarks.f32   float32 (33, 4), zeros when no pose was detected
+        angles.f32      float32 (J,) joint angles, NaN when missing
+        frame_ids.i64   int64
+        timestamps.f64  float64
+        detected.u8     uint8: 0 no pose, 1 detected, 2 interpolated
+        gait.ndjson     gait metrics for frames that have them
+        meta.json       column shapes and joint names
+        summary.json    comprehensive analysis, written on close
+    """
+    
+    COLUMNS = {
+        "landmarks": ("landmarks.f32", np.float32),
+        "angles": ("angles.f32", np.float32),
+        "frame_ids": ("frame_ids.i64", np.int64),
+        "timestamps": ("timestamps.f64", np.float64),
+        "detected": ("detected.u8", np.uint8)
+    }
+    
+    def __init__(self, path: str, joint_names: Optional[Sequence[str]] = None,
+                 flush_every: int = 30):
+        self.path = path
+        self.flush_every = flush_every
+        self.joint_names = list(joint_names or [spec.name for spec in DEFAULT_JOINT_ANGLES])
+        self._joint_index = {name: i for i, name in enumerate(self.joint_names)}
+        os.makedirs(path, exist_ok=True)
+        
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump({
+                "version": 1,
+                "num_landmarks": NUM_LANDMARKS,
+                "landmark_fields": list(LANDMARK_FIELDS),
+                "joint_names": self.joint_names
+            }, f, indent=2)
+        
+        self._files = {name: open(os.path.join(path, filename), "wb")
+                       for name, (filename, _) in self.COLUMNS.items()}
+        self._gait_file = open(os.path.join(path, "gait.ndjson"), "w")
+        self._empty_landmarks = np.zeros((NUM_LANDMARKS, len(LANDMARK_FIELDS)), dtype=np.float32)
+        self._angles = np.empty(len(self.joint_names), dtype=np.float32)
+        self._pending = 0
+        self._closed = False
+    
+    def write(self, metrics: MotionMetrics):
+        landmarks = self._empty_landmarks
+        if metrics.poses:
+            pose_landmarks = metrics.poses[0]["landmarks"]
+            if not isinstance(pose_landmarks, LandmarkSet):
+                pose_landmarks = LandmarkSet.from_landmarks(pose_landmarks)
+            landmarks = pose_landmarks.array
+        
+        self._angles.fill(np.nan)
+        for angle in metrics.joint_angles:
+            index = self._joint_index.get(angle.joint_name)
+            if index is not None:
+                self._angles[index] = angle.angle_degrees
+        
+        self._files["landmarks"].write(np.ascontiguousarray(landmarks, dtype=np.float32).tobytes())
+        self._files["angles"].write(self._angles.tobytes())
+        self._files["frame_ids"].write(np.int64(metrics.frame_id).tobytes())
+        self._files["timestamps"].write(np.float64(metrics.timestamp).tobytes())
+        self._files["detected"].write(np.uint8(self._detection_code(metrics)).tobytes())
+        
+        if metrics.gait_metrics:
+            self._gait_file.write(json.dumps({"frame_id": metrics.frame_id, **metrics.gait_metrics}, default=float))
+            self._gait_file.write("\n")
+        
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self._flush()
+    
+    @staticmethod
+    def _detection_code(metrics: MotionMetrics) -> int:
+        if not metrics.poses:
+            return 0
+        return 2 if metrics.poses[0].get("interpolated") else 1
+    
+    def _flush(self):
+        for f in self._files.values():
+            f.flush()
+        self._gait_file.flush()
+        self._pending = 0
+    
+    def close(self, comprehensive_analysis: Optional[Dict] = None):
+        if self._closed:
+            return
+        for f in self._files.values():
+            f.close()
+        self._gait_file.close()
+        if comprehensive_analysis is not None:
+            with open(os.path.join(self.path, "summary.json"), "w") as f:
+                json.dump(comprehensive_analysis, f, indent=2, default=float)
+        self._closed = True
+
+class SessionReader:
+    """
+    Memory-mapped reader for sessions written by BinaryResultSink
+    
+    Columns are mapped lazily and sliced without loading the whole session.
+    A trailing partial record left by a crash is ignored.
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        self.joint_names: List[str] = self.meta["joint_names"]
+        self._shapes = {
+            "landmarks": (self.meta["num_landmarks"], len(self.meta["landmark_fields"])),
+            "angles": (len(self.joint_names),),
+            "frame_ids": (),
+            "timestamps": (),
+            "detected": ()
+        }
+        self._columns: Dict[str, np.ndarray] = {}
+        self.num_frames = min(self._record_count(name) for name in BinaryResultSink.COLUMNS)
+    
+    def _record_count(self, name: str) -> int:
+        filename, dtype = BinaryResultSink.COLUMNS[name]
+        record_size = np.dtype(dtype).itemsize * int(np.prod(self._shapes[name], dtype=np.int64))
+        file_path = os.path.join(self.path, filename)
+        return os.path.getsize(file_path) // record_size if os.path.exists(file_path) else 0
+    
+    def __len__(self) -> int:
+        return self.num_frames
+    
+    def column(self, name: str) -> np.ndarray:
+        """Memory-mapped view of one column, shape (frames,) + record shape"""
+        if name not in self._columns:
+            filename, dtype = BinaryResultSink.COLUMNS[name]
+            if self.num_frames == 0:
+                self._columns[name] = np.zeros((0,) + self._shapes[name], dtype=dtype)
+            else:
+                self._columns[name] = np.memmap(os.path.join(self.path, filename), dtype=dtype,
+                                                mode="r", shape=(self.num_frames,) + self._shapes[name])
+        return self._columns[name]
+    
+    @property
+    def landmarks(self) -> np.ndarray:
+        return self.column("landmarks")
+    
+    @property
+    def angles(self) -> np.ndarray:
+        return self.column("angles")
+    
+    @property
+    def frame_ids(self) -> np.ndarray:
+        return self.column("frame_ids")
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.column("timestamps")
+    
+    @property
+    def detected(self) -> np.ndarray:
+        """True for frames with a detected (not interpolated) pose"""
+        return self.column("detected") == 1
+    
+    @property
+    def has_pose(self) -> np.ndarray:
+        """True for frames with a detected or interpolated pose"""
+        return self.column("detected") > 0
+    
+    def slice_frames(self, start_frame: int, stop_frame: int) -> Dict[str, np.ndarray]:
+        """
+        Columns for frames with start_frame <= frame_id < stop_frame
+        
+        Frame ids are written in increasing order, so the range is located
+        with a binary search and every column is returned as a memmap view.
+        """
+        frame_ids = self.frame_ids
+        lo = int(np.searchsorted(frame_ids, start_frame, side="left"))
+        hi = int(np.searchsorted(frame_ids, stop_frame, side="left"))
+        return {name: self.column(name)[lo:hi] for name in BinaryResultSink.COLUMNS}
+    
+    def summary(self) -> Optional[Dict]:
+        """Comprehensive analysis stored at close, if the session finished cleanly"""
+        summary_path = os.path.join(self.path, "summary.json")
+        if not os.path.exists(summary_path):
+            return None
+        with open(summary_path) as f:
+            return json.load(f)
+
+RESULT_FORMATS = ("json", "ndjson", "binary", "npz", "parquet")
+
+def infer_format(path: str) -> str:
+    """Pick a result format from the output path"""
+    lowered = path.lower()
+    if lowered.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    if lowered.endswith(".json"):
+        return "json"
+    if lowered.endswith((".npz", ".parquet")):
+        return lowered.rsplit(".", 1)[1]
+    return "binary"
+
+def open_result_sink(path: str, fmt: Optional[str] = None, **kwargs) -> ResultSink:
+    """
+    Create a streaming sink for ``path``
+    
+    Args:
+        path: Output file (json/ndjson/npz/parquet) or session directory (binary)
+        fmt: One of RESULT_FORMATS; inferred from the path when omitted
+    """
+    fmt = fmt or infer_format(path)
+    if fmt == "json":
+        return JsonResultSink(path, **kwargs)
+    if fmt == "ndjson":
+        return NdjsonResultSink(path, **kwargs)
+    if fmt == "binary":
+        return BinaryResultSink(path, **kwargs)
+    if fmt in ("npz", "parquet"):
+        from columnar import ColumnarResultSink
+        return ColumnarResultSink(path, fmt, **kwargs)
+    raise ValueError(f"Unknown result format: {fmt}")
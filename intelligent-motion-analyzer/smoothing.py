@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Temporal landmark smoothing between pose detection and analysis
+
+Filters update all 33 x 3 coordinates with a handful of array operations
+per frame and use each landmark's visibility as measurement confidence:
+a poorly visible landmark moves the estimate less than a clearly visible one.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+from typing import Dict, Optional, Type
+import logging
+
+import numpy as np
+
+from motion_analyzer import LandmarkSet
+
+logger = logging.getLogger(__name__)
+
+class LandmarkFilter:
+    """
+    Base class for per-stream temporal landmark filters
+    
+    Subclasses implement ``_initialize`` and ``_step`` on (N, 3) float64
+    coordinate arrays; gap handling and LandmarkSet conversion live here.
+    """
+    
+    def __init__(self, min_confidence: float = 0.05, max_gap_seconds: float = 0.5,
+                 default_fps: float = 30.0):
+        """
+        Args:
+            min_confidence: Floor on visibility-derived confidence, so occluded
+                landmarks still converge slowly instead of freezing
+            max_gap_seconds: Longer gaps between frames restart the filter
+            default_fps: Frame rate assumed when timestamps do not advance
+        """
+        self.min_confidence = min_confidence
+        self.max_gap_seconds = max_gap_seconds
+        self.default_fps = default_fps
+        self._last_time: Optional[float] = None
+    
+    def reset(self):
+        """Forget the filter state, e.g. after the subject was lost"""
+        self._last_time = None
+    
+    def filter(self, landmarks: LandmarkSet, timestamp: float) -> LandmarkSet:
+        """
+        Smooth one frame of landmarks
+        
+        Args:
+            landmarks: Landmarks detected (or extrapolated) for this frame
+            timestamp: Capture time in seconds
+        
+        Returns:
+            New LandmarkSet with filtered x/y/z and the original visibility
+        """
+        array = landmarks.array
+        measurement = array[:, :3].astype(np.float64)
+        confidence = np.clip(array[:, 3:4], self.min_confidence, 1.0).astype(np.float64)
+        
+        if self._last_time is None or timestamp - self._last_time > self.max_gap_seconds:
+            self._initialize(measurement)
+            self._last_time = timestamp
+            return landmarks
+        
+        dt = timestamp - self._last_time
+        if dt <= 0.0:
+            dt = 1.0 / self.default_fps
+        self._last_time = timestamp
+        
+        out = np.empty_like(array)
+        out[:, :3] = self._step(measurement, confidence, dt)
+        out[:, 3] = array[:, 3]
+        return LandmarkSet(out, interpolated=landmarks.interpolated)
+    
+    def _initialize(self, measurement: np.ndarray):
+        raise NotImplementedError
+    
+    def _step(self, measurement: np.ndarray, confidence: np.ndarray, dt: float) -> np.ndarray:
+        raise NotImplementedError
+
+def _smoothing_factor(cutoff, dt: float):
+    tau = 1.0 / (2.0 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+class OneEuroFilter(LandmarkFilter):
+    """
+    One-Euro filter (Casiez et al., 2012) over all landmark coordinates
+    
+    An adaptive low-pass filter: the cut-off rises with speed, so slow
+    jitter is smoothed heavily while fast movements keep little lag. The
+    smoothing factor is additionally scaled by landmark visibility.
+    """
+    
+    def __init__(self, min_cutoff: float = 1.0, beta: float = 20.0, d_cutoff: float = 1.0, **kwargs):
+        """
+        Args:
+            min_cutoff: Cut-off frequency (Hz) at rest; lower means smoother
+            beta: Cut-off increase per unit of speed (normalized units per second)
+            d_cutoff: Cut-off frequency (Hz) of the derivative filter
+        """
+        super().__init__(**kwargs)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._x: Optional[np.ndarray] = None
+        self._dx: Optional[np.ndarray] = None
+    
+    def _initialize(self, measurement: np.ndarray):
+        self._x = measurement
+        self._dx = np.zeros_like(measurement)
+    
+    def _step(self, measurement: np.ndarray, confidence: np.ndarray, dt: float) -> np.ndarray:
+        dx = (measurement - self._x) / dt
+        self._dx += _smoothing_factor(self.d_cutoff, dt) * (dx - self._dx)
+        cutoff = self.min_cutoff + self.beta * np.abs(self._dx)
+        alpha = _smoothing_factor(cutoff, dt) * confidence
+        self._x += alpha * (measurement - self._x)
+        return self._x
+
+class KalmanFilter(LandmarkFilter):
+    """
+    Constant-velocity Kalman filter, one independent 2-state filter per coordinate
+    
+    The 2x2 covariances are kept as three (N, 3) arrays, so predict and
+    update are plain element-wise operations. Measurement noise is divided
+    by squared visibility.
+    """
+    
+    def __init__(self, process_noise: float = 1.0, measurement_noise: float = 3e-5, **kwargs):
+        """
+        Args:
+            process_noise: White-acceleration spectral density (units^2 / s^3)
+            measurement_noise: Coordinate variance of a fully visible landmark
+        """
+        super().__init__(**kwargs)
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self._x: Optional[np.ndarray] = None
+    
+    def _initialize(self, measurement: np.ndarray):
+        self._x = measurement
+        self._v = np.zeros_like(measurement)
+        self._p00 = np.full_like(measurement, self.measurement_noise)
+        self._p01 = np.zeros_like(measurement)
+        self._p11 = np.full_like(measurement, 1.0)
+    
+    def _step(self, measurement: np.ndarray, confidence: np.ndarray, dt: float) -> np.ndarray:
+        q = self.process_noise
+        
+        # Predict
+        self._x += self._v * dt
+        self._p00 += dt * (2.0 * self._p01 + dt * self._p11) + q * dt ** 3 / 3.0
+        self._p01 += dt * self._p11 + q * dt ** 2 / 2.0
+        self._p11 += q * dt
+        
+        # Update with visibility-weighted measurement noise
+        r = self.measurement_noise / (confidence * confidence)
+        innovation = measurement - self._x
+        s = self._p00 + r
+        k0 = self._p00 / s
+        k1 = self._p01 / s
+        self._x += k0 * innovation
+        self._v += k1 * innovation
+        self._p11 -= k1 * self._p01
+        self._p01 *= 1.0 - k0
+        self._p00 *= 1.0 - k0
+        return self._x
+
+LANDMARK_FILTERS: Dict[str, Type[LandmarkFilter]] = {
+    "one_euro": OneEuroFilter,
+    "kalman": KalmanFilter
+}
+
+def make_landmark_filter(name: Optional[str], **kwargs) -> Optional[LandmarkFilter]:
+    """
+    Build a landmark filter by name
+    
+    Args:
+        name: One of LANDMARK_FILTERS, or None/"none" for no smoothing
+    """
+    if name is None or name == "none":
+        return None
+    if name not in LANDMARK_FILTERS:
+        raise ValueError(f"Unknown landmark filter: {name}")
+    return LANDMARK_FILTERS[name](**kwargs)
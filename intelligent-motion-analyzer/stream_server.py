@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Multi-stream camera server
+
+Ingests many video sources, keeps per-stream analysis state and schedules
+frames onto a fixed-size pool of PoseEstimator workers. Each stream holds
+only its latest frame, so a slow or stalled stream never blocks the others
+and CPU cost follows the worker count rather than the stream count.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple, Union
+import logging
+
+import cv2
+import numpy as np
+
+from motion_analyzer import AnalysisType, MotionAnalyzer, MotionMetrics, PoseBackend, PoseEstimator
+
+logger = logging.getLogger(__name__)
+
+ResultCallback = Callable[[str, np.ndarray, MotionMetrics], None]
+
+@dataclass
+class StreamConfig:
+    """One video source served by the StreamServer"""
+    stream_id: str
+    source: Union[int, str]          # Camera index, file path or stream URL
+    max_fps: Optional[float] = None  # Analysis rate cap for this stream
+    realtime: bool = True            # Pace file sources at their native fps
+    reconnect_delay: float = 2.0     # Seconds before reopening a failed live source
+
+class StreamState:
+    """Per-stream frame slot, analyzer state and counters"""
+    
+    def __init__(self, config: StreamConfig, analysis_type: AnalysisType,
+                 max_history_seconds: Optional[float]):
+        self.config = config
+        # The analyzer only consumes landmarks; inference happens on the shared pool
+        self.analyzer = MotionAnalyzer(analysis_type, max_history_seconds=max_history_seconds)
+        self.latest: Optional[Tuple[int, float, np.ndarray]] = None
+        self.capture: Optional[cv2.VideoCapture] = None
+        self.in_flight = False
+        self.finished = False
+        self.last_dispatch = 0.0
+        self.frames_captured = 0
+        self.frames_processed = 0
+        self.frames_skipped = 0
+        self.last_frame_time: Optional[float] = None
+    
+    @property
+    def min_interval(self) -> float:
+        return 1.0 / self.config.max_fps if self.config.max_fps else 0.0
+    
+    def stats(self) -> Dict:
+        return {
+            "source": str(self.config.source),
+            "frames_captured": self.frames_captured,
+            "frames_processed": self.frames_processed,
+            "frames_skipped": self.frames_skipped,
+            "finished": self.finished,
+            "seconds_since_last_frame": (time.time() - self.last_frame_time
+                                         if self.last_frame_time else None)
+        }
+
+class StreamServer:
+    """
+    Serves N video sources with a fixed pool of pose inference workers
+    
+    Scheduling is round-robin over streams that have a fresh frame, no frame
+    in flight and whose fps cap allows another frame. Keeping at most one
+    frame in flight per stream preserves per-stream frame order, so each
+    stream's GaitAnalyzer and history are updated sequentially.
+    """
+    
+    def __init__(self, streams: List[StreamConfig], workers: int = 2,
+                 analysis_type: AnalysisType = AnalysisType.GAIT_ANALYSIS,
+                 on_result: Optional[ResultCallback] = None,
+                 model_complexity: int = 1,
+                 max_history_seconds: Optional[float] = 300.0,
+                 estimator_factory: Optional[Callable[[], PoseBackend]] = None,
+                 join_timeout: float = 5.0):
+        """
+        Args:
+            streams: Sources to ingest
+            workers: Number of PoseEstimator workers shared by all streams
+            analysis_type: Type of analysis to perform per stream
+            on_result: Called with (stream_id, frame, metrics) from worker threads
+            model_complexity: MediaPipe model complexity for the default workers
+            max_history_seconds: History window kept per stream
+            estimator_factory: Builds one pose estimator per worker (default: MediaPipe
+                in static image mode). Frames from different streams interleave on
+                each worker, so the estimator must not track across frames.
+            join_timeout: Seconds stop() waits for each thread
+        """
+        self.streams = {config.stream_id: StreamState(config, analysis_type, max_history_seconds)
+                        for config in streams}
+        self.workers = workers
+        self.on_result = on_result
+        self.model_complexity = model_complexity
+        self.estimator_factory = estimator_factory or (
+            lambda: PoseEstimator(model_complexity=model_complexity, static_image_mode=True))
+        self.join_timeout = join_timeout
+        self._order = list(self.streams)
+        self._next = 0
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def start(self):
+        """Start one reader thread per stream and the inference workers"""
+        for state in self.streams.values():
+            self._threads.append(threading.Thread(target=self._read_loop, args=(state,),
+                                                  name=f"reader-{state.config.stream_id}", daemon=True))
+        for index in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop,
+                                                  name=f"pose-worker-{index}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+    
+    def stop(self):
+        """
+        Stop all threads
+        
+        Each thread gets ``join_timeout`` seconds. A reader blocked in
+        cap.read() on a stalled live source has its capture released to
+        unblock it; threads still running after that are logged and left
+        behind (they are daemons).
+        """
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(self.join_timeout)
+        
+        stuck = [thread for thread in self._threads if thread.is_alive()]
+        if stuck:
+            for state in self.streams.values():
+                if state.capture is not None:
+                    state.capture.release()
+            for thread in stuck:
+                thread.join(self.join_timeout)
+            for thread in stuck:
+                if thread.is_alive():
+                    logger.warning(f"Thread {thread.name} did not stop within {self.join_timeout}s")
+        self._threads = []
+    
+    def wait(self):
+        """Block until every stream has finished (file sources) or stop() is called"""
+        with self._cond:
+            while not self._stop.is_set() and not all(
+                    state.finished and state.latest is None and not state.in_flight
+                    for state in self.streams.values()):
+                self._cond.wait(timeout=0.5)
+    
+    def _open(self, source: Union[int, str]):
+        return cv2.VideoCapture(int(source) if str(source).isdigit() else source)
+    
+    def _read_loop(self, state: StreamState):
+        config = state.config
+        is_file = os.path.isfile(str(config.source))
+        frame_seq = 0
+        
+        while not self._stop.is_set():
+            cap = self._open(config.source)
+            state.capture = cap
+            if not cap.isOpened():
+                logger.error(f"Stream {config.stream_id}: cannot open {config.source}")
+                if is_file:
+                    break
+                self._stop.wait(config.reconnect_delay)
+                continue
+            
+            frame_interval = 1.0 / (cap.get(cv2.CAP_PROP_FPS) or 30.0) if is_file and config.realtime else 0.0
+            next_frame_at = time.perf_counter()
+            while not self._stop.is_set():
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                with self._cond:
+                    if state.latest is not None:
+                        state.frames_skipped += 1  # Overwritten before any worker took it
+                    state.latest = (frame_seq, time.time(), frame)
+                    state.frames_captured += 1
+                    state.last_frame_time = time.time()
+                    self._cond.notify()
+                frame_seq += 1
+                
+                if frame_interval:
+                    next_frame_at += frame_interval
+                    delay = next_frame_at - time.perf_counter()
+                    if delay > 0:
+                        self._stop.wait(delay)
+            cap.release()
+            state.capture = None
+            
+            if is_file:
+                break
+            logger.warning(f"Stream {config.stream_id}: source stalled, reconnecting")
+            self._stop.wait(config.reconnect_delay)
+        
+        with self._cond:
+            state.finished = True
+            self._cond.notify_all()
+    
+    def _next_job(self) -> Optional[Tuple[StreamState, int, float, np.ndarray]]:
+        """Pick the next eligible stream round-robin; blocks until one is ready"""
+        with self._cond:
+            while not self._stop.is_set():
+                now = time.perf_counter()
+                wait_for = None
+                count = len(self._order)
+                for offset in range(count):
+                    state = self.streams[self._order[(self._next + offset) % count]]
+                    if state.latest is None or state.in_flight:
+                        continue
+                    ready_at = state.last_dispatch + state.min_interval
+                    if ready_at > now:
+                        wait_for = ready_at - now if wait_for is None else min(wait_for, ready_at - now)
+                        continue
+                    self._next = (self._next + offset + 1) % count
+                    frame_seq, timestamp, frame = state.latest
+                    state.latest = None
+                    state.in_flight = True
+                    state.last_dispatch = now
+                    return state, frame_seq, timestamp, frame
+                self._cond.wait(timeout=wait_for if wait_for is not None else 0.5)
+            return None
+    
+    def _worker_loop(self):
+        # Frames from different streams interleave on each worker, so the
+        # estimator factory builds estimators without cross-frame tracking
+        estimator = self.estimator_factory()
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            state, frame_seq, timestamp, frame = job
+            try:
+                landmarks = estimator.detect_pose(frame)
+                metrics = state.analyzer.analyze_landmarks(landmarks, frame_seq, timestamp)
+                state.frames_processed += 1
+                if self.on_result:
+                    self.on_result(state.config.stream_id, frame, metrics)
+            except Exception as e:
+                logger.error(f"Stream {state.config.stream_id}: error processing frame {frame_seq}: {e}")
+            finally:
+                with self._cond:
+                    state.in_flight = False
+                    self._cond.notify_all()
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        """Per-stream capture/processing counters"""
+        with self._cond:
+            return {stream_id: state.stats() for stream_id, state in self.streams.items()}
+    
+    def get_stream_analysis(self, stream_id: str) -> Dict:
+        """Comprehensive analysis for one stream"""
+        return self.streams[stream_id].analyzer.get_comprehensive_analysis()
+
+def main():
+    """Serve several sources and stream per-stream results to disk"""
+    import argparse
+    from result_writer import open_result_sink
+    
+    parser = argparse.ArgumentParser(description="Intelligent Motion Analyzer - multi-stream server")
+    parser.add_argument("--source", "-s", action="append", required=True,
+                        help="Camera index, video file or stream URL (repeat for more streams)")
+    parser.add_argument("--workers", "-w", type=int, default=2, help="Number of pose inference workers")
+    parser.add_argument("--max-fps", type=float, default=None, help="Per-stream analysis fps cap")
+    parser.add_argument("--output-dir", "-o", default="stream_results", help="Directory for per-stream results")
+    parser.add_argument("--analysis-type", "-t", choices=[e.value for e in AnalysisType],
+                        default=AnalysisType.GAIT_ANALYSIS.value, help="Type of analysis to perform")
+    parser.add_argument("--stats-interval", type=float, default=10.0, help="Seconds between stats log lines")
+    parser.add_argument("--model-complexity", type=int, choices=[0, 1, 2], default=1,
+                        help="MediaPipe model complexity for the workers")
+    parser.add_argument("--pose-backend", choices=["mediapipe", "tflite", "onnx"], default="mediapipe",
+                        help="Pose inference backend for the workers")
+    parser.add_argument("--pose-model", default=None, help="Model file for the tflite/onnx backends")
+    parser.add_argument("--pose-threads", type=int, default=None,
+                        help="Inference threads per worker (tflite/onnx backends)")
+    args = parser.parse_args()
+    if args.pose_backend != "mediapipe" and not args.pose_model:
+        parser.error(f"--pose-backend {args.pose_backend} needs --pose-model")
+    
+    def build_estimator() -> PoseBackend:
+        if args.pose_backend == "mediapipe":
+            return PoseEstimator(model_complexity=args.model_complexity, static_image_mode=True)
+        from pose_backends import make_pose_backend
+        return make_pose_backend(args.pose_backend, args.pose_model, batch_size=1,
+                                 num_threads=args.pose_threads, static_image_mode=True)
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    configs = [StreamConfig(f"stream{index}", source, max_fps=args.max_fps)
+               for index, source in enumerate(args.source)]
+    sinks = {config.stream_id: open_result_sink(os.path.join(args.output_dir, f"{config.stream_id}.ndjson"))
+             for config in configs}
+    sink_locks = {stream_id: threading.Lock() for stream_id in sinks}
+    
+    def write_result(stream_id: str, frame: np.ndarray, metrics: MotionMetrics):
+        with sink_locks[stream_id]:
+            sinks[stream_id].write(metrics)
+    
+    server = StreamServer(configs, workers=args.workers,
+                          analysis_type=AnalysisType(args.analysis_type), on_result=write_result,
+                          estimator_factory=build_estimator)
+    server.start()
+    logger.info(f"Serving {len(configs)} streams on {args.workers} workers")
+    
+    try:
+        waiter = threading.Thread(target=server.wait, daemon=True)
+        waiter.start()
+        while waiter.is_alive():
+            waiter.join(timeout=args.stats_interval)
+            for stream_id, stats in server.get_stats().items():
+                logger.info(f"{stream_id}: {stats}")
+    except KeyboardInterrupt:
+        logger.info("Server interrupted by user")
+    finally:
+        server.stop()
+        for stream_id, sink in sinks.items():
+            sink.close(server.get_stream_analysis(stream_id))
+
+if __name__ == "__main__":
+    main()
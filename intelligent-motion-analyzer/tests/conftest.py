@@ -0,0 +1,25 @@
+"""
+Shared pytest setup: put the package directory on sys.path
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import walking_sequence  # noqa: E402
+
+@pytest.fixture(scope="session")
+def walking():
+    """Ten seconds of synthetic walking at 30 fps and 110 steps/min, shape (300, 33, 4)"""
+    return walking_sequence(300, fps=30.0, cadence=110.0)
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(0)
@@ -0,0 +1,40 @@
+"""
+Test helpers: tiny generated videos and a pose backend that needs no model
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from motion_analyzer import LandmarkSet, PoseBackend
+
+def write_index_video(path: str, frames: int, size=(64, 48), fps: float = 30.0) -> str:
+    """Write a lossless video whose frame i is a flat gray image of value i (at most 256 frames)"""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"FFV1"), fps, size)
+    for index in range(frames):
+        writer.write(np.full((size[1], size[0], 3), index, dtype=np.uint8))
+    writer.release()
+    return path
+
+def frame_index(frame: np.ndarray) -> int:
+    return int(round(float(frame.mean())))
+
+class FrameIndexBackend(PoseBackend):
+    """Returns poses[i] for frame i of an index video; frames listed in ``missing`` have no pose"""
+    
+    def __init__(self, poses: np.ndarray, missing=()):
+        super().__init__()
+        self.poses = poses
+        self.missing = set(missing)
+        self.calls = 0
+    
+    def detect_pose(self, frame: np.ndarray) -> Optional[LandmarkSet]:
+        self.calls += 1
+        index = frame_index(frame)
+        if index in self.missing:
+            return None
+        return LandmarkSet(self.poses[index % len(self.poses)])
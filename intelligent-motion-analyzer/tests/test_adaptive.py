@@ -0,0 +1,106 @@
+"""
+Tests for adaptive frame skipping and ROI-cropped detection
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from adaptive import AdaptivePoseEstimator
+from motion_analyzer import LandmarkSet, PoseBackend
+
+class ListBackend(PoseBackend):
+    """Hands out the given poses in order, ignoring frames"""
+    
+    def __init__(self, poses):
+        super().__init__()
+        self.poses = list(poses)
+        self.shapes = []
+    
+    def detect_pose(self, frame):
+        self.shapes.append(frame.shape)
+        return LandmarkSet(self.poses.pop(0)) if self.poses else None
+
+class BrightestPixelBackend(PoseBackend):
+    """Puts every landmark on the brightest canvas pixel, so crop mapping can be checked"""
+    
+    def __init__(self):
+        super().__init__()
+        self.shapes = []
+    
+    def detect_pose(self, frame):
+        self.shapes.append(frame.shape)
+        y, x = np.unravel_index(np.argmax(frame[:, :, 0]), frame.shape[:2])
+        array = np.zeros((33, 4), dtype=np.float32)
+        array[:, 0] = (x + 0.5) / frame.shape[1]
+        array[:, 1] = (y + 0.5) / frame.shape[0]
+        array[:, 3] = 1.0
+        return LandmarkSet(array)
+
+def test_is_a_pose_backend(walking):
+    inner = ListBackend([walking[0]])
+    adaptive = AdaptivePoseEstimator(inner, use_roi=False)
+    assert isinstance(adaptive, PoseBackend)
+    assert adaptive.joint_angle_table is inner.joint_angle_table
+    assert adaptive.joint_connections is inner.joint_connections
+    assert not hasattr(adaptive, "model_complexity")
+    landmarks = adaptive.detect_pose(np.zeros((48, 64, 3), dtype=np.uint8))
+    assert [angle.joint_name for angle in adaptive.calculate_joint_angles(landmarks)]
+
+def test_interval_grows_while_still_and_extrapolates(walking):
+    still = np.repeat(walking[:1], 20, axis=0)
+    adaptive = AdaptivePoseEstimator(ListBackend(still), max_interval=4, use_roi=False)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    results = [adaptive.detect_pose(frame) for _ in range(20)]
+    
+    assert adaptive.interval == 4
+    assert adaptive.detector_calls < 20
+    interpolated = [landmarks for landmarks in results if landmarks.interpolated]
+    assert len(interpolated) == adaptive.frames_interpolated > 0
+    np.testing.assert_allclose(interpolated[-1].array[:, :2], walking[0, :, :2], atol=1e-6)
+
+def test_interval_resets_on_motion(walking):
+    moving = walking[::6][:10]  # Large per-frame displacement
+    adaptive = AdaptivePoseEstimator(ListBackend(moving), motion_threshold=1e-4, use_roi=False)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for _ in range(10):
+        assert not adaptive.detect_pose(frame).interpolated
+    assert adaptive.get_stats()["detector_call_ratio"] == 1.0
+
+@pytest.mark.parametrize("frame_shape", [(480, 640, 3), (720, 300, 3)])
+def test_roi_crops_use_static_estimator_on_fixed_canvas(walking, frame_shape):
+    height, width = frame_shape[:2]
+    pose = walking[0].copy()
+    full = ListBackend([pose] * 5)
+    crops = BrightestPixelBackend()
+    adaptive = AdaptivePoseEstimator(full, roi_estimator=crops, roi_max_side=128)
+    
+    frame = np.zeros(frame_shape, dtype=np.uint8)
+    marker_x, marker_y = int(pose[25, 0] * width), int(pose[25, 1] * height)  # Left knee
+    frame[marker_y - 1:marker_y + 2, marker_x - 1:marker_x + 2] = 255
+    
+    adaptive.detect_pose(frame)  # No previous pose: full frame
+    landmarks = adaptive.detect_pose(frame)
+    assert len(full.shapes) == 1
+    assert crops.shapes == [(128, 128, 3)]
+    assert landmarks.array[0, 0] * width == pytest.approx(marker_x + 0.5, abs=3)
+    assert landmarks.array[0, 1] * height == pytest.approx(marker_y + 0.5, abs=3)
+
+def test_roi_disabled_without_static_estimator(walking):
+    full = ListBackend([walking[0]] * 3)
+    adaptive = AdaptivePoseEstimator(full, min_interval=1, max_interval=1)
+    assert adaptive.roi_estimator is None
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    for _ in range(3):
+        adaptive.detect_pose(frame)
+    assert full.shapes == [frame.shape] * 3
+
+def test_mediapipe_gets_static_twin_for_crops():
+    from motion_analyzer import PoseEstimator
+    
+    tracking = PoseEstimator(model_complexity=1, min_detection_confidence=0.6)
+    adaptive = AdaptivePoseEstimator(tracking)
+    assert adaptive.roi_estimator is not tracking
+    assert adaptive.roi_estimator._pose_options == {**tracking._pose_options, "static_image_mode": True}
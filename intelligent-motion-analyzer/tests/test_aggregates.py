@@ -0,0 +1,46 @@
+"""
+Tests for bounded history and O(1) running session aggregates
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from motion_analyzer import AnalysisType, JointAngleTable, LandmarkSet, MotionAnalyzer, RunningStats
+
+def test_running_stats_match_numpy(rng):
+    values = rng.normal(120.0, 15.0, 1000)
+    stats = RunningStats()
+    for value in values:
+        stats.update(float(value))
+    stats.update(float("nan"))  # Ignored
+    assert stats.count == 1000
+    assert stats.mean == pytest.approx(values.mean())
+    assert stats.variance == pytest.approx(values.var())
+    assert stats.min == values.min() and stats.max == values.max()
+    assert RunningStats().to_dict() == {"count": 0}
+
+def test_aggregates_cover_the_whole_session_with_bounded_history(walking):
+    analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, max_history_frames=30)
+    for frame_id in range(len(walking)):
+        analyzer.analyze_landmarks(LandmarkSet(walking[frame_id]), frame_id, frame_id / 30.0)
+    analyzer.analyze_landmarks(None, len(walking), len(walking) / 30.0)
+    
+    assert len(analyzer.motion_history) == 30
+    summary = analyzer.get_comprehensive_analysis()
+    assert summary["total_frames"] == len(walking)
+    assert summary["history_frames"] == 30
+    assert summary["analysis_duration"] == pytest.approx((len(walking) - 1) / 30.0)
+    motion_summary = summary["motion_summary"]
+    assert motion_summary["frames_analyzed"] == len(walking) + 1
+    assert motion_summary["total_poses_detected"] == len(walking)
+    
+    table = JointAngleTable()
+    knee = table.angles(walking)[:, table.names.index("left_knee")]
+    assert motion_summary["average_joint_angles"]["left_knee"] == pytest.approx(knee.mean(), rel=1e-6)
+    assert motion_summary["joint_angle_stats"]["left_knee"]["max"] == pytest.approx(knee.max(), rel=1e-6)
+
+def test_no_data_summary():
+    assert MotionAnalyzer().get_comprehensive_analysis() == {"error": "No motion data available"}
@@ -0,0 +1,132 @@
+"""
+Tests for the streaming API: encodings, client buffers and end of stream
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import asyncio
+import json
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+
+from fastapi.testclient import TestClient  # noqa: E402
+from starlette.websockets import WebSocketDisconnect  # noqa: E402
+
+from api_server import (  # noqa: E402
+    BINARY_HEADER, GAIT_FIELDS, AnalysisService, ClientBuffer, DeltaEncoder, FrameRecord, create_app
+)
+from helpers import FrameIndexBackend, write_index_video  # noqa: E402
+from motion_analyzer import JointAngle, MotionAnalyzer, MotionMetrics  # noqa: E402
+
+JOINTS = ["left_knee", "right_knee"]
+CADENCE = GAIT_FIELDS.index("cadence")
+
+def record(frame_id, left=150.0, right=160.0, cadence=110.0):
+    angles = [JointAngle("left_knee", left, 1.0), JointAngle("right_knee", right, 1.0)]
+    motion_metrics = MotionMetrics(frame_id, frame_id / 30.0, [{"landmarks": None, "interpolated": True}],
+                                   angles, gait_metrics={"cadence": cadence, "gait_phase": "double_support"})
+    return FrameRecord(motion_metrics, JOINTS)
+
+def test_binary_and_json_encodings():
+    frame = record(7, right=float("nan"))
+    payload = frame.binary()
+    frame_id, timestamp, n_angles, flags = BINARY_HEADER.unpack_from(payload)
+    assert (frame_id, n_angles, flags) == (7, 2, 3)
+    values = np.frombuffer(payload, dtype=np.float32, count=n_angles + len(GAIT_FIELDS),
+                           offset=BINARY_HEADER.size)
+    assert values[0] == 150.0 and math.isnan(values[1]) and values[len(JOINTS) + CADENCE] == 110.0
+    assert payload[-1] == 1  # double_support
+    assert json.loads(frame.json())["a"] == [150.0, None]
+
+def test_delta_encoder_sends_changes_and_keyframes():
+    encoder = DeltaEncoder(angle_epsilon=0.5, keyframe_interval=3)
+    first = json.loads(encoder.encode(record(0)))
+    assert first["k"] == 1 and first["a"] == {"0": 150.0, "1": 160.0}
+    second = json.loads(encoder.encode(record(1, left=150.2)))
+    assert "a" not in second and "g" not in second and "p" not in second
+    third = json.loads(encoder.encode(record(2, left=152.0, cadence=112.0)))
+    assert third["a"] == {"0": 152.0} and third["g"] == {str(CADENCE): 112.0}
+    encoder.request_keyframe()
+    assert json.loads(encoder.encode(record(3)))["k"] == 1
+
+def test_client_buffer_drops_oldest_and_ends_on_close():
+    async def scenario():
+        buffer = ClientBuffer(maxsize=2)
+        for frame_id in range(3):
+            buffer.put(record(frame_id))
+        assert buffer.dropped == 1 and buffer.dropped_since_get
+        assert (await buffer.get()).frame_id == 1
+        buffer.close()
+        assert (await buffer.get()).frame_id == 2  # Closing still drains what is queued
+        assert await buffer.get() is None
+        
+        # A reader waiting on an empty buffer wakes up when it closes
+        idle = ClientBuffer()
+        waiter = asyncio.ensure_future(idle.get())
+        await asyncio.sleep(0)
+        idle.close()
+        assert await asyncio.wait_for(waiter, timeout=1.0) is None
+    
+    asyncio.run(scenario())
+
+@pytest.fixture
+def service(tmp_path, walking):
+    video = write_index_video(str(tmp_path / "walk.avi"), 30)
+    analyzer = MotionAnalyzer(pose_estimator=FrameIndexBackend(walking))
+    return AnalysisService(video, analyzer=analyzer, realtime=False)
+
+def test_stream_ends_when_source_finishes(service):
+    with TestClient(create_app(service)) as client:
+        with client.websocket_connect("/stream?encoding=json&buffer=1000") as websocket:
+            hello = websocket.receive_json()
+            assert hello["type"] == "hello" and hello["gait_fields"] == list(GAIT_FIELDS)
+            frame_ids = []
+            with pytest.raises(WebSocketDisconnect):
+                while True:
+                    frame_ids.append(json.loads(websocket.receive_text())["f"])
+        assert frame_ids and frame_ids == sorted(frame_ids) and frame_ids[-1] == 29
+        assert service.finished
+        
+        # A client arriving after the end gets the greeting and a closed stream
+        with client.websocket_connect("/stream?encoding=binary") as websocket:
+            assert websocket.receive_json()["type"] == "hello"
+            with pytest.raises(WebSocketDisconnect):
+                websocket.receive_bytes()
+        
+        stats = client.get("/api/stats").json()
+        assert stats["frames_published"] == 30 and stats["clients"] == {}
+        assert client.get("/api/analysis").json()["total_frames"] == 30
+
+def test_subscribe_after_finish_returns_closed_buffer(service):
+    async def scenario():
+        service.start()
+        _, early = service.subscribe(buffer_size=1000)
+        received = []
+        while True:
+            item = await early.get()
+            if item is None:
+                break
+            received.append(item.frame_id)
+        _, late = service.subscribe()
+        assert late.closed and await late.get() is None
+        await service.stop()
+        return received
+    
+    assert asyncio.run(scenario()) == list(range(30))
+
+def test_unopenable_source_closes_subscribers(tmp_path):
+    async def scenario():
+        service = AnalysisService(str(tmp_path / "missing.mp4"), realtime=False)
+        _, buffer = service.subscribe()
+        service.start()
+        assert await asyncio.wait_for(buffer.get(), timeout=5.0) is None
+        await service.stop()
+        return service.finished
+    
+    assert asyncio.run(scenario())
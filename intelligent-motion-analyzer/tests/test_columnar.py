@@ -0,0 +1,147 @@
+"""
+Tests for columnar session export, the npz result sink and SessionQuery
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+from columnar import (
+    SessionQuery, column_stats, expand_session_paths, export_history, export_session, load_columns
+)
+from motion_analyzer import LandmarkSet, MotionAnalyzer
+from postprocess import iter_saved_landmarks
+from result_writer import SessionReader, open_result_sink
+
+MISSING = {10, 11, 40}
+
+@pytest.fixture(scope="module")
+def analyzed(walking):
+    """Analyzer and analyzed frames of a 120-frame walk with a few dropped detections"""
+    analyzer = MotionAnalyzer()
+    frames = [analyzer.analyze_landmarks(None if index in MISSING else LandmarkSet(walking[index]),
+                                         index, index / 30.0) for index in range(120)]
+    return analyzer, frames
+
+def write_session(path, frames, fmt=None):
+    with open_result_sink(path, fmt) as sink:
+        for motion_metrics in frames:
+            sink.write(motion_metrics)
+    return path
+
+def assert_tables_equal(table, expected):
+    assert set(table) == set(expected)
+    for name, values in expected.items():
+        if values.dtype.kind == "f":
+            np.testing.assert_allclose(table[name], values, rtol=1e-6, atol=1e-6, equal_nan=True,
+                                       err_msg=name)
+        else:
+            np.testing.assert_array_equal(table[name], values, err_msg=name)
+
+def test_npz_sink_round_trip(tmp_path, analyzed):
+    _, frames = analyzed
+    path = write_session(str(tmp_path / "out.npz"), frames)
+    saved = list(iter_saved_landmarks(path))
+    assert [frame_id for frame_id, _, _ in saved] == [frame.frame_id for frame in frames]
+    for (_, _, landmarks), frame in zip(saved, frames):
+        if frame.poses:
+            np.testing.assert_array_equal(landmarks.array, frame.poses[0]["landmarks"].array)
+        else:
+            assert landmarks is None
+
+def test_columnar_sink_streams_to_disk(tmp_path, analyzed):
+    _, frames = analyzed
+    path = str(tmp_path / "out.npz")
+    sink = open_result_sink(path, flush_every=10)
+    for motion_metrics in frames[:25]:
+        sink.write(motion_metrics)
+    # Flushed frames are on disk before close; an interrupted run can still be exported
+    assert len(SessionReader(path + ".session")) == 20
+    assert export_session(path + ".session", str(tmp_path / "recovered.npz")) == 20
+    
+    for motion_metrics in frames[25:]:
+        sink.write(motion_metrics)
+    sink.close({"total_frames": len(frames)})
+    assert not os.path.exists(path + ".session")
+    assert os.path.exists(str(tmp_path / "out.summary.json"))
+    np.testing.assert_array_equal(load_columns(path, ["frame_ids"])["frame_ids"], np.arange(len(frames)))
+
+@pytest.mark.parametrize("source", ["out.json", "out.ndjson", "session"])
+def test_export_matches_across_result_formats(tmp_path, analyzed, source):
+    _, frames = analyzed
+    expected = load_columns(write_session(str(tmp_path / "direct.npz"), frames))
+    saved = write_session(str(tmp_path / source), frames, "binary" if source == "session" else None)
+    assert export_session(saved, str(tmp_path / "export.npz")) == len(frames)
+    table = load_columns(str(tmp_path / "export.npz"))
+    assert_tables_equal(table, expected)
+    
+    np.testing.assert_array_equal(table["detected"][sorted(MISSING)], 0)
+    assert np.isnan(table["angle_right_knee"][sorted(MISSING)]).all()
+    assert np.isfinite(table["gait_cadence"]).any()
+
+def test_export_history(tmp_path, analyzed):
+    analyzer, frames = analyzed
+    path = str(tmp_path / "history.npz")
+    pose_frames = [frame for frame in frames if frame.poses]  # History keeps frames with a pose
+    assert export_history(analyzer, path) == len(pose_frames)
+    assert_tables_equal(load_columns(path), load_columns(write_session(str(tmp_path / "direct.npz"),
+                                                                       pose_frames)))
+
+def test_load_selected_columns(tmp_path, analyzed):
+    _, frames = analyzed
+    path = write_session(str(tmp_path / "out.npz"), frames)
+    table = load_columns(path, ["frame_ids", "lm_26_y"])
+    assert set(table) == {"frame_ids", "lm_26_y"}
+    np.testing.assert_array_equal(table["lm_26_y"], load_columns(path)["landmarks"][:, 26, 1])
+
+def test_parquet_matches_npz(tmp_path, analyzed):
+    pytest.importorskip("pandas")
+    pytest.importorskip("pyarrow")
+    _, frames = analyzed
+    expected = load_columns(write_session(str(tmp_path / "direct.npz"), frames))
+    table = load_columns(write_session(str(tmp_path / "out.parquet"), frames))
+    assert_tables_equal(table, expected)
+    np.testing.assert_array_equal(load_columns(str(tmp_path / "out.parquet"), ["lm_26_y"])["lm_26_y"],
+                                  expected["landmarks"][:, 26, 1])
+
+@pytest.fixture
+def exports(tmp_path, analyzed):
+    _, frames = analyzed
+    directory = tmp_path / "exports"
+    write_session(str(directory / "walk_a.npz"), frames[:60])
+    write_session(str(directory / "walk_b.npz"), frames[60:])
+    (directory / "notes.txt").write_text("not a table")
+    return str(directory)
+
+def test_session_query(exports, analyzed):
+    _, frames = analyzed
+    paths = expand_session_paths([exports])
+    assert [path.rsplit("/", 1)[-1] for path in paths] == ["walk_a.npz", "walk_b.npz"]
+    
+    query = SessionQuery(paths, workers=2)
+    assert query.sessions == ["walk_a", "walk_b"]
+    values, session_index = query.column("angle_right_knee")
+    knee = np.array([angle.angle_degrees for frame in frames for angle in frame.joint_angles
+                     if angle.joint_name == "right_knee"], dtype=np.float32)
+    np.testing.assert_allclose(values, knee, rtol=1e-6)
+    assert (session_index == 0).sum() == 60 - len([index for index in MISSING if index < 60])
+    
+    pooled = query.aggregate("angle_right_knee")
+    assert pooled["count"] == len(knee)
+    assert pooled["mean"] == pytest.approx(float(knee.mean()), rel=1e-5)
+    by_session = query.aggregate("angle_right_knee", by_session=True)
+    assert by_session["walk_a"]["count"] + by_session["walk_b"]["count"] == pooled["count"]
+    
+    every_frame = SessionQuery(paths, pose_frames_only=False)
+    assert len(every_frame.column("frame_ids")[0]) == len(frames)
+    assert every_frame.aggregate("angle_right_knee")["count"] == len(knee)  # NaNs are skipped
+
+def test_column_stats():
+    stats = column_stats(np.array([1.0, np.nan, 3.0, 2.0]))
+    assert stats["count"] == 3 and stats["mean"] == pytest.approx(2.0)
+    assert stats["min"] == 1.0 and stats["p50"] == 2.0 and stats["max"] == 3.0
+    assert column_stats(np.array([np.nan])) == {"count": 0}
@@ -0,0 +1,81 @@
+"""
+Tests for streaming gait event detection, cadence and phases
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import walking_sequence
+from motion_analyzer import GaitAnalyzer, LandmarkSet, StreamingExtremaDetector
+
+def run_gait(sequence, fps=30.0, analyzer=None):
+    analyzer = analyzer or GaitAnalyzer(fps=fps)
+    results = [analyzer.analyze_gait(LandmarkSet(row), index, index / fps)
+               for index, row in enumerate(sequence)]
+    return analyzer, results
+
+def test_extrema_detector_finds_sine_peaks():
+    detector = StreamingExtremaDetector(min_prominence=0.01)
+    t = np.arange(300) / 30.0
+    signal = 0.05 * np.sin(2 * np.pi * t)  # 1 Hz: peaks at 0.25 s + k
+    found = [detector.update(value, index, time) for index, (value, time) in enumerate(zip(signal, t))]
+    peaks = [extreme[2] for extreme in found if extreme and extreme[0] == "max"]
+    assert len(peaks) >= 8
+    np.testing.assert_allclose(np.diff(peaks), 1.0, atol=1.0 / 30.0 + 1e-9)
+    np.testing.assert_allclose(np.array(peaks) % 1.0, 0.25, atol=1.0 / 30.0 + 1e-9)
+
+def test_extrema_detector_ignores_jitter():
+    detector = StreamingExtremaDetector(min_prominence=0.01)
+    rng = np.random.default_rng(0)
+    assert not any(detector.update(value, index, index / 30.0)
+                   for index, value in enumerate(rng.normal(0.0, 0.001, 300)))
+
+@pytest.mark.parametrize("cadence", [90.0, 110.0, 130.0])
+def test_cadence_matches_generated_walk(cadence):
+    analyzer, results = run_gait(walking_sequence(300, fps=30.0, cadence=cadence))
+    assert results[-1]["cadence"] == pytest.approx(cadence, rel=0.05)
+    strides = [stride["stride_time"] for stride in analyzer.stride_history]
+    assert np.median(strides) == pytest.approx(120.0 / cadence, rel=0.05)
+
+def test_events_alternate_and_phases_follow(walking):
+    analyzer, results = run_gait(walking)
+    events = [event for result in results for event in result["events"]]
+    strikes = [event["side"] for event in events if event["event"] == "heel_strike"]
+    assert len(strikes) >= 12
+    assert all(a != b for a, b in zip(strikes, strikes[1:]))
+    assert Counter(event["event"] for event in events)["toe_off"] >= 10
+    
+    phases = Counter(result["gait_phase"] for result in results[60:])
+    assert set(phases) <= {"double_support", "left_single_support", "right_single_support"}
+    assert phases["left_single_support"] and phases["right_single_support"]
+    assert phases["double_support"] < phases["left_single_support"] + phases["right_single_support"]
+    
+    stance = [stride["stance_ratio"] for stride in analyzer.stride_history if stride["stance_ratio"]]
+    assert stance and all(0.3 < ratio < 0.8 for ratio in stance)
+    assert results[-1]["symmetry_score"] > 0.9
+
+def test_cadence_holds_for_mirrored_walk(walking):
+    mirrored = walking.copy()
+    mirrored[:, :, 0] = 1.0 - mirrored[:, :, 0]  # Walking towards -x
+    _, results = run_gait(mirrored)
+    assert results[-1]["cadence"] == pytest.approx(110.0, rel=0.05)
+
+def test_long_gap_restarts_tracking(walking):
+    analyzer = GaitAnalyzer(fps=30.0)
+    for index in range(150):
+        analyzer.analyze_gait(LandmarkSet(walking[index]), index, index / 30.0)
+    result = analyzer.analyze_gait(LandmarkSet(walking[150]), 150, 150 / 30.0 + 5.0)
+    assert result["gait_phase"] == "unknown"
+    assert result["left_phase"] == result["right_phase"] == "unknown"
+
+def test_trajectory_ring_buffer(walking):
+    analyzer, _ = run_gait(walking, analyzer=GaitAnalyzer(fps=30.0, buffer_size=64))
+    trajectory = analyzer.trajectory
+    assert trajectory.shape == (64, len(GaitAnalyzer.TRAJECTORY_COLUMNS))
+    np.testing.assert_allclose(trajectory[:, 0], np.arange(236, 300) / 30.0)
+    np.testing.assert_allclose(trajectory[-1, 1:3], walking[-1, 29, :2], atol=1e-6)
@@ -0,0 +1,57 @@
+"""
+Tests for the headless versus default throughput benchmark
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+import sys
+
+import pytest
+
+from helpers import FrameIndexBackend, write_index_video
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+
+@pytest.fixture
+def headless_fps(monkeypatch, walking):
+    monkeypatch.syspath_prepend(BENCHMARKS)
+    import headless_fps
+    
+    created = []
+    
+    def fake_estimator(**kwargs):
+        created.append(kwargs)
+        return FrameIndexBackend(walking)
+    
+    monkeypatch.setattr(headless_fps, "PoseEstimator", fake_estimator)
+    return headless_fps, created
+
+def test_run_profile_counts_frames(tmp_path, walking, headless_fps):
+    headless_fps, _ = headless_fps
+    video = write_index_video(str(tmp_path / "walk.avi"), 20)
+    result = headless_fps.run_profile(video, FrameIndexBackend(walking, missing={3}), None,
+                                      overlay=True, display=False)
+    assert result["frames"] == 20
+    assert result["detection_rate"] == pytest.approx(19 / 20)
+    assert headless_fps.run_profile(video, FrameIndexBackend(walking), 5, False, False)["frames"] == 5
+
+def test_profiles_share_model_complexity(tmp_path, monkeypatch, headless_fps):
+    headless_fps, created = headless_fps
+    video = write_index_video(str(tmp_path / "walk.avi"), 10)
+    output = str(tmp_path / "out.json")
+    monkeypatch.setattr(sys, "argv", ["headless_fps.py", "--input", video, "--output", output,
+                                      "--legacy-model-complexity", "2"])
+    headless_fps.main()
+    
+    default, headless, legacy = created
+    assert default == {"model_complexity": 1}
+    assert headless["model_complexity"] == 1 and headless["enable_segmentation"] is False
+    assert legacy == {"model_complexity": 2}
+    with open(output) as f:
+        report = json.load(f)
+    assert set(report["profiles"]) == {"default", "headless", "default_legacy_model"}
+    assert report["meta"]["legacy_model_complexity"] == 2
+    assert report["model_speedup"] > 0
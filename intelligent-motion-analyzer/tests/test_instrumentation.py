@@ -0,0 +1,88 @@
+"""
+Tests for stage timing, counters and the Prometheus endpoint
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import urllib.request
+
+import pytest
+
+from instrumentation import Instrumentation, LatencyHistogram, metrics
+from motion_analyzer import LandmarkSet, MotionAnalyzer
+
+def test_histogram_buckets_and_quantiles():
+    histogram = LatencyHistogram(buckets=(0.001, 0.01, 0.1))
+    for seconds in [0.0005] * 50 + [0.005] * 40 + [0.05] * 9 + [0.5]:
+        histogram.observe(seconds)
+    assert histogram.counts == [50, 40, 9, 1]
+    assert histogram.quantile(0.5) == pytest.approx(0.001)
+    assert histogram.quantile(0.9) == pytest.approx(0.01)
+    assert histogram.quantile(1.0) == pytest.approx(0.5)
+    assert histogram.to_dict()["max_ms"] == pytest.approx(500.0)
+
+def test_disabled_registry_records_nothing():
+    registry = Instrumentation()
+    
+    @registry.timed("work")
+    def work(x):
+        return x * 2
+    
+    assert work(3) == 6
+    with registry.stage("block"):
+        pass
+    registry.inc("frames")
+    registry.set_gauge("depth", 3)
+    assert not registry.histograms and not registry.counters and not registry.gauges
+
+def test_enabled_registry_times_stages():
+    registry = Instrumentation(enabled=True)
+    
+    @registry.timed("work")
+    def work():
+        return 1
+    
+    for _ in range(5):
+        work()
+        with registry.stage("block"):
+            pass
+    registry.inc("frames_analyzed", 5)
+    registry.inc("poses_detected", 4)
+    
+    snapshot = registry.snapshot()
+    assert snapshot["stages"]["work"]["count"] == 5
+    assert snapshot["stages"]["block"]["count"] == 5
+    assert snapshot["detection_rate"] == pytest.approx(0.8)
+    
+    text = registry.to_prometheus()
+    assert 'motion_analyzer_stage_seconds_count{stage="work"} 5' in text
+    assert 'motion_analyzer_stage_seconds_bucket{stage="work",le="+Inf"} 5' in text
+    assert "motion_analyzer_frames_analyzed_total 5" in text
+
+def test_http_endpoints():
+    registry = Instrumentation(enabled=True)
+    registry.inc("frames_analyzed")
+    host, port = registry.serve(0)
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            assert "motion_analyzer_frames_analyzed_total 1" in response.read().decode()
+        with urllib.request.urlopen(f"http://{host}:{port}/snapshot") as response:
+            assert json.load(response)["counters"] == {"frames_analyzed": 1}
+    finally:
+        registry.shutdown()
+
+def test_analyzer_reports_to_process_registry(walking):
+    metrics.enable()
+    try:
+        analyzer = MotionAnalyzer()
+        for index in range(10):
+            analyzer.analyze_landmarks(LandmarkSet(walking[index]) if index % 5 else None, index, index / 30.0)
+        snapshot = metrics.snapshot()
+    finally:
+        metrics.disable()
+        metrics.reset()
+    assert snapshot["counters"]["frames_analyzed"] == 10
+    assert snapshot["counters"]["poses_detected"] == 8
+    assert snapshot["stages"]["joint_angles"]["count"] >= 8
@@ -0,0 +1,76 @@
+"""
+Tests for the table-driven JointAngleTable against the original per-joint angle math
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from motion_analyzer import (
+    DEFAULT_JOINT_ANGLES, UPPER_BODY_JOINT_ANGLES, JointAngleSpec, JointAngleTable, LandmarkSet,
+    PoseBackend
+)
+
+def reference_angle(p1: np.ndarray, p2: np.ndarray, p3: np.ndarray) -> float:
+    """PoseEstimator._calculate_angle as it was before the table engine"""
+    v1 = np.array(p1[:2], dtype=np.float64) - np.array(p2[:2], dtype=np.float64)
+    v2 = np.array(p3[:2], dtype=np.float64) - np.array(p2[:2], dtype=np.float64)
+    cos_angle = np.dot(v1, v2) / (np.linalg.norm(v1) * np.linalg.norm(v2))
+    return float(np.degrees(np.arccos(np.clip(cos_angle, -1.0, 1.0))))
+
+def test_matches_reference_on_random_poses(rng):
+    table = JointAngleTable()
+    landmarks = rng.random((50, 33, 4)).astype(np.float32)
+    angles = table.angles(landmarks)
+    assert angles.shape == (50, len(DEFAULT_JOINT_ANGLES))
+    for frame in range(50):
+        for column, spec in enumerate(DEFAULT_JOINT_ANGLES):
+            expected = reference_angle(landmarks[frame, spec.proximal], landmarks[frame, spec.vertex],
+                                       landmarks[frame, spec.distal])
+            assert angles[frame, column] == pytest.approx(expected, abs=1e-4)
+
+def test_matches_reference_on_walking(walking):
+    table = JointAngleTable()
+    angles = table.angles(walking)
+    knee = table.names.index("left_knee")
+    expected = [reference_angle(frame[23], frame[25], frame[27]) for frame in walking]
+    np.testing.assert_allclose(angles[:, knee], expected, atol=1e-4)
+
+def test_chunking_does_not_change_results(walking):
+    np.testing.assert_array_equal(JointAngleTable(chunk_size=7).angles(walking),
+                                  JointAngleTable().angles(walking))
+
+def test_joint_angles_order_names_and_confidence(walking):
+    frame = LandmarkSet(walking[0])
+    joint_angles = PoseBackend().calculate_joint_angles(frame)
+    assert [angle.joint_name for angle in joint_angles] == [spec.name for spec in DEFAULT_JOINT_ANGLES]
+    # Confidence is the vertex landmark's visibility, as before
+    assert joint_angles[0].confidence == pytest.approx(float(walking[0, 25, 3]))
+
+def test_right_angle_and_degenerate_segment():
+    landmarks = np.zeros((1, 33, 4), dtype=np.float32)
+    landmarks[0, 23, :2] = (0.0, 0.0)
+    landmarks[0, 25, :2] = (1.0, 0.0)
+    landmarks[0, 27, :2] = (1.0, 1.0)
+    table = JointAngleTable([JointAngleSpec("left_knee", 23, 25, 27), JointAngleSpec("zero", 0, 0, 1)])
+    angles = table.angles(landmarks)[0]
+    assert angles[0] == pytest.approx(90.0)
+    assert np.isnan(angles[1])
+
+def test_custom_table_and_use_z():
+    landmarks = np.zeros((1, 33, 4), dtype=np.float32)
+    landmarks[0, 11, :3] = (0.0, 0.0, 0.0)
+    landmarks[0, 13, :3] = (1.0, 0.0, 0.0)
+    landmarks[0, 15, :3] = (2.0, 0.0, 1.0)  # Straight in the image plane, bent in depth
+    table_2d = JointAngleTable(UPPER_BODY_JOINT_ANGLES)
+    table_3d = JointAngleTable(UPPER_BODY_JOINT_ANGLES, use_z=True)
+    elbow = table_2d.names.index("left_elbow")
+    assert table_2d.angles(landmarks)[0, elbow] == pytest.approx(180.0)
+    assert table_3d.angles(landmarks)[0, elbow] == pytest.approx(135.0)
+
+def test_batch_helper_matches_table(walking):
+    backend = PoseBackend()
+    np.testing.assert_allclose(backend.calculate_joint_angles_batch(walking),
+                               backend.joint_angle_table.angles(walking))
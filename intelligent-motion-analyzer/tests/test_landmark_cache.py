@@ -0,0 +1,102 @@
+"""
+Tests for the content-hashed landmark cache
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from landmark_cache import CACHE_VERSION, LandmarkCache, video_content_hash
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(os.urandom(4096))
+    return str(path)
+
+def landmarks(count, start=0):
+    array = np.zeros((count, 33, 4), dtype=np.float32)
+    array[:, :, 0] = np.arange(start, start + count)[:, None]
+    return array
+
+def test_key_follows_content_and_settings(tmp_path, video):
+    cache = LandmarkCache(str(tmp_path / "cache"))
+    key = cache.key(video, 1, 0.7)
+    assert key == f"{video_content_hash(video)}-c1-d0.700-t0.500-v{CACHE_VERSION}"
+    assert cache.key(video, 1, 0.7) == key
+    assert cache.key(video, 2, 0.7) != key
+    assert cache.key(video, 1, 0.5) != key
+    assert cache.key(video, 1, 0.7, min_tracking_confidence=0.5) == key
+    assert cache.key(video, 1, 0.7, min_tracking_confidence=0.8) != key
+    
+    # A copy with the same bytes shares the entry; an edited file does not
+    copy = tmp_path / "copy.mp4"
+    copy.write_bytes(open(video, "rb").read())
+    assert cache.key(str(copy), 1, 0.7) == key
+    with open(video, "ab") as f:
+        f.write(b"more")
+    assert cache.key(video, 1, 0.7) != key
+
+def test_plan_splits_cached_and_missing(tmp_path, video):
+    cache = LandmarkCache(str(tmp_path / "cache"))
+    key = cache.key(video, 1, 0.7)
+    assert cache.plan(key, 0, 100) == [(0, 100, None)]
+    
+    cache.put(key, 10, landmarks(20, 10), np.ones(20, dtype=bool), meta={"fps": 30.0})
+    cache.put(key, 50, landmarks(10, 50), np.ones(10, dtype=bool))
+    pieces = cache.plan(key, 0, 100)
+    assert [(start, stop, path is not None) for start, stop, path in pieces] == [
+        (0, 10, False), (10, 30, True), (30, 50, False), (50, 60, True), (60, 100, False)]
+    assert [(start, stop) for start, stop, _ in cache.plan(key, 15, 55)] == [(15, 30), (30, 50), (50, 55)]
+    assert cache.meta(key) == {"fps": 30.0}
+    
+    start, stop, path = cache.plan(key, 15, 25)[0]
+    array, detected = cache.read(path, start, stop)
+    np.testing.assert_array_equal(array[:, 0, 0], np.arange(15, 25))
+    assert detected.all()
+
+def test_evicts_least_recently_used_but_keeps_current(tmp_path, video):
+    cache = LandmarkCache(str(tmp_path / "cache"), max_bytes=1 << 30)
+    keys = [f"entry{index}" for index in range(3)]
+    for age, key in enumerate(keys):
+        cache.put(key, 0, landmarks(200), np.ones(200, dtype=bool))
+        os.utime(os.path.join(cache.cache_dir, key), (1000 + age, 1000 + age))
+    entry_bytes = cache.stats()["bytes"] // 3
+    
+    cache.plan("entry0", 0, 200)  # A cache hit refreshes entry0
+    cache.max_bytes = 2 * entry_bytes
+    assert cache.evict(keep="entry2") == entry_bytes
+    assert sorted(key for _, _, key in cache.entries()) == ["entry0", "entry2"]
+    
+    # The entry being written is never evicted, even if it alone is too big
+    cache.max_bytes = entry_bytes // 2
+    cache.put("entry3", 0, landmarks(200), np.ones(200, dtype=bool))
+    assert [key for _, _, key in cache.entries()] == ["entry3"]
+
+def test_eviction_forgets_hashes_of_evicted_videos(tmp_path, video):
+    other = tmp_path / "other.mp4"
+    other.write_bytes(os.urandom(4096))
+    cache = LandmarkCache(str(tmp_path / "cache"), max_bytes=1 << 30)
+    old_key = cache.key(video, 1, 0.7)
+    cache.put(old_key, 0, landmarks(200), np.ones(200, dtype=bool))
+    os.utime(os.path.join(cache.cache_dir, old_key), (1000, 1000))
+    
+    cache.max_bytes = cache.stats()["bytes"]
+    new_key = cache.key(str(other), 1, 0.7)
+    cache.put(new_key, 0, landmarks(200), np.ones(200, dtype=bool))
+    assert [key for _, _, key in cache.entries()] == [new_key]
+    with open(os.path.join(cache.cache_dir, "hashes.json")) as f:
+        assert list(json.load(f)) == [os.path.abspath(str(other))]
+
+def test_clear(tmp_path, video):
+    cache = LandmarkCache(str(tmp_path / "cache"))
+    key = cache.key(video, 1, 0.7)
+    cache.put(key, 0, landmarks(5), np.ones(5, dtype=bool))
+    cache.clear()
+    assert cache.stats()["entries"] == 0
+    assert cache.plan(key, 0, 5) == [(0, 5, None)]
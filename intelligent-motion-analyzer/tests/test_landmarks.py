@@ -0,0 +1,115 @@
+"""
+Tests for LandmarkSet, LandmarkHistory and MotionAnalyzer history storage
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from motion_analyzer import (
+    AnalysisType, LandmarkHistory, LandmarkSet, MotionAnalyzer, PoseLandmark, serialize_poses
+)
+
+def make_set(value: float, interpolated: bool = False) -> LandmarkSet:
+    return LandmarkSet(np.full((33, 4), value, dtype=np.float32), interpolated=interpolated)
+
+class TestLandmarkSet:
+    def test_views_read_the_array(self, rng):
+        array = rng.random((33, 4), dtype=np.float32)
+        landmarks = LandmarkSet(array)
+        assert landmarks.array.dtype == np.float32
+        assert len(landmarks) == 33
+        assert landmarks[25].visibility == pytest.approx(array[25, 3])
+        assert landmarks[-1]["x"] == pytest.approx(array[32, 0])
+        assert [view.y for view in landmarks] == pytest.approx(array[:, 1].tolist())
+    
+    def test_index_out_of_range(self):
+        with pytest.raises(IndexError):
+            make_set(0.0)[33]
+    
+    def test_rejects_wrong_shape(self):
+        with pytest.raises(ValueError):
+            LandmarkSet(np.zeros((33, 3)))
+    
+    def test_from_landmarks_and_to_list_round_trip(self):
+        points = [PoseLandmark(x=i / 33, y=0.5, z=-0.1, visibility=0.9) for i in range(33)]
+        landmarks = LandmarkSet.from_landmarks(points)
+        serialized = landmarks.to_list()
+        assert serialized[10] == pytest.approx({"x": 10 / 33, "y": 0.5, "z": -0.1, "visibility": 0.9})
+        assert serialize_poses([{"landmarks": landmarks}])[0]["landmarks"] == serialized
+
+class TestLandmarkHistory:
+    def test_grows_past_initial_capacity(self):
+        history = LandmarkHistory(initial_capacity=2)
+        for frame in range(5):
+            history.append(frame, frame / 30.0, make_set(frame))
+        assert len(history) == 5
+        assert history.capacity >= 5
+        assert history.frame_ids.tolist() == [0, 1, 2, 3, 4]
+        assert history.landmarks[:, 0, 0].tolist() == [0, 1, 2, 3, 4]
+    
+    def test_wraps_at_max_frames(self):
+        history = LandmarkHistory(initial_capacity=2, max_frames=3)
+        for frame in range(7):
+            history.append(frame, float(frame), make_set(frame))
+        assert len(history) == 3
+        assert history.capacity == 3
+        assert history.frame_ids.tolist() == [4, 5, 6]
+        assert history.timestamps.tolist() == [4.0, 5.0, 6.0]
+        assert history.landmarks[:, 0, 0].tolist() == [4, 5, 6]
+        assert history[0].array[0, 0] == 4
+        assert history[-1].array[0, 0] == 6
+    
+    def test_getitem_returns_a_copy_that_survives_wrapping(self):
+        history = LandmarkHistory(initial_capacity=2, max_frames=2)
+        history.append(0, 0.0, make_set(0))
+        oldest = history[0]
+        history.append(1, 1.0, make_set(1))
+        history.append(2, 2.0, make_set(2))  # Overwrites the slot frame 0 lived in
+        assert oldest.array[0, 0] == 0
+    
+    def test_getitem_keeps_interpolated_flag(self):
+        history = LandmarkHistory(initial_capacity=1)
+        history.append(0, 0.0, make_set(0, interpolated=True))
+        history.append(1, 1.0, make_set(1))  # Forces a grow
+        assert history[0].interpolated
+        assert not history[1].interpolated
+    
+    def test_evict_before(self):
+        history = LandmarkHistory(initial_capacity=4, max_frames=4)
+        for frame in range(6):
+            history.append(frame, float(frame), make_set(frame))
+        history.evict_before(4.0)
+        assert history.frame_ids.tolist() == [4, 5]
+        history.popleft()
+        assert history.frame_ids.tolist() == [5]
+        history.clear()
+        assert len(history) == 0
+    
+    def test_index_out_of_range(self):
+        with pytest.raises(IndexError):
+            LandmarkHistory()[0]
+
+class TestMotionAnalyzerHistory:
+    def test_landmarks_stored_once_and_restored(self, walking):
+        analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, max_history_frames=50)
+        for frame_id in range(120):
+            result = analyzer.analyze_landmarks(LandmarkSet(walking[frame_id]), frame_id, frame_id / 30.0)
+            assert result.poses  # The caller still gets its landmarks
+        
+        assert len(analyzer.motion_history) == len(analyzer.landmark_history) == 50
+        assert all(not metrics.poses for metrics in analyzer.motion_history)
+        
+        restored = list(analyzer.iter_history())
+        assert [metrics.frame_id for metrics in restored] == list(range(70, 120))
+        np.testing.assert_array_equal(restored[-1].poses[0]["landmarks"].array, walking[119])
+    
+    def test_time_window_evicts_both_histories(self, walking):
+        analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, max_history_seconds=1.0)
+        for frame_id in range(90):
+            analyzer.analyze_landmarks(LandmarkSet(walking[frame_id]), frame_id, frame_id / 30.0)
+        assert len(analyzer.motion_history) == len(analyzer.landmark_history) in (30, 31)
+        assert analyzer.landmark_history.frame_ids[0] == analyzer.motion_history[0].frame_id
+        assert analyzer.landmark_history.timestamps[0] >= 89 / 30.0 - 1.0
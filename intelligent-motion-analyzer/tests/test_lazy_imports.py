@@ -0,0 +1,54 @@
+"""
+Tests that the analysis modules load without OpenCV or MediaPipe, and the post-processing CLI
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pytest
+
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def loaded_modules(code: str) -> set:
+    """Top-level modules imported after running ``code`` in a fresh interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys\n{code}\nprint(','.join(sorted(sys.modules)))"],
+        cwd=PACKAGE_DIR, capture_output=True, text=True, check=True).stdout
+    return set(output.strip().splitlines()[-1].split(","))
+
+@pytest.mark.parametrize("module", ["motion_analyzer", "postprocess", "result_writer", "smoothing"])
+def test_analysis_modules_skip_heavy_imports(module):
+    modules = loaded_modules(f"import {module}")
+    assert "cv2" not in modules
+    assert "mediapipe" not in modules
+
+def test_help_does_not_load_opencv():
+    modules = loaded_modules("sys.argv = ['motion_analyzer.py', '--help']\n"
+                             "import motion_analyzer\n"
+                             "try:\n    motion_analyzer.main()\nexcept SystemExit:\n    pass")
+    assert "cv2" not in modules and "mediapipe" not in modules
+
+def test_postprocess_cli_reruns_saved_landmarks(tmp_path, walking):
+    source = tmp_path / "landmarks.npz"
+    np.savez(source, landmarks=walking[:90])
+    rules = tmp_path / "rules.json"
+    rules.write_text(json.dumps([{"factor": "bent_knee", "metric": "angle:left_knee", "op": "<",
+                                  "threshold": 179.9, "weight": 0.5}]))
+    output = tmp_path / "rerun.json"
+    
+    result = subprocess.run([sys.executable, "postprocess.py", "--input", str(source), "--output", str(output),
+                             "--risk-rules", str(rules), "--smoothing", "one_euro", "--fps", "30"],
+                            cwd=PACKAGE_DIR, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    with open(output) as f:
+        document = json.load(f)
+    assert len(document["frame_results"]) == 90
+    assessment = document["comprehensive_analysis"]["biomechanical_assessment"]
+    assert assessment["risk_factors"] == ["bent_knee"]
+    assert document["frame_results"][-1]["timestamp"] == pytest.approx(89 / 30.0)
@@ -0,0 +1,144 @@
+"""
+Tests for multi-person identity tracking and per-track analyzers
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from motion_analyzer import LandmarkSet, RiskRule
+from multi_person import (
+    MultiPersonAnalyzer, MultiPersonPoseEstimator, PersonPose, PoseTracker, box_iou_matrix,
+    landmarks_box
+)
+
+WIDTH, HEIGHT = 640, 480
+
+def person(pose: np.ndarray, center_x: float) -> PersonPose:
+    """A walking pose shrunk to a third of the frame width around center_x"""
+    array = pose.copy()
+    array[:, 0] = center_x + (array[:, 0] - 0.5) / 3.0
+    return PersonPose(landmarks_box(array, WIDTH, HEIGHT), LandmarkSet(array))
+
+def test_box_iou_matrix():
+    a = np.array([[0, 0, 10, 10], [20, 20, 30, 30]], dtype=float)
+    b = np.array([[0, 0, 10, 10], [5, 0, 15, 10]], dtype=float)
+    np.testing.assert_allclose(box_iou_matrix(a, b), [[1.0, 1.0 / 3.0], [0.0, 0.0]])
+    assert box_iou_matrix(a, np.zeros((0, 4))).shape == (2, 0)
+
+def test_tracker_keeps_identities_when_order_changes(walking):
+    tracker = PoseTracker()
+    first = tracker.update([person(walking[0], 0.25), person(walking[0], 0.75)], 0.0)
+    def side(p):
+        return "right" if p.landmarks.array[0, 0] > 0.5 else "left"
+    
+    ids = {side(p): track.track_id for track, p in first}
+    
+    for index in range(1, 30):
+        people = [person(walking[index], 0.75 + 0.002 * index), person(walking[index], 0.25 - 0.002 * index)]
+        for track, p in tracker.update(people, index / 30.0):
+            assert track.track_id == ids[side(p)]
+    assert sorted(tracker.tracks) == sorted(ids.values())
+    assert all(track.hits == 30 for track in tracker.tracks.values())
+
+def test_tracker_starts_and_expires_tracks(walking):
+    tracker = PoseTracker(max_misses=3)
+    tracker.update([person(walking[0], 0.25)], 0.0)
+    pairs = tracker.update([person(walking[1], 0.25), person(walking[1], 0.75)], 0.1)
+    assert [track.track_id for track, _ in pairs] == [0, 1]
+    newcomer = 1
+    
+    for index in range(2, 6):
+        tracker.update([person(walking[index], 0.75)], index / 10.0)
+        expired = [track.track_id for track in tracker.expired]
+        assert expired == ([0] if index == 5 else [])
+    assert list(tracker.tracks) == [newcomer]
+
+class ScriptedEstimator:
+    """Multi-person estimator stand-in returning scripted people per frame"""
+    
+    def __init__(self, script):
+        self.script = script
+        self.detector_calls = 0
+        self.crops_estimated = 0
+    
+    def detect_poses(self, frame, track_boxes=None):
+        return self.script(int(frame))
+    
+    def close(self):
+        pass
+
+def test_analyzer_releases_expired_tracks(walking):
+    def script(frame_id):
+        # A new person walks through every 20 frames, visible for 10 frames
+        return [person(walking[frame_id], 0.5)] if frame_id % 20 < 10 else []
+    
+    analyzer = MultiPersonAnalyzer(estimator=ScriptedEstimator(script), tracker=PoseTracker(max_misses=3),
+                                   max_finished_tracks=2)
+    for frame_id in range(100):
+        results = analyzer.analyze_frame(frame_id, frame_id, frame_id / 30.0)
+        if frame_id % 20 < 10:
+            (motion_metrics,) = results.values()
+            assert motion_metrics.poses[0]["track_id"] in analyzer.analyzers
+        assert len(analyzer.analyzers) <= 1
+    
+    assert not analyzer.analyzers
+    assert list(analyzer.finished_tracks) == [3, 4]
+    assert analyzer.finished_tracks_discarded == 3
+    summary = analyzer.get_comprehensive_analysis()
+    assert sorted(summary["tracks"]) == ["3", "4"]
+    assert summary["tracks"]["4"]["total_frames"] == 10
+
+def test_analyzer_applies_risk_rules_to_every_track(walking):
+    def script(frame_id):
+        return [person(walking[frame_id], 0.25), person(walking[frame_id], 0.75)]
+    
+    rule = RiskRule("bent_knee", "angle:left_knee", "<", 360.0, weight=1.0)
+    analyzer = MultiPersonAnalyzer(estimator=ScriptedEstimator(script), risk_rules=[rule])
+    for frame_id in range(20):
+        analyzer.analyze_frame(frame_id, frame_id, frame_id / 30.0)
+    
+    assert len(analyzer.analyzers) == 2
+    for track_analyzer in analyzer.analyzers.values():
+        assert track_analyzer.biomechanical_analyzer.rules == (rule,)
+    for summary in analyzer.get_comprehensive_analysis()["tracks"].values():
+        assessment = summary["biomechanical_assessment"]
+        assert assessment["risk_factor_counts"] == {"bent_knee": 20}
+
+class CropEcho:
+    """Single-person backend that puts a pose in the middle of every crop"""
+    
+    batch_size = 1
+    
+    def __init__(self, pose):
+        self.pose = pose
+        self.crop_shapes = []
+    
+    def detect_pose(self, crop):
+        self.crop_shapes.append(crop.shape)
+        return LandmarkSet(self.pose)
+
+class BoxDetector:
+    def __init__(self, boxes):
+        self.boxes = np.asarray(boxes, dtype=float)
+    
+    def detect(self, frame):
+        return self.boxes
+
+def test_crops_map_back_to_frame(walking):
+    boxes = [[40, 60, 240, 460, 0.9], [400, 40, 600, 440, 0.8]]
+    estimator = MultiPersonPoseEstimator(detector=BoxDetector(boxes), workers=1, crop_padding=0.0,
+                                         crop_max_side=128, estimator_factory=lambda: CropEcho(walking[0]))
+    try:
+        people = estimator.detect_poses(np.zeros((HEIGHT, WIDTH, 3), dtype=np.uint8))
+    finally:
+        estimator.close()
+    
+    assert len(people) == 2
+    for found, (x0, y0, x1, y1, _) in zip(people, boxes):
+        expected_x = (walking[0, :, 0] * (x1 - x0) + x0) / WIDTH
+        np.testing.assert_allclose(found.landmarks.array[:, 0], expected_x, atol=1e-6)
+        assert x0 <= found.box[0] and found.box[2] <= x1
+    assert estimator.detector_calls == 1 and estimator.crops_estimated == 2
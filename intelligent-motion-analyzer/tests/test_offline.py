@@ -0,0 +1,89 @@
+"""
+Tests for chunked offline analysis and the offline-mode flag checks
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import sys
+
+import numpy as np
+import pytest
+
+import motion_analyzer
+import offline
+from helpers import FrameIndexBackend, write_index_video
+from motion_analyzer import LandmarkSet, MotionAnalyzer
+
+def test_plan_chunks():
+    assert offline.plan_chunks(10, 4) == [(0, 4), (4, 8), (8, 10)]
+    assert offline.plan_chunks(0, 4) == [(0, None)]
+
+@pytest.fixture
+def stub_workers(monkeypatch, walking):
+    """Replace the per-worker MediaPipe estimator with the frame-index backend"""
+    backend = FrameIndexBackend(walking, missing={5})
+    monkeypatch.setattr(offline, "_get_worker_estimator", lambda *args: backend)
+    return backend
+
+def test_chunked_run_matches_sequential_analysis(tmp_path, walking, stub_workers):
+    video = write_index_video(str(tmp_path / "walk.avi"), 100)
+    analyzer = MotionAnalyzer()
+    results = list(offline.iter_video_offline(video, analyzer, executor=None, chunk_size=30))
+    
+    reference = MotionAnalyzer()
+    expected = [reference.analyze_landmarks(None if index == 5 else LandmarkSet(walking[index]),
+                                            index, index / 30.0) for index in range(100)]
+    assert [metrics.frame_id for metrics in results] == list(range(100))
+    assert not results[5].poses
+    for got, want in zip(results, expected):
+        assert [a.angle_degrees for a in got.joint_angles] == pytest.approx(
+            [a.angle_degrees for a in want.joint_angles])
+    assert results[-1].gait_metrics["cadence"] == pytest.approx(expected[-1].gait_metrics["cadence"])
+
+def test_cache_replays_without_inference(tmp_path, walking, stub_workers):
+    from landmark_cache import LandmarkCache
+    
+    video = write_index_video(str(tmp_path / "walk.avi"), 60)
+    cache = LandmarkCache(str(tmp_path / "cache"))
+    first = list(offline.iter_video_offline(video, MotionAnalyzer(), chunk_size=25, cache=cache))
+    calls = stub_workers.calls
+    second = list(offline.iter_video_offline(video, MotionAnalyzer(), chunk_size=25, cache=cache))
+    assert stub_workers.calls == calls
+    np.testing.assert_array_equal(first[40].poses[0]["landmarks"].array,
+                                  second[40].poses[0]["landmarks"].array)
+    
+    # A different tracking threshold is a different cache entry
+    list(offline.iter_video_offline(video, MotionAnalyzer(), chunk_size=25, cache=cache,
+                                    min_tracking_confidence=0.8))
+    assert stub_workers.calls > calls
+
+def test_run_offline_honours_history_limits(tmp_path, stub_workers, monkeypatch):
+    video = write_index_video(str(tmp_path / "walk.avi"), 40)
+    created = []
+    original = offline.MotionAnalyzer
+    
+    def recording_analyzer(*args, **kwargs):
+        created.append(original(*args, **kwargs))
+        return created[-1]
+    
+    monkeypatch.setattr(offline, "MotionAnalyzer", recording_analyzer)
+    offline.run_offline(video, str(tmp_path / "out.ndjson"), workers=1, chunk_size=16,
+                        max_history_frames=10)
+    assert created[0].max_history_frames == 10
+    assert len(created[0].motion_history) == 10
+
+@pytest.mark.parametrize("flags", [
+    ["--workers", "2", "--adaptive"],
+    ["--workers", "2", "--stride", "2"],
+    ["--workers", "2", "--save-video", "out.mp4"],
+    ["--cache-dir", "cache", "--pose-backend", "onnx", "--pose-model", "model.onnx"],
+    ["--workers", "2", "--multi-person"],
+    ["--multi-person", "--pipelined"],
+])
+def test_main_rejects_unsupported_combinations(monkeypatch, capsys, flags):
+    monkeypatch.setattr(sys, "argv", ["motion_analyzer.py", "--input", "video.mp4"] + flags)
+    with pytest.raises(SystemExit) as excinfo:
+        motion_analyzer.main()
+    assert excinfo.value.code == 2
+    assert "error" in capsys.readouterr().err
@@ -0,0 +1,90 @@
+"""
+Tests for the pose overlay renderer and the background annotated-video writer
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import logging
+
+import cv2
+import numpy as np
+import pytest
+
+from motion_analyzer import JOINT_CONNECTIONS, LandmarkSet, MotionAnalyzer
+from overlay import AnnotatedVideoWriter, OverlayRenderer, skeleton_segments
+
+@pytest.fixture(scope="module")
+def results(walking):
+    analyzer = MotionAnalyzer()
+    return [analyzer.analyze_landmarks(LandmarkSet(walking[index]), index, index / 30.0)
+            for index in range(12)]
+
+def test_skeleton_segments():
+    pairs, chains = skeleton_segments({"left_leg": [23, 25, 27], "spine": [11, 12, 23, 24]})
+    assert pairs.tolist() == [[23, 25], [25, 27], [11, 12], [12, 24], [24, 23], [23, 11]]
+    assert chains == ["left_leg"] * 2 + ["spine"] * 4
+    
+    pairs, chains = skeleton_segments(JOINT_CONNECTIONS)
+    assert pairs.shape == (len(chains), 2)
+
+def test_draw_pose_marks_visible_landmarks(walking):
+    renderer = OverlayRenderer(draw_angles=False)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    renderer.draw_pose(frame, walking[0])
+    assert frame.any()
+    x, y = np.rint(walking[0][25, :2] * (320, 240)).astype(int)
+    assert frame[y, x].any()  # Left knee dot
+    
+    hidden = walking[0].copy()
+    hidden[:, 3] = 0.0
+    blank = np.zeros_like(frame)
+    renderer.draw_pose(blank, hidden)
+    assert not blank.any()
+
+def test_draw_labels_angles(results):
+    assert results[0].joint_angles
+    frame = np.zeros((480, 640, 3), dtype=np.uint8)
+    OverlayRenderer(draw_angles=False).draw(frame, results[:1])
+    labelled = np.zeros_like(frame)
+    OverlayRenderer().draw(labelled, results[:1])
+    # Labels add pixels beside the joints that the skeleton alone leaves blank
+    assert (labelled.any(axis=2) & ~frame.any(axis=2)).any()
+
+def test_writer_writes_every_frame(tmp_path, results):
+    path = str(tmp_path / "review.avi")
+    with AnnotatedVideoWriter(path, fps=30, fourcc="MJPG", queue_size=4) as writer:
+        for motion_metrics in results:
+            writer.submit(np.zeros((240, 320, 3), dtype=np.uint8), [motion_metrics])
+    assert writer.error is None
+    assert writer.frames_written == len(results)
+    
+    capture = cv2.VideoCapture(path)
+    frames = []
+    ok, frame = capture.read()
+    while ok:
+        frames.append(frame)
+        ok, frame = capture.read()
+    capture.release()
+    assert len(frames) == len(results)
+    assert frames[0].shape == (240, 320, 3) and frames[0].any()
+
+def test_writer_open_failure_is_reported_once(tmp_path, results, caplog):
+    path = str(tmp_path / "missing_dir" / "review.avi")
+    with caplog.at_level(logging.WARNING, logger="overlay"):
+        writer = AnnotatedVideoWriter(path, fps=30, fourcc="MJPG")
+        for motion_metrics in results:
+            writer.submit(np.zeros((240, 320, 3), dtype=np.uint8), [motion_metrics])
+        writer.close()
+    assert writer.frames_written == 0
+    assert writer.error is not None
+    errors = [record for record in caplog.records if record.levelno == logging.ERROR]
+    assert len(errors) == 1
+    assert any("was not written" in record.getMessage() for record in caplog.records)
+
+def test_writer_warns_when_nothing_was_submitted(tmp_path, caplog):
+    with caplog.at_level(logging.WARNING, logger="overlay"):
+        writer = AnnotatedVideoWriter(str(tmp_path / "empty.avi"), fps=30)
+        writer.close()
+    assert writer.frames_written == 0 and writer.error is None
+    assert any("no frames were written" in record.getMessage() for record in caplog.records)
@@ -0,0 +1,123 @@
+"""
+Tests for BoundedQueue backpressure and the pipelined runner
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from motion_analyzer import LandmarkSet, MotionAnalyzer, PoseBackend
+from pipeline import BackpressurePolicy, BoundedQueue, PipelinedRunner, QueueClosed
+
+class TestBoundedQueue:
+    def test_fifo(self):
+        queue = BoundedQueue(3)
+        for item in range(3):
+            assert queue.put(item)
+        assert [queue.get() for _ in range(3)] == [0, 1, 2]
+    
+    def test_drop_newest(self):
+        queue = BoundedQueue(2, BackpressurePolicy.DROP_NEWEST)
+        results = [queue.put(item) for item in range(4)]
+        assert results == [True, True, False, False]
+        assert queue.dropped == 2
+        assert [queue.get(), queue.get()] == [0, 1]
+    
+    def test_drop_oldest(self):
+        queue = BoundedQueue(2, BackpressurePolicy.DROP_OLDEST)
+        for item in range(5):
+            assert queue.put(item)
+        assert queue.dropped == 3
+        assert [queue.get(), queue.get()] == [3, 4]
+    
+    def test_block_waits_for_space(self):
+        queue = BoundedQueue(1, BackpressurePolicy.BLOCK)
+        queue.put("first")
+        done = threading.Event()
+        
+        def producer():
+            queue.put("second")
+            done.set()
+        
+        thread = threading.Thread(target=producer, daemon=True)
+        thread.start()
+        assert not done.wait(0.1)  # Blocked on a full queue
+        assert queue.get() == "first"
+        assert done.wait(1.0)
+        assert queue.get() == "second"
+        assert queue.dropped == 0
+    
+    def test_close_unblocks_producer_and_drains(self):
+        queue = BoundedQueue(1)
+        queue.put("kept")
+        results = []
+        thread = threading.Thread(target=lambda: results.append(queue.put("blocked")), daemon=True)
+        thread.start()
+        time.sleep(0.05)
+        queue.close()
+        thread.join(1.0)
+        assert results == [False]
+        assert not queue.put("late")
+        assert queue.get() == "kept"
+        with pytest.raises(QueueClosed):
+            queue.get()
+    
+    def test_rejects_empty_capacity(self):
+        with pytest.raises(ValueError):
+            BoundedQueue(0)
+
+class SequenceBackend(PoseBackend):
+    """Returns the walking pose whose index is encoded in the frame's first pixel"""
+    
+    def __init__(self, poses: np.ndarray):
+        super().__init__()
+        self.poses = poses
+    
+    def detect_pose(self, frame: np.ndarray):
+        return LandmarkSet(self.poses[int(frame[0, 0, 0])])
+
+class FakeCapture:
+    def __init__(self, count: int):
+        self.count = count
+        self.position = 0
+    
+    def read(self):
+        if self.position >= self.count:
+            return False, None
+        frame = np.full((4, 4, 3), self.position, dtype=np.uint8)
+        self.position += 1
+        return True, frame
+
+def test_runner_keeps_order_and_analyzes_every_frame(walking):
+    analyzer = MotionAnalyzer(pose_estimator=SequenceBackend(walking))
+    seen = []
+    runner = PipelinedRunner(analyzer, FakeCapture(60),
+                             lambda frame, motion_metrics: seen.append(motion_metrics) or True,
+                             queue_size=2)
+    runner.run()
+    assert [motion_metrics.frame_id for motion_metrics in seen] == list(range(60))
+    assert all(motion_metrics.poses for motion_metrics in seen)
+    np.testing.assert_array_equal(seen[10].poses[0]["landmarks"].array, walking[10])
+    stats = runner.get_stats()
+    assert stats["analysis"]["items"] == 60
+    assert stats["inference"]["dropped"] == 0
+
+def test_runner_stops_when_sink_returns_false(walking):
+    analyzer = MotionAnalyzer(pose_estimator=SequenceBackend(walking))
+    seen = []
+    runner = PipelinedRunner(analyzer, FakeCapture(200),
+                             lambda frame, motion_metrics: seen.append(motion_metrics) or len(seen) < 5)
+    runner.run()
+    assert len(seen) == 5
+
+def test_runner_max_frames(walking):
+    analyzer = MotionAnalyzer(pose_estimator=SequenceBackend(walking))
+    seen = []
+    PipelinedRunner(analyzer, FakeCapture(200), lambda frame, motion_metrics: seen.append(1) or True,
+                    max_frames=7).run()
+    assert len(seen) == 7
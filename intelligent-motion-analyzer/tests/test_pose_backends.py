@@ -0,0 +1,132 @@
+"""
+Tests for the batched landmark-model backend, landmark replay and make_pose_backend
+
+The landmark model is a tiny ONNX graph built in the test: it ignores the
+image and returns a fixed landmark pattern and presence logit, so decoding
+and region-of-interest mapping can be checked without model weights.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from motion_analyzer import LandmarkSet, NUM_LANDMARKS, PoseEstimator
+from pose_backends import POSE_BACKENDS, OnnxPoseBackend, ReplayPoseBackend, make_pose_backend
+
+SIZE = 256
+
+def landmark_pattern() -> np.ndarray:
+    """39 x 5 raw model landmarks spread around the input center, visibility logit 3"""
+    pattern = np.zeros((39, 5), dtype=np.float32)
+    pattern[:, 0] = SIZE / 2 + np.linspace(-40, 40, 39)
+    pattern[:, 1] = SIZE / 2 + np.linspace(-60, 60, 39)
+    pattern[:, 3] = 3.0
+    pattern[:, 4] = 3.0
+    return pattern
+
+def write_model(path: str, presence_logit: float) -> str:
+    """Constant-output pose landmark model with a raw (pre-sigmoid) presence logit"""
+    onnx = pytest.importorskip("onnx")
+    from onnx import TensorProto, helper, numpy_helper
+    
+    def initializer(name, array):
+        return numpy_helper.from_array(np.asarray(array, dtype=np.float32), name)
+    
+    nodes = [
+        helper.make_node("Transpose", ["input_1"], ["nchw"], perm=[0, 3, 1, 2]),
+        helper.make_node("GlobalAveragePool", ["nchw"], ["pooled"]),
+        helper.make_node("Flatten", ["pooled"], ["features"]),
+        helper.make_node("Gemm", ["features", "landmark_weights", "landmark_bias"], ["Identity"]),
+        helper.make_node("Gemm", ["features", "presence_weights", "presence_bias"], ["Identity_1"])
+    ]
+    graph = helper.make_graph(
+        nodes, "pose_landmarks",
+        [helper.make_tensor_value_info("input_1", TensorProto.FLOAT, ["N", SIZE, SIZE, 3])],
+        [helper.make_tensor_value_info("Identity", TensorProto.FLOAT, ["N", 195]),
+         helper.make_tensor_value_info("Identity_1", TensorProto.FLOAT, ["N", 1])],
+        [initializer("landmark_weights", np.zeros((3, 195))),
+         initializer("landmark_bias", landmark_pattern().reshape(-1)),
+         initializer("presence_weights", np.zeros((3, 1))),
+         initializer("presence_bias", [presence_logit])])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, path)
+    return path
+
+@pytest.fixture
+def model_backend(tmp_path):
+    pytest.importorskip("onnxruntime")
+    
+    def build(presence_logit: float, **kwargs) -> OnnxPoseBackend:
+        path = write_model(str(tmp_path / f"pose_{presence_logit}.onnx"), presence_logit)
+        return OnnxPoseBackend(path, num_threads=1, **kwargs)
+    return build
+
+@pytest.mark.parametrize("presence_logit, detected", [(0.2, True), (3.0, True), (-0.2, False), (-3.0, False)])
+def test_presence_logit_goes_through_sigmoid(model_backend, presence_logit, detected):
+    backend = model_backend(presence_logit, batch_size=2, static_image_mode=True)
+    results = backend.detect_poses([np.zeros((240, 320, 3), dtype=np.uint8)] * 3)
+    assert [landmarks is not None for landmarks in results] == [detected] * 3
+
+def test_landmarks_map_back_to_the_frame(model_backend):
+    backend = model_backend(2.0, batch_size=4, static_image_mode=True)
+    landmarks = backend.detect_pose(np.zeros((240, 320, 3), dtype=np.uint8))
+    
+    # Whole frame letterboxed: 320 px square centered on (160, 120)
+    raw = landmark_pattern()[:NUM_LANDMARKS]
+    scale = 320 / SIZE
+    np.testing.assert_allclose(landmarks.array[:, 0], ((raw[:, 0] - SIZE / 2) * scale + 160) / 320, atol=1e-5)
+    np.testing.assert_allclose(landmarks.array[:, 1], ((raw[:, 1] - SIZE / 2) * scale + 120) / 240, atol=1e-5)
+    np.testing.assert_allclose(landmarks.array[:, 3], 1.0 / (1.0 + np.exp(-3.0)), atol=1e-6)
+
+def test_tracking_narrows_the_region(model_backend):
+    backend = model_backend(2.0, batch_size=1)
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    first = backend.detect_pose(frame)
+    assert backend._roi is not None
+    second = backend.detect_pose(frame)
+    # The pose fills more of the tracked region than of the whole frame
+    assert np.ptp(second.array[:, 1]) < np.ptp(first.array[:, 1])
+    
+    backend.reset()
+    np.testing.assert_allclose(backend.detect_pose(frame).array, first.array, atol=1e-5)
+
+def test_replay_backend(tmp_path, walking):
+    path = str(tmp_path / "landmarks.npz")
+    detected = np.ones(5, dtype=np.uint8)
+    detected[2] = 0
+    np.savez(path, landmarks=walking[:5], detected=detected)
+    
+    backend = ReplayPoseBackend(path)
+    results = backend.detect_poses([None] * 7)
+    assert results[2] is None and results[5] is None and results[6] is None
+    np.testing.assert_array_equal(results[4].array, walking[4])
+    
+    looping = ReplayPoseBackend(path, loop=True)
+    looping.seek(4)
+    results = looping.detect_poses([None] * 2)
+    np.testing.assert_array_equal(results[1].array, walking[0])
+
+def test_make_pose_backend(tmp_path, walking):
+    path = str(tmp_path / "landmarks.npz")
+    np.savez(path, landmarks=walking[:3])
+    
+    backend = make_pose_backend("replay", path, batch_size=4)
+    assert isinstance(backend, ReplayPoseBackend) and backend.batch_size == 4
+    assert isinstance(backend.detect_pose(None), LandmarkSet)
+    
+    with pytest.raises(ValueError):
+        make_pose_backend("openpose", path)
+    with pytest.raises(ValueError):
+        make_pose_backend("onnx")
+    assert POSE_BACKENDS["mediapipe"] is PoseEstimator
+
+def test_make_onnx_backend(tmp_path):
+    pytest.importorskip("onnxruntime")
+    path = write_model(str(tmp_path / "pose.onnx"), 1.0)
+    backend = make_pose_backend("onnx", path, batch_size=2, num_threads=1, static_image_mode=True)
+    assert isinstance(backend, OnnxPoseBackend)
+    assert backend.batch_size == 2 and backend.num_threads == 1
+    assert backend.detect_pose(np.zeros((64, 64, 3), dtype=np.uint8)) is not None
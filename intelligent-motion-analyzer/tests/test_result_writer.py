@@ -0,0 +1,118 @@
+"""
+Round-trip tests for the streaming result sinks, SessionReader and postprocess
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+
+from motion_analyzer import LandmarkSet, MotionAnalyzer
+from postprocess import iter_saved_landmarks, rerun_analysis
+from result_writer import ResultSink, SessionReader, infer_format, open_result_sink
+
+MISSING = {10, 11, 40}
+
+@pytest.fixture(scope="module")
+def session(walking):
+    """Analyzed frames of a 90-frame walk with a few dropped detections"""
+    analyzer = MotionAnalyzer()
+    frames = [analyzer.analyze_landmarks(None if index in MISSING else LandmarkSet(walking[index]),
+                                         index, index / 30.0) for index in range(90)]
+    return frames, analyzer.get_comprehensive_analysis()
+
+def write_session(path, session, fmt=None):
+    frames, summary = session
+    with open_result_sink(path, fmt) as sink:
+        for motion_metrics in frames:
+            sink.write(motion_metrics)
+        sink.close(summary)
+    return path
+
+def expected_landmarks(frames):
+    return [frame.poses[0]["landmarks"].array if frame.poses else None for frame in frames]
+
+@pytest.mark.parametrize("name", ["out.json", "out.ndjson", "session"])
+def test_saved_landmarks_round_trip(tmp_path, session, name):
+    path = write_session(str(tmp_path / name), session, "binary" if name == "session" else None)
+    saved = list(iter_saved_landmarks(path))
+    frames = session[0]
+    assert [frame_id for frame_id, _, _ in saved] == [frame.frame_id for frame in frames]
+    assert [timestamp for _, timestamp, _ in saved] == pytest.approx([frame.timestamp for frame in frames])
+    for (_, _, landmarks), want in zip(saved, expected_landmarks(frames)):
+        if want is None:
+            assert landmarks is None
+        else:
+            np.testing.assert_allclose(landmarks.array, want, rtol=1e-6, atol=1e-7)
+
+def test_json_layouts(tmp_path, session):
+    frames, summary = session
+    with open(write_session(str(tmp_path / "out.json"), session)) as f:
+        document = json.load(f)
+    assert len(document["frame_results"]) == len(frames)
+    assert document["comprehensive_analysis"]["total_frames"] == summary["total_frames"]
+    
+    with open(write_session(str(tmp_path / "out.ndjson"), session)) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    assert [line["frame_id"] for line in lines[:-1]] == [frame.frame_id for frame in frames]
+    assert "frame_id" not in lines[-1]
+
+def test_session_reader_columns_and_slices(tmp_path, session):
+    frames, summary = session
+    reader = SessionReader(write_session(str(tmp_path / "session"), session, "binary"))
+    assert len(reader) == len(frames)
+    assert reader.joint_names[0] == frames[0].joint_angles[0].joint_name
+    assert reader.has_pose.sum() == sum(bool(frame.poses) for frame in frames)
+    assert reader.angles[0, 0] == pytest.approx(frames[0].joint_angles[0].angle_degrees)
+    assert reader.summary()["total_frames"] == summary["total_frames"]
+    
+    window = reader.slice_frames(20, 30)
+    np.testing.assert_array_equal(window["frame_ids"], np.arange(20, 30))
+    np.testing.assert_array_equal(window["landmarks"][0], frames[20].poses[0]["landmarks"].array)
+
+def test_session_reader_ignores_partial_trailing_record(tmp_path, session):
+    path = write_session(str(tmp_path / "session"), session, "binary")
+    with open(os.path.join(path, "landmarks.f32"), "ab") as f:
+        f.write(b"\0" * 100)
+    with open(os.path.join(path, "frame_ids.i64"), "ab") as f:
+        f.write(np.int64(90).tobytes())
+    assert len(SessionReader(path)) == len(session[0])
+
+def test_rerun_analysis_reproduces_gait(tmp_path, session):
+    frames, summary = session
+    source = write_session(str(tmp_path / "session"), session, "binary")
+    rerun = rerun_analysis(source, str(tmp_path / "rerun.ndjson"))
+    assert rerun["total_frames"] == summary["total_frames"]
+    assert rerun["motion_summary"]["average_joint_angles"] == pytest.approx(
+        summary["motion_summary"]["average_joint_angles"])
+    assert rerun["biomechanical_assessment"]["risk_factor_counts"] == \
+        summary["biomechanical_assessment"]["risk_factor_counts"]
+
+def test_infer_format():
+    assert infer_format("results.json") == "json"
+    assert infer_format("results.ndjson") == "ndjson"
+    assert infer_format("session_dir") == "binary"
+    with pytest.raises(ValueError):
+        open_result_sink("out.json", "xml")
+
+def test_sinks_flush_while_writing(tmp_path, session):
+    frames, _ = session
+    for name in ("out.json", "out.ndjson"):
+        path = str(tmp_path / name)
+        sink = open_result_sink(path, flush_every=1)
+        sink.write(frames[0])
+        with open(path) as f:
+            assert '"joint_angles"' in f.read()  # One frame is smaller than the file buffer
+        sink.close()
+
+def test_result_sink_is_abstract():
+    class WriteOnly(ResultSink):
+        def write(self, metrics):
+            pass
+    
+    with pytest.raises(TypeError):
+        WriteOnly()
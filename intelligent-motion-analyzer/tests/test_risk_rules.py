@@ -0,0 +1,98 @@
+"""
+Tests for the rule-driven incremental injury-risk engine
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import json
+
+import pytest
+
+from motion_analyzer import (
+    BiomechanicalAnalyzer, DEFAULT_RISK_RULES, JointAngle, MotionMetrics, RiskRule, load_risk_rules
+)
+
+def frame(index, knee=175.0, symmetry=0.95, fps=10.0):
+    return MotionMetrics(index, index / fps, [], [JointAngle("left_knee", knee, 1.0)],
+                         gait_metrics={"symmetry_score": symmetry})
+
+def test_rule_validation():
+    with pytest.raises(ValueError):
+        RiskRule("bad", "angle:left_knee", "==", 1.0)
+    with pytest.raises(ValueError):
+        RiskRule("bad", "left_knee", "<", 1.0)
+    with pytest.raises(ValueError):
+        RiskRule("bad", "speed:left_knee", "<", 1.0)
+
+def test_load_risk_rules(tmp_path):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps([{"factor": "deep_squat", "metric": "angle:left_knee", "op": "<=",
+                                 "threshold": 90, "weight": 0.5, "recommendations": ["Go easy"]}]))
+    (rule,) = load_risk_rules(str(path))
+    assert rule == RiskRule("deep_squat", "angle:left_knee", "<=", 90.0, 0.5, recommendations=("Go easy",))
+
+def test_thresholds_raise_and_clear_factors():
+    engine = BiomechanicalAnalyzer(DEFAULT_RISK_RULES)
+    for index in range(10):
+        engine.update(frame(index, knee=150.0 if 3 <= index < 6 else 175.0,
+                            symmetry=0.5 if index == 9 else 0.95))
+    
+    assessment = engine.current_assessment()
+    assert assessment["risk_factors"] == ["excessive_knee_valgus_left", "gait_asymmetry"]
+    assert assessment["active_risk_factors"] == ["gait_asymmetry"]
+    assert assessment["risk_factor_counts"] == {"excessive_knee_valgus_left": 3, "gait_asymmetry": 1}
+    details = assessment["risk_factor_details"]["excessive_knee_valgus_left"]
+    assert details["episodes"] == 1 and details["frames"] == 3
+    assert details["seconds"] == pytest.approx(0.3)
+    assert 0.0 < details["level"] < 1.0  # Decaying since it cleared
+    assert "excessive_knee_valgus_right" not in assessment["risk_factor_counts"]
+    assert assessment["recommendations"] == [
+        "Focus on hip strengthening exercises", "Practice proper landing mechanics",
+        "Work on balance and proprioception", "Consider physical therapy assessment"]
+
+def test_min_duration_and_episodes():
+    rule = RiskRule("sustained_flexion", "angle:left_knee", "<", 160.0, weight=1.0, min_duration=0.45)
+    engine = BiomechanicalAnalyzer([rule], decay_half_life=0.0)
+    # At 10 fps: a 0.3 s run that stays below min_duration, then one that reaches it at frame 9
+    knees = [150.0] * 4 + [175.0] + [150.0] * 8 + [175.0]
+    for index, knee in enumerate(knees):
+        engine.update(frame(index, knee=knee))
+        if index == 9:
+            assert engine.current_assessment()["active_risk_factors"] == ["sustained_flexion"]
+            assert engine.current_assessment()["overall_risk_score"] == 1.0
+    
+    state = engine.rule_states["sustained_flexion"]
+    assert state.episodes == 1
+    assert state.frames == 12
+    assert engine.risk_factor_counts["sustained_flexion"] == 4  # Frames 9-12 while raised
+    assert engine.current_assessment()["overall_risk_score"] == 0.0  # No decay tail
+
+def test_missing_and_nan_values_never_hold():
+    rule = RiskRule("low_cadence", "gait:cadence", "<", 80.0)
+    engine = BiomechanicalAnalyzer([rule])
+    engine.update(MotionMetrics(0, 0.0, [], [], gait_metrics={"cadence": None}))
+    engine.update(MotionMetrics(1, 0.1, [], [], gait_metrics={"cadence": float("nan")}))
+    engine.update(MotionMetrics(2, 0.2, [], [], gait_metrics=None))
+    assert engine.current_assessment()["risk_factors"] == []
+
+def test_frame_gaps_are_capped():
+    rule = RiskRule("flexed", "angle:left_knee", "<", 160.0)
+    engine = BiomechanicalAnalyzer([rule], max_frame_gap=1.0)
+    engine.update(frame(0, knee=100.0))
+    engine.update(MotionMetrics(1, 60.0, [], [JointAngle("left_knee", 100.0, 1.0)]))
+    assert engine.rule_states["flexed"].seconds == pytest.approx(1.0)
+
+def test_batch_assessment_matches_incremental_and_leaves_state():
+    frames = [frame(index, knee=150.0 + index % 30, symmetry=0.7 + 0.01 * (index % 40)) for index in range(200)]
+    incremental = BiomechanicalAnalyzer()
+    for motion_metrics in frames[:100]:
+        incremental.update(motion_metrics)
+    batch = incremental.assess_injury_risk(frames)
+    assert incremental.frames_assessed == 100
+    
+    for motion_metrics in frames[100:]:
+        incremental.update(motion_metrics)
+    expected = incremental.current_assessment()
+    for key in ("overall_risk_score", "risk_factors", "risk_factor_counts", "risk_factor_details"):
+        assert batch[key] == expected[key]
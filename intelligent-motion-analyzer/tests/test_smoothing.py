@@ -0,0 +1,79 @@
+"""
+Tests for the One-Euro and Kalman landmark filters
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import walking_sequence
+from motion_analyzer import LandmarkSet, MotionAnalyzer
+from smoothing import LANDMARK_FILTERS, KalmanFilter, OneEuroFilter, make_landmark_filter
+
+def smooth(landmark_filter, sequence, fps=30.0):
+    return np.array([landmark_filter.filter(LandmarkSet(row), index / fps).array
+                     for index, row in enumerate(sequence)])
+
+@pytest.mark.parametrize("name", sorted(LANDMARK_FILTERS))
+def test_filters_reduce_jitter(name):
+    clean = walking_sequence(300, noise=0.0)
+    noisy = walking_sequence(300, noise=0.01)
+    smoothed = smooth(make_landmark_filter(name), noisy)
+    
+    raw_error = np.sqrt(np.mean((noisy[30:, :, :2] - clean[30:, :, :2]) ** 2))
+    smoothed_error = np.sqrt(np.mean((smoothed[30:, :, :2] - clean[30:, :, :2]) ** 2))
+    assert smoothed_error < 0.9 * raw_error
+    np.testing.assert_array_equal(smoothed[:, :, 3], noisy[:, :, 3])
+
+@pytest.mark.parametrize("filter_class", [OneEuroFilter, KalmanFilter])
+def test_static_pose_converges_and_passes_flags(filter_class, walking):
+    landmark_filter = filter_class()
+    target = LandmarkSet(walking[0], interpolated=True)
+    for index in range(60):
+        result = landmark_filter.filter(target, index / 30.0)
+    assert result.interpolated
+    np.testing.assert_allclose(result.array[:, :3], walking[0, :, :3], atol=1e-5)
+
+@pytest.mark.parametrize("filter_class", [OneEuroFilter, KalmanFilter])
+def test_low_visibility_moves_less(filter_class, walking):
+    start = walking[0].copy()
+    start[:, 3] = 1.0
+    moved = start.copy()
+    moved[:, 0] += 0.05
+    moved[0, 3] = 0.1  # Nose barely visible, left shoulder fully visible
+    
+    landmark_filter = filter_class()
+    landmark_filter.filter(LandmarkSet(start), 0.0)
+    result = landmark_filter.filter(LandmarkSet(moved), 1.0 / 30.0).array
+    nose_step = result[0, 0] - start[0, 0]
+    shoulder_step = result[11, 0] - start[11, 0]
+    assert 0.0 < nose_step < shoulder_step
+
+def test_gap_restarts_filter(walking):
+    landmark_filter = OneEuroFilter(max_gap_seconds=0.5)
+    landmark_filter.filter(LandmarkSet(walking[0]), 0.0)
+    jumped = walking[0].copy()
+    jumped[:, :2] += 0.2
+    result = landmark_filter.filter(LandmarkSet(jumped), 2.0)
+    np.testing.assert_array_equal(result.array, jumped)
+
+def test_make_landmark_filter():
+    assert make_landmark_filter(None) is None
+    assert make_landmark_filter("none") is None
+    assert isinstance(make_landmark_filter("kalman", measurement_noise=1e-4), KalmanFilter)
+    with pytest.raises(ValueError):
+        make_landmark_filter("median")
+
+def test_analyzer_applies_filter():
+    noisy = walking_sequence(120, noise=0.01)
+    plain = MotionAnalyzer()
+    smoothed = MotionAnalyzer(landmark_filter=make_landmark_filter("one_euro"))
+    for index, row in enumerate(noisy):
+        raw = plain.analyze_landmarks(LandmarkSet(row), index, index / 30.0)
+        filtered = smoothed.analyze_landmarks(LandmarkSet(row), index, index / 30.0)
+    assert not np.array_equal(raw.poses[0]["landmarks"].array, filtered.poses[0]["landmarks"].array)
+    raw_angles = [m.joint_angles[0].angle_degrees for m in plain.iter_history()]
+    smooth_angles = [m.joint_angles[0].angle_degrees for m in smoothed.iter_history()]
+    assert np.std(np.diff(smooth_angles)) < np.std(np.diff(raw_angles))
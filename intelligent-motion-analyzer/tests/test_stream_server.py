@@ -0,0 +1,99 @@
+"""
+Tests for the multi-stream server: scheduling, estimator factory and shutdown
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import threading
+import time
+
+from helpers import FrameIndexBackend, write_index_video
+from stream_server import StreamConfig, StreamServer
+
+def test_file_streams_processed_in_order(tmp_path, walking):
+    configs = [StreamConfig(f"s{index}", write_index_video(str(tmp_path / f"s{index}.avi"), 40),
+                            realtime=False)
+               for index in range(3)]
+    results = {config.stream_id: [] for config in configs}
+    lock = threading.Lock()
+    
+    def on_result(stream_id, frame, motion_metrics):
+        with lock:
+            results[stream_id].append(motion_metrics.frame_id)
+    
+    estimators = []
+    
+    def factory():
+        estimators.append(FrameIndexBackend(walking))
+        return estimators[-1]
+    
+    server = StreamServer(configs, workers=2, on_result=on_result, estimator_factory=factory)
+    server.start()
+    server.wait()
+    server.stop()
+    
+    assert len(estimators) == 2
+    for stream_id, frame_ids in results.items():
+        # Readers may overwrite frames no worker took yet, but order is kept
+        assert frame_ids and frame_ids == sorted(frame_ids)
+        stats = server.get_stats()[stream_id]
+        assert stats["finished"]
+        assert stats["frames_processed"] == len(frame_ids)
+        assert stats["frames_processed"] + stats["frames_skipped"] == stats["frames_captured"] == 40
+    assert server.get_stream_analysis("s0")["total_frames"] == len(results["s0"])
+
+class BlockingCapture:
+    """A live source whose read() hangs until the capture is released"""
+    
+    def __init__(self):
+        self.released = threading.Event()
+    
+    def isOpened(self):
+        return True
+    
+    def get(self, prop):
+        return 30.0
+    
+    def read(self):
+        self.released.wait()
+        return False, None
+    
+    def release(self):
+        self.released.set()
+
+def test_stop_releases_stalled_capture(monkeypatch, walking):
+    capture = BlockingCapture()
+    server = StreamServer([StreamConfig("live", "rtsp://camera", reconnect_delay=60.0)], workers=1,
+                          estimator_factory=lambda: FrameIndexBackend(walking), join_timeout=0.2)
+    monkeypatch.setattr(server, "_open", lambda source: capture)
+    server.start()
+    time.sleep(0.05)
+    
+    started = time.perf_counter()
+    server.stop()
+    assert time.perf_counter() - started < 2.0
+    assert capture.released.is_set()
+    assert server.streams["live"].finished
+
+def test_stop_logs_threads_that_never_exit(monkeypatch, caplog, walking):
+    hang = threading.Event()
+    server = StreamServer([StreamConfig("live", "rtsp://camera")], workers=1,
+                          estimator_factory=lambda: FrameIndexBackend(walking), join_timeout=0.05)
+    
+    class UnreleasableCapture(BlockingCapture):
+        def read(self):
+            hang.wait()
+            return False, None
+        
+        def release(self):
+            pass
+    
+    monkeypatch.setattr(server, "_open", lambda source: UnreleasableCapture())
+    server.start()
+    time.sleep(0.05)
+    try:
+        server.stop()
+        assert "reader-live did not stop" in caplog.text
+    finally:
+        hang.set()
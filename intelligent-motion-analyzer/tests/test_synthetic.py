@@ -0,0 +1,49 @@
+"""
+Tests for the synthetic benchmark workloads
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import argparse
+import os
+
+import numpy as np
+
+from benchmarks.synthetic import SyntheticPoseEstimator, iter_walking_chunks, walking_sequence
+from motion_analyzer import AnalysisType, MotionAnalyzer, PoseBackend
+
+def test_chunks_line_up_with_one_sequence():
+    whole = walking_sequence(250, noise=0.0)
+    chunked = np.concatenate(list(iter_walking_chunks(250, chunk_size=64, noise=0.0)))
+    # Visibility is drawn per chunk; positions must be continuous
+    np.testing.assert_allclose(chunked[:, :, :3], whole[:, :, :3], atol=1e-6)
+
+def test_estimator_is_a_complete_backend():
+    estimator = SyntheticPoseEstimator(chunk_size=16, noise=0.0)
+    assert isinstance(estimator, PoseBackend)
+    assert "left_leg" in estimator.joint_connections
+    poses = [estimator.detect_pose(None).array for _ in range(40)]
+    np.testing.assert_allclose(np.array(poses)[:, :, :3], walking_sequence(40, noise=0.0)[:, :, :3],
+                               atol=1e-6)
+
+def test_estimator_drives_analyze_frame():
+    analyzer = MotionAnalyzer(AnalysisType.GAIT_ANALYSIS, pose_estimator=SyntheticPoseEstimator())
+    for frame_id in range(60):
+        motion_metrics = analyzer.analyze_frame(None, frame_id, frame_id / 30.0)
+    assert motion_metrics.poses and motion_metrics.joint_angles
+
+def test_benchmark_reports_memory_per_stage(monkeypatch, capsys):
+    monkeypatch.syspath_prepend(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                             "benchmarks"))
+    import performance_test
+    
+    args = argparse.Namespace(frames=200, chunk_size=100, history=100, max_samples=50,
+                              stages=["gait", "injury_risk"], trace_memory=False)
+    results = performance_test.run_benchmarks(args)
+    for name in args.stages:
+        stage = results["stages"][name]
+        assert stage["frames"] == 200
+        assert stage["peak_rss_mb"] > 0 and stage["rss_growth_mb"] >= 0
+        assert "peak_traced_mb" not in stage
+    assert "peak RSS" in capsys.readouterr().out
@@ -0,0 +1,67 @@
+"""
+Tests for read-ahead video ingestion: ranges, stride, batching and buffer reuse
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import pytest
+
+from helpers import frame_index, write_index_video
+from video_source import VideoSource, scaled_size
+
+@pytest.fixture(scope="module")
+def video(tmp_path_factory):
+    return write_index_video(str(tmp_path_factory.mktemp("video") / "index.avi"), 60, size=(320, 240))
+
+def test_scaled_size():
+    assert scaled_size(1920, 1080, 640) == (640, 360)
+    assert scaled_size(640, 480, 640) is None
+    assert scaled_size(640, 480, None) is None
+
+def test_reads_every_frame_in_order(video):
+    with VideoSource(video) as source:
+        assert source.isOpened() and source.frame_count == 60
+        frames = [(frame.frame_id, frame_index(frame.image), frame.timestamp) for frame in source]
+    assert [frame_id for frame_id, _, _ in frames] == list(range(60))
+    assert [index for _, index, _ in frames] == list(range(60))
+    assert frames[30][2] == pytest.approx(1.0)
+
+def test_range_stride_and_downscale(video):
+    with VideoSource(video, start=10, stop=40, stride=3, max_side=160) as source:
+        frames = [(frame.frame_id, frame_index(frame.image), frame.image.shape) for frame in source.frames()]
+    assert [frame_id for frame_id, _, _ in frames] == list(range(10, 40, 3))
+    assert [index for _, index, _ in frames] == list(range(10, 40, 3))
+    assert {shape for _, _, shape in frames} == {(120, 160, 3)}
+
+def test_batches(video):
+    with VideoSource(video, stop=20, batch_size=8) as source:
+        batches = [[frame.frame_id for frame in batch] for batch in source.batches(8)]
+    assert batches == [list(range(0, 8)), list(range(8, 16)), list(range(16, 20))]
+    
+    with VideoSource(video, max_side=640) as source:
+        with pytest.raises(ValueError):
+            next(source.batches(8))
+    with VideoSource(video, stop=10, reuse_buffers=False) as source:
+        assert [len(batch) for batch in source.batches(8)] == [8, 2]
+
+def test_pool_buffers_are_recycled(video):
+    with VideoSource(video, stop=40, prefetch=2) as source:
+        buffers = {id(frame.image) for frame in source}
+    assert len(buffers) <= 2 + 1 + 1  # prefetch + batch + the frame being decoded
+    
+    with VideoSource(video, stop=5, reuse_buffers=False) as source:
+        kept = [frame.image for frame in source]
+    assert [frame_index(image) for image in kept] == list(range(5))
+
+def test_read_api_and_early_release(video):
+    source = VideoSource(video)
+    ok, image = source.read()
+    assert ok and frame_index(image) == 0
+    ok, image = source.read()
+    assert ok and frame_index(image) == 1
+    source.release()  # Read-ahead thread is still running
+    
+    with VideoSource(video, start=58) as source:
+        assert source.read()[0] and source.read()[0]
+        assert source.read() == (False, None)
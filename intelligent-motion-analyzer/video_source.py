@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+"""
+Video ingestion: threaded read-ahead, buffer reuse, range/stride and downscaling
+
+``VideoSource`` wraps cv2.VideoCapture. A background thread decodes ahead
+of the consumer into a fixed pool of frame buffers, so steady-state
+decoding allocates nothing and overlaps with pose inference:
+    
+    with VideoSource("walk.mp4", start=900, stop=1800, stride=2, max_side=640, batch_size=8) as source:
+        for batch in source.batches(8):
+            landmarks = estimator.detect_poses([frame.image for frame in batch])
+
+Frames handed out by ``frames()``, ``batches()`` and ``read()`` are pool
+buffers: they stay valid until the next frame (or batch) is requested.
+Consumers that keep frames longer, such as the pipelined runner, pass
+``reuse_buffers=False``.
+
+Author: Krishna Gopal Madhavaram
+Email: krishnagopal596@gmail.com
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+import logging
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class VideoFrame:
+    """One decoded frame and the pool buffer it lives in"""
+    frame_id: int  # Index of the frame in the source, counting skipped frames
+    timestamp: float  # Seconds from the start of a file, or capture time for cameras
+    image: np.ndarray
+    _pool: Optional["FramePool"] = None
+    
+    def release(self):
+        """Hand the buffer back to the pool (no-op for unpooled frames)"""
+        if self._pool is not None:
+            self._pool.release(self.image)
+            self._pool = None
+
+class FramePool:
+    """
+    Bounded set of reusable frame buffers
+    
+    Buffers are created on demand up to ``capacity``; after that ``acquire``
+    blocks until a consumer releases one, which also bounds read-ahead.
+    """
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._free: List[np.ndarray] = []
+        self._allocated = 0
+        self._condition = threading.Condition()
+    
+    def acquire(self, timeout: Optional[float] = None) -> Tuple[bool, Optional[np.ndarray]]:
+        """
+        Take a free buffer
+        
+        Returns:
+            (ok, buffer): buffer is None when a new one may be allocated by the
+            caller; ok is False if none became free within ``timeout``
+        """
+        with self._condition:
+            if not self._free and self._allocated >= self.capacity:
+                self._condition.wait_for(lambda: bool(self._free), timeout)
+            if self._free:
+                return True, self._free.pop()
+            if self._allocated < self.capacity:
+                self._allocated += 1
+                return True, None
+            return False, None
+    
+    def release(self, buffer: np.ndarray):
+        with self._condition:
+            self._free.append(buffer)
+            self._condition.notify()
+    
+    def discard(self):
+        """Give up an acquired slot without returning a buffer (e.g. at end of stream)"""
+        with self._condition:
+            self._allocated -= 1
+            self._condition.notify()
+
+_END = object()
+
+def open_capture(source: Union[int, str], hw_accel: bool = False,
+                 decode_threads: Optional[int] = None) -> cv2.VideoCapture:
+    """
+    Open a camera index or video path, optionally with hardware decoding
+    
+    Args:
+        source: Camera index (int or digit string) or file/stream URL
+        hw_accel: Ask the backend for any available hardware decoder
+        decode_threads: Decoder thread count (backend default if None)
+    """
+    params = []
+    if hw_accel:
+        if hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        else:
+            logger.warning("This OpenCV build has no hardware decode support; decoding on the CPU")
+    if decode_threads is not None and hasattr(cv2, "CAP_PROP_N_THREADS"):
+        params += [cv2.CAP_PROP_N_THREADS, decode_threads]
+    
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if params:
+        return cv2.VideoCapture(source, cv2.CAP_ANY, params)
+    return cv2.VideoCapture(source)
+
+def scaled_size(width: int, height: int, max_side: Optional[int]) -> Optional[Tuple[int, int]]:
+    """Target (width, height) with the longest side at most ``max_side``; None if no scaling"""
+    if not max_side or max(width, height) <= max_side:
+        return None
+    scale = max_side / max(width, height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+class VideoSource:
+    """Read-ahead video reader over a frame range with optional stride and downscaling"""
+    
+    def __init__(self, source: Union[int, str], start: int = 0, stop: Optional[int] = None,
+                 stride: int = 1, max_side: Optional[int] = None, prefetch: int = 8,
+                 batch_size: int = 1, reuse_buffers: bool = True, hw_accel: bool = False,
+                 decode_threads: Optional[int] = None):
+        """
+        Args:
+            source: Camera index or video path/URL
+            start: First frame to decode (files only)
+            stop: Frame index to stop before (None reads to the end)
+            stride: Keep every ``stride``-th frame; skipped frames are grabbed
+                without color conversion
+            max_side: Downscale frames so the longest side is at most this,
+                on the decode thread (pose models infer at 256 px anyway)
+            prefetch: Frames decoded ahead of the consumer
+            batch_size: Largest batch requested from ``batches()``; sizes the pool
+            reuse_buffers: Recycle frame buffers; disable if frames outlive the next read
+            hw_accel: Request hardware decoding when the backend supports it
+            decode_threads: Decoder thread count (backend default if None)
+        """
+        self.source = source
+        self.is_camera = isinstance(source, int) or str(source).isdigit()
+        self.start = 0 if self.is_camera else max(0, start)
+        self.stop = stop
+        self.stride = max(1, stride)
+        self.max_side = max_side
+        self.prefetch = max(1, prefetch)
+        self.batch_size = max(1, batch_size)
+        self.reuse_buffers = reuse_buffers
+        
+        self.capture = open_capture(source, hw_accel, decode_threads)
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 30.0
+        self.frame_count = max(0, int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT)))
+        self.size = scaled_size(int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)),
+                                int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT)), max_side)
+        
+        # Frames in the queue, the consumer's current batch and one being decoded
+        self._pool = FramePool(self.prefetch + self.batch_size + 1) if reuse_buffers else None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=self.prefetch)
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._current: List[VideoFrame] = []
+        self._finished = False
+        self.frames_decoded = 0
+        self.decode_seconds = 0.0
+    
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+    
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._read_loop, name="video-read-ahead", daemon=True)
+            self._thread.start()
+    
+    def _decode(self, buffer: Optional[np.ndarray], scratch: Optional[np.ndarray]):
+        """Decode the next frame into ``buffer``; returns (ok, image, scratch)"""
+        if self.size is None:
+            ok, image = self.capture.read(image=buffer) if buffer is not None else self.capture.read()
+            return ok, image, scratch
+        ok, scratch = self.capture.read(image=scratch) if scratch is not None else self.capture.read()
+        if not ok:
+            return False, None, scratch
+        if buffer is not None:
+            image = cv2.resize(scratch, self.size, dst=buffer, interpolation=cv2.INTER_LINEAR)
+        else:
+            image = cv2.resize(scratch, self.size, interpolation=cv2.INTER_LINEAR)
+        return True, image, scratch
+    
+    def _put(self, item) -> bool:
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def _read_loop(self):
+        scratch = None
+        try:
+            if self.start:
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, self.start)
+            frame_id = self.start
+            while not self._stop_event.is_set() and (self.stop is None or frame_id < self.stop):
+                buffer = None
+                if self._pool is not None:
+                    ok, buffer = self._pool.acquire(timeout=0.1)
+                    if not ok:
+                        continue
+                
+                started = time.perf_counter()
+                ok, image, scratch = self._decode(buffer, scratch)
+                if not ok:
+                    if self._pool is not None:
+                        self._pool.discard()
+                    break
+                timestamp = time.time() if self.is_camera else frame_id / self.fps
+                self.decode_seconds += time.perf_counter() - started
+                self.frames_decoded += 1
+                
+                if not self._put(VideoFrame(frame_id, timestamp, image, self._pool)):
+                    break
+                
+                # Skip to the next kept frame without retrieving the skipped ones
+                frame_id += 1
+                end_of_stream = False
+                for _ in range(self.stride - 1):
+                    if self.stop is not None and frame_id >= self.stop:
+                        break
+                    if not self.capture.grab():
+                        end_of_stream = True
+                        break
+                    frame_id += 1
+                if end_of_stream:
+                    break
+        except Exception as e:
+            logger.error(f"Error decoding {self.source}: {e}")
+        finally:
+            self._put(_END)
+    
+    def _next(self) -> Optional[VideoFrame]:
+        if self._finished:
+            return None
+        self._start()
+        item = self._queue.get()
+        if item is _END:
+            self._finished = True
+            return None
+        return item
+    
+    def _release_current(self):
+        for frame in self._current:
+            frame.release()
+        self._current = []
+    
+    def frames(self) -> Iterator[VideoFrame]:
+        """Yield frames in order; each frame's buffer is reused once the next one is requested"""
+        while True:
+            self._release_current()
+            frame = self._next()
+            if frame is None:
+                return
+            self._current = [frame]
+            yield frame
+    
+    __iter__ = frames
+    
+    def batches(self, batch_size: Optional[int] = None) -> Iterator[List[VideoFrame]]:
+        """Yield lists of up to ``batch_size`` consecutive frames (the last may be shorter)"""
+        batch_size = batch_size or self.batch_size
+        if self.reuse_buffers and batch_size > self.batch_size:
+            raise ValueError(f"batch_size {batch_size} exceeds the pool sized for {self.batch_size}")
+        while True:
+            self._release_current()
+            batch = []
+            while len(batch) < batch_size:
+                frame = self._next()
+                if frame is None:
+                    break
+                batch.append(frame)
+            if not batch:
+                return
+            self._current = batch
+            yield batch
+    
+    def read(self) -> Tuple[bool, Optional[np.ndarray]]:
+        """cv2.VideoCapture-compatible read; the returned image is valid until the next call"""
+        self._release_current()
+        frame = self._next()
+        if frame is None:
+            return False, None
+        self._current = [frame]
+        return True, frame.image
+    
+    def release(self):
+        """Stop the read-ahead thread and close the capture"""
+        self._stop_event.set()
+        if self._thread is not None:
+            # Drain so a blocked producer sees the stop flag
+            while self._thread.is_alive():
+                try:
+                    self._queue.get(timeout=0.05)
+                except queue.Empty:
+                    pass
+            self._thread.join()
+        self._current = []
+        self.capture.release()
+    
+    def stats(self) -> Dict:
+        return {
+            "frames_decoded": self.frames_decoded,
+            "decode_fps": self.frames_decoded / self.decode_seconds if self.decode_seconds else 0.0,
+            "size": self.size
+        }
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()